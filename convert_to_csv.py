@@ -1,35 +1,38 @@
 #!/usr/bin/env python3
 """Convert pipe-delimited products TXT to CSV."""
 import csv
+import os
+import sys
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from core.reader import ProductFile
+from core.writer import HEADER
+
 INPUT = Path("products_inkey_all.txt")
 OUTPUT = Path("products_inkey_all.csv")
 
 def main():
     if not INPUT.exists():
         raise SystemExit(f"Input file not found: {INPUT}")
-    rows = []
-    with INPUT.open("r", encoding="utf-8") as f:
-        for i, line in enumerate(f):
-            line = line.rstrip("\n")
-            parts = line.split("|")
-            if i == 0:
-                header = parts
-                continue
+    # Rows are streamed from the memory-mapped file, never held in memory
+    # One-shot read of a finished file: index a last row without a newline, skip the sidecar
+    with ProductFile(INPUT, persist=False, final=True) as products, OUTPUT.open("w", encoding="utf-8", newline="") as f:
+        header = (products.header.decode("utf-8") or HEADER).split("|")
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for line in products.lines():
+            parts = line.decode("utf-8").split("|")
             if len(parts) != len(header):
                 # pad or trim to header length to avoid CSV inconsistencies
                 if len(parts) < len(header):
                     parts = parts + [""] * (len(header) - len(parts))
                 else:
                     parts = parts[:len(header)]
-            rows.append(parts)
-    
-    with OUTPUT.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(rows)
-    print(f"Wrote {len(rows)} rows to {OUTPUT}")
+            writer.writerow(parts)
+        count = len(products)
+    print(f"Wrote {count} rows to {OUTPUT}")
 
 if __name__ == "__main__":
     main()
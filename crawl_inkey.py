@@ -1,28 +1,31 @@
 #!/usr/bin/env python3
 """Crawl The Inkey List website to find all product URLs"""
 
+import os
+import sys
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import time
 
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from core.client import HttpClient
+
 BASE_URL = "https://uk.theinkeylist.com"
 PRODUCTS_URL = f"{BASE_URL}/products"
 
 def crawl_products():
     """Crawl all product pages and extract product URLs"""
     product_urls = set()
-    session = requests.Session()
-    session.headers.update({
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-    })
+    client = HttpClient()
     
     print(f"Starting crawl from {PRODUCTS_URL}")
     
     try:
         # Try to fetch the products page
-        response = session.get(PRODUCTS_URL, timeout=20)
-        response.raise_for_status()
+        response = client.fetch(PRODUCTS_URL)
         soup = BeautifulSoup(response.text, "lxml")
         
         # Find all product links - look for common patterns
@@ -3,12 +3,15 @@
 import sys
 import os
 import argparse
+from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from sites.inkeylist import InkeyListScraper
 from core.client import HttpClient
+from core.metrics import METRICS
+from core.profiling import PROFILER
 from core.writer import write_products
 
 def main():
@@ -18,6 +21,13 @@ def main():
         default="products_inkey_all.txt",
         help="Output pipe-delimited TXT file (default: products_inkey_all.txt)",
     )
+    parser.add_argument("--metrics-file", help="Write Prometheus text-format metrics to this file")
+    parser.add_argument("--summary-file", help="Write a JSON run summary to this file")
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="Sample-profile the run and write collapsed stacks plus a slowest-URL report to DIR",
+    )
     args = parser.parse_args()
     # Read URLs
     with open('inkey_all_urls.txt', 'r') as f:
@@ -25,6 +35,9 @@ def main():
     
     print(f"Found {len(urls)} URLs to scrape")
     
+    if args.profile:
+        PROFILER.start()
+
     # Initialize scraper
     client = HttpClient()
     scraper = InkeyListScraper(client)
@@ -41,13 +54,23 @@ def main():
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        scraper.close()
     
     # Write output
     if products:
-        from pathlib import Path
         output_file = Path(args.output)
         write_products(output_file, products)
         print(f"\nSaved {len(products)} products to {output_file}")
+
+    if args.profile:
+        PROFILER.stop()
+        PROFILER.write(Path(args.profile))
+        print(PROFILER.report(10))
+    if args.metrics_file:
+        METRICS.write_prometheus(Path(args.metrics_file))
+    if args.summary_file:
+        METRICS.write_summary(Path(args.summary_file))
     
 if __name__ == '__main__':
     main()
@@ -0,0 +1,65 @@
+import argparse
+import time
+from pathlib import Path
+from typing import List
+
+from core.compaction import Compactor
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Merge product shards into one products file, keeping the newest row per product"
+    )
+    parser.add_argument(
+        "inputs",
+        type=Path,
+        nargs="+",
+        help="Shard files, or directories of products.*.txt shards (e.g. a worker --output-dir)",
+    )
+    parser.add_argument("--output", type=Path, default=Path("products.txt"), help="Compacted products file")
+    parser.add_argument(
+        "--memory-rows",
+        type=int,
+        default=200_000,
+        help="Rows held in memory before spilling a sorted run to disk (default: 200000)",
+    )
+    parser.add_argument("--fan-in", type=int, default=64, help="Runs merged at once (bounds open files)")
+    parser.add_argument("--tmp-dir", type=Path, help="Directory for sorted runs (default: system temp)")
+    parser.add_argument("--keep-shards", action="store_true", help="Do not delete shards once merged")
+    return parser.parse_args()
+
+
+def collect_shards(inputs: List[Path], output: Path) -> List[Path]:
+    """Shard files in write order (their names start with a nanosecond timestamp)."""
+    shards: List[Path] = []
+    for path in inputs:
+        if path.is_dir():
+            shards.extend(sorted(path.glob("products.*.txt")))
+        elif path.exists():
+            shards.append(path)
+        else:
+            raise SystemExit(f"Input not found: {path}")
+    return [shard for shard in shards if shard.resolve() != output.resolve()]
+
+
+def main() -> None:
+    args = parse_args()
+    shards = collect_shards(args.inputs, args.output)
+    if not shards:
+        print("No shards to compact")
+        return
+    start = time.perf_counter()
+    compactor = Compactor(args.memory_rows, args.fan_in, args.tmp_dir)
+    count = compactor.compact(shards, args.output)
+    print(
+        f"Compacted {compactor.rows_read} rows from {len(shards)} shards into {count} products "
+        f"in {args.output} ({compactor.runs_written} sorted runs, {time.perf_counter() - start:.1f}s)"
+    )
+    if not args.keep_shards:
+        for shard in shards:
+            shard.unlink()
+        print(f"Removed {len(shards)} merged shards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+Candidate = Tuple[str, Callable[[], str]]
+
+
+class ExtractorStats:
+    """
+    Learn which fallback extractor usually wins for each site and field.
+
+    ``run_chain`` replaces hand-written ``a() or b() or c()`` chains. During
+    warm-up and on every ``explore_every``-th page the chain runs in its
+    declared order and evaluates every candidate, which gives unbiased hit
+    rates and records whether candidates that both hit returned the same
+    value. On other pages the chain stops at the first hit, extractors that
+    never hit during exploration are skipped, and the usual winner runs
+    first. A candidate only moves ahead of one declared before it once they
+    agreed on at least ``agree_min`` exploration pages and never disagreed,
+    so a weaker fallback (``og:title``) never replaces the value of a better
+    source that hits (``ld:name``).
+    """
+
+    def __init__(
+        self, path: Optional[Path] = None, warmup: int = 20, explore_every: int = 25, agree_min: int = 5
+    ) -> None:
+        self.path = path
+        self.warmup = warmup
+        self.explore_every = explore_every
+        self.agree_min = agree_min
+        self._lock = threading.Lock()
+        # "site/field" -> extractor name -> [attempts, hits]
+        self.stats: Dict[str, Dict[str, List[int]]] = {}
+        # "site/field" -> explored pages, pages seen
+        self.pages: Dict[str, List[int]] = {}
+        # "site/field" -> "extractor\textractor" (sorted) -> [pages both hit, pages they disagreed]
+        self.agreement: Dict[str, Dict[str, List[int]]] = {}
+        if path:
+            self.load(path)
+
+    def load(self, path: Path) -> None:
+        """Replace the in-memory stats with those persisted at ``path`` (if any)."""
+        self.path = path
+        if not path.exists():
+            return
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        with self._lock:
+            self.stats = payload.get("stats", {})
+            self.pages = payload.get("pages", {})
+            self.agreement = payload.get("agreement", {})
+
+    def run_chain(self, site: str, field: str, candidates: Sequence[Candidate]) -> str:
+        key = f"{site}/{field}"
+        with self._lock:
+            explored, seen = self.pages.setdefault(key, [0, 0])
+            explore = explored < self.warmup or seen % self.explore_every == 0
+            self.pages[key] = [explored + int(explore), seen + 1]
+        if explore:
+            hits = []
+            for name, extract in candidates:
+                value = extract()
+                self._record(key, name, bool(value))
+                if value:
+                    hits.append((name, value))
+            self._record_agreement(key, hits)
+            return hits[0][1] if hits else ""
+        for name, extract in self._ordered(key, candidates):
+            value = extract()
+            self._record(key, name, bool(value))
+            if value:
+                return value
+        return ""
+
+    def _record(self, key: str, name: str, hit: bool) -> None:
+        with self._lock:
+            counts = self.stats.setdefault(key, {}).setdefault(name, [0, 0])
+            counts[0] += 1
+            counts[1] += int(hit)
+
+    def _record_agreement(self, key: str, hits: List[Tuple[str, str]]) -> None:
+        with self._lock:
+            pairs = self.agreement.setdefault(key, {})
+            for index, (left, left_value) in enumerate(hits):
+                for right, right_value in hits[index + 1:]:
+                    counts = pairs.setdefault(_pair(left, right), [0, 0])
+                    counts[0] += 1
+                    counts[1] += int(left_value != right_value)
+
+    def _ordered(self, key: str, candidates: Sequence[Candidate]) -> List[Candidate]:
+        """
+        Live candidates, highest hit rate first where that cannot change the result.
+
+        Dead fallbacks are left to exploration passes. The order is built from
+        adjacent swaps of agreeing candidates only, so every candidate that runs
+        before one declared ahead of it returns the same value whenever both hit.
+        """
+        with self._lock:
+            stats = dict(self.stats.get(key, {}))
+            pairs = dict(self.agreement.get(key, {}))
+        live = []
+        rates: Dict[str, float] = {}
+        for name, extract in candidates:
+            attempts, hits = stats.get(name, (0, 0))
+            if attempts >= self.warmup and hits == 0:
+                continue
+            live.append((name, extract))
+            rates[name] = hits / attempts if attempts else 0.0
+        for index in range(1, len(live)):
+            position = index
+            while position > 0:
+                left, right = live[position - 1][0], live[position][0]
+                both, disagreed = pairs.get(_pair(left, right), (0, 0))
+                if rates[right] <= rates[left] or disagreed or both < self.agree_min:
+                    break
+                live[position - 1], live[position] = live[position], live[position - 1]
+                position -= 1
+        return live
+
+    def dead_fallbacks(self) -> List[Tuple[str, str, int]]:
+        """``(site/field, extractor, attempts)`` for extractors that never hit after warm-up."""
+        with self._lock:
+            return sorted(
+                (key, name, attempts)
+                for key, extractors in self.stats.items()
+                for name, (attempts, hits) in extractors.items()
+                if attempts >= self.warmup and hits == 0
+            )
+
+    def report(self) -> str:
+        lines = []
+        with self._lock:
+            for key in sorted(self.stats):
+                lines.append(key)
+                extractors = sorted(self.stats[key].items(), key=lambda item: -item[1][1])
+                for name, (attempts, hits) in extractors:
+                    rate = hits / attempts * 100 if attempts else 0.0
+                    flag = "  (dead)" if attempts >= self.warmup and hits == 0 else ""
+                    lines.append(f"  {rate:5.1f}% {hits:>6}/{attempts:<6} {name}{flag}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: Optional[Path] = None) -> None:
+        path = path or self.path
+        if not path:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payload = {"stats": self.stats, "pages": self.pages, "agreement": self.agreement}
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        tmp_path.replace(path)
+
+
+def _pair(left: str, right: str) -> str:
+    return "\t".join(sorted((left, right)))
+
+
+EXTRACTOR_STATS = ExtractorStats()
@@ -0,0 +1,243 @@
+"""
+Append-only archive of fetched pages, so parsers can be re-run offline.
+
+Records are WARC/1.0 ``response`` records (URL, date, HTTP status line,
+headers and body), each compressed as its own gzip member. Concatenated
+members are still one valid ``.warc.gz`` file, and any record can be read by
+seeking to its offset. A tab-separated sidecar index (``<archive>.idx``:
+offset, length, status, challenged, url) is written alongside so readers can
+skip the sequential scan; ``load_index`` rebuilds it when it is missing.
+"""
+import gzip
+import re
+import threading
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.client import responses
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+
+# The stored body is already decoded, so these would no longer be true
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+_CHARSET = re.compile(r"charset=[\"']?([\w-]+)", re.IGNORECASE)
+
+
+@dataclass
+class ArchivedPage:
+    url: str
+    status: int
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    fetched_at: str = ""
+    tier: str = ""
+    challenge: str = ""
+
+    @property
+    def text(self) -> str:
+        content_type = next((value for key, value in self.headers.items() if key.lower() == "content-type"), "")
+        match = _CHARSET.search(content_type)
+        encoding = match.group(1) if match else "utf-8"
+        try:
+            return self.body.decode(encoding, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+
+@dataclass
+class IndexEntry:
+    offset: int
+    length: int
+    status: int
+    challenged: bool
+    url: str
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+
+def utf8_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Headers for a page whose decoded ``str`` HTML is stored re-encoded as UTF-8."""
+    result = {key: value for key, value in headers.items() if key.lower() != "content-type"}
+    content_type = next((value for key, value in headers.items() if key.lower() == "content-type"), "text/html")
+    content_type = _CHARSET.sub("", content_type).rstrip("; ")
+    result["Content-Type"] = f"{content_type}; charset=utf-8"
+    return result
+
+
+def encode_record(page: ArchivedPage) -> bytes:
+    status_line = f"HTTP/1.1 {page.status} {responses.get(page.status, '')}".rstrip()
+    header_lines = [f"{key}: {value}" for key, value in page.headers.items() if key.lower() not in DROPPED_HEADERS]
+    header_lines.append(f"Content-Length: {len(page.body)}")
+    http_block = "\r\n".join([status_line] + header_lines).encode("utf-8", errors="replace") + b"\r\n\r\n" + page.body
+    warc_headers = [
+        ("WARC-Type", "response"),
+        ("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>"),
+        ("WARC-Date", page.fetched_at),
+        ("WARC-Target-URI", page.url),
+        ("Content-Type", "application/http;msgtype=response"),
+        ("X-Fetch-Tier", page.tier),
+    ]
+    if page.challenge:
+        warc_headers.append(("X-Fetch-Challenge", page.challenge))
+    warc_headers.append(("Content-Length", str(len(http_block))))
+    head = "WARC/1.0\r\n" + "".join(f"{key}: {value}\r\n" for key, value in warc_headers) + "\r\n"
+    return head.encode("utf-8") + http_block + b"\r\n\r\n"
+
+
+def _parse_headers(block: bytes) -> Tuple[str, Dict[str, str]]:
+    lines = block.decode("utf-8", errors="replace").split("\r\n")
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        if key:
+            headers[key.strip()] = value.strip()
+    return lines[0], headers
+
+
+def decode_record(data: bytes) -> ArchivedPage:
+    warc_head, _, rest = data.partition(b"\r\n\r\n")
+    _, warc = _parse_headers(warc_head)
+    block = rest[: int(warc.get("Content-Length", len(rest)))]
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    status_line, headers = _parse_headers(http_head)
+    parts = status_line.split(" ", 2)
+    status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+    return ArchivedPage(
+        url=warc.get("WARC-Target-URI", ""),
+        status=status,
+        body=body,
+        headers=headers,
+        fetched_at=warc.get("WARC-Date", ""),
+        tier=warc.get("X-Fetch-Tier", ""),
+        challenge=warc.get("X-Fetch-Challenge", ""),
+    )
+
+
+class PageArchive:
+    """
+    Process-wide archive writer; ``record`` is a no-op until ``open`` is called.
+
+    Appends are serialized with a lock. Give each process its own file (e.g.
+    one per queue worker) - gzip members from two writers must not interleave.
+    """
+
+    def __init__(self) -> None:
+        self.path: Optional[Path] = None
+        self._handle: Optional[BinaryIO] = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._handle is not None
+
+    def open(self, path: Path) -> None:
+        self.close()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._handle = path.open("ab")
+        self._index = index_path(path).open("a", encoding="utf-8")
+
+    def record(
+        self,
+        url: str,
+        status: int,
+        headers: Dict[str, str],
+        body: bytes,
+        tier: str = "",
+        challenge: Optional[str] = None,
+    ) -> None:
+        if self._handle is None:
+            return
+        page = ArchivedPage(
+            url=url,
+            status=status,
+            body=body,
+            headers=headers,
+            fetched_at=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            tier=tier,
+            challenge=challenge or "",
+        )
+        member = gzip.compress(encode_record(page), compresslevel=6)
+        with self._lock:
+            if self._handle is None:
+                return
+            offset = self._handle.tell()
+            self._handle.write(member)
+            self._handle.flush()
+            self._index.write(f"{offset}\t{len(member)}\t{status}\t{int(bool(challenge))}\t{url}\n")
+            self._index.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._index.close()
+            self._handle = None
+            self._index = None
+
+
+ARCHIVE = PageArchive()
+
+
+def _iter_members(handle: BinaryIO, chunk_size: int = 1 << 20) -> Iterator[Tuple[int, int, bytes]]:
+    """Yield ``(offset, compressed length, data)`` for each gzip member in order."""
+    offset = 0
+    buffer = b""
+    while True:
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        parts: List[bytes] = []
+        consumed = 0
+        while not decompressor.eof:
+            if not buffer:
+                buffer = handle.read(chunk_size)
+                if not buffer:
+                    if consumed:
+                        print(f"Warning: truncated archive record at offset {offset}, stopping")
+                    return
+            chunk, buffer = buffer, b""
+            parts.append(decompressor.decompress(chunk))
+            if decompressor.eof:
+                buffer = decompressor.unused_data
+            consumed += len(chunk) - len(buffer)
+        yield offset, consumed, b"".join(parts)
+        offset += consumed
+
+
+def iter_archive(path: Path) -> Iterator[Tuple[IndexEntry, ArchivedPage]]:
+    """Sequentially read every record of ``path``."""
+    with path.open("rb") as handle:
+        for offset, length, data in _iter_members(handle):
+            page = decode_record(data)
+            yield IndexEntry(offset, length, page.status, bool(page.challenge), page.url), page
+
+
+def load_index(path: Path) -> List[IndexEntry]:
+    """Read the sidecar index of ``path``, rebuilding it with a full scan if missing or stale."""
+    sidecar = index_path(path)
+    if sidecar.exists():
+        entries = []
+        with sidecar.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                offset, length, status, challenged, url = line.rstrip("\n").split("\t", 4)
+                entries.append(IndexEntry(int(offset), int(length), int(status), challenged == "1", url))
+        end = entries[-1].offset + entries[-1].length if entries else 0
+        if end == path.stat().st_size:
+            return entries
+        print(f"Index {sidecar} does not match {path}, rebuilding")
+    entries = [entry for entry, _ in iter_archive(path)]
+    with sidecar.open("w", encoding="utf-8") as handle:
+        for entry in entries:
+            handle.write(f"{entry.offset}\t{entry.length}\t{entry.status}\t{int(entry.challenged)}\t{entry.url}\n")
+    return entries
+
+
+def read_at(handle: BinaryIO, offset: int, length: int) -> ArchivedPage:
+    """Read the single record stored at ``offset`` of an open archive."""
+    handle.seek(offset)
+    return decode_record(gzip.decompress(handle.read(length)))
@@ -0,0 +1,308 @@
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+
+DRIVER_CACHE_DIR = Path(os.environ.get("KUNGUL_CACHE_DIR", Path.home() / ".cache" / "kungulscraper"))
+DRIVER_CACHE_MAX_AGE = 7 * 24 * 3600  # re-check for driver updates weekly
+
+
+def resolve_chromedriver(cache_dir: Optional[Path] = None, max_age: float = DRIVER_CACHE_MAX_AGE) -> str:
+    """
+    Return a chromedriver path, hitting the network at most once per ``max_age``.
+
+    ``CHROMEDRIVER`` in the environment wins outright. Otherwise the path
+    returned by webdriver_manager is cached in ``cache_dir/chromedriver.json``
+    and reused while the binary still exists.
+    """
+    override = os.environ.get("CHROMEDRIVER")
+    if override:
+        return override
+    cache_file = (cache_dir or DRIVER_CACHE_DIR) / "chromedriver.json"
+    try:
+        cached = json.loads(cache_file.read_text(encoding="utf-8"))
+        if time.time() - cached["resolved_at"] < max_age and Path(cached["path"]).exists():
+            return cached["path"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    path = ChromeDriverManager().install()
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(json.dumps({"path": path, "resolved_at": time.time()}), encoding="utf-8")
+    return path
+
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+)
+
+
+# Only the HTML, JSON-LD and inline state are needed; never fetch these in lean mode.
+# Images are blocked here rather than with Chrome's images content setting, so
+# baseline loads can lift the block and fetch them.
+BLOCKED_URL_PATTERNS = [
+    # images / media / fonts
+    "*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+    "*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    # analytics and third-party tags
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*criteo.*",
+    "*tiktok.com*", "*bing.com/bat*", "*clarity.ms*", "*pinterest.com*",
+    "*trustpilot.com*", "*optimizely.com*", "*onetrust.com*", "*cookielaw.org*",
+]
+
+# Baseline comparisons read the performance log until it is quiet this long (seconds)
+BASELINE_SETTLE = 0.5
+SETTLE_TIMEOUT = 15.0
+
+
+@dataclass
+class LoadStats:
+    requests: int = 0
+    bytes_transferred: int = 0
+    blocked_requests: int = 0
+    bytes_saved: int = 0  # measured on baseline pages, estimated otherwise
+
+
+@dataclass
+class BrowserPage:
+    url: str
+    html: str
+    title: str
+    user_agent: str
+    cookies: List[dict] = field(default_factory=list)
+    stats: Optional[LoadStats] = None
+
+
+def build_chrome_options(headless: bool = True, user_agent: str = DEFAULT_USER_AGENT, lean: bool = False):
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    if lean:
+        # Return from driver.get() at DOMContentLoaded instead of full load
+        chrome_options.page_load_strategy = "eager"
+        # Network events feed the per-page byte accounting
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    chrome_options.add_argument(f"user-agent={user_agent}")
+    return chrome_options
+
+
+class BrowserPool:
+    """
+    Small pool of long-lived Chrome sessions.
+
+    Drivers are started on first use and reused across URLs instead of paying
+    Chrome start-up (and a fresh Cloudflare challenge) for every page.
+
+    ``lean=True`` loads pages with the eager strategy and blocks images, media,
+    fonts and tracker domains through the DevTools protocol, reporting the
+    bytes transferred per page. Every ``baseline_every`` pages one page is
+    loaded unblocked first to measure how many bytes blocking actually saves.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        headless: bool = True,
+        user_agent: str = DEFAULT_USER_AGENT,
+        challenge_timeout: float = 30.0,
+        content_selector: str = "h1",
+        lean: bool = False,
+        baseline_every: int = 0,
+        soft_block=None,
+    ) -> None:
+        self.size = size
+        self.soft_block = soft_block  # core.fetcher.SoftBlock pages to wait out like a challenge
+        self.lean = lean
+        self.baseline_every = baseline_every
+        self._pages = 0
+        self._baseline_ratio = 0.0  # full bytes / lean bytes, from baseline pages
+        self.headless = headless
+        self.user_agent = user_agent
+        self.challenge_timeout = challenge_timeout
+        self.content_selector = content_selector
+        self._idle: "queue.Queue" = queue.Queue()
+        self._started = 0
+        self._lock = threading.Lock()
+        self._drivers: List = []
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._started < self.size:
+                self._started += 1
+                try:
+                    return self._start_driver()
+                except Exception:
+                    self._started -= 1
+                    raise
+        return self._idle.get()
+
+    def _start_driver(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        driver = webdriver.Chrome(
+            service=Service(resolve_chromedriver()),
+            options=build_chrome_options(self.headless, self.user_agent, self.lean),
+        )
+        if self.lean:
+            driver.execute_cdp_cmd("Network.enable", {})
+            self._set_blocking(driver, True)
+        self._drivers.append(driver)
+        return driver
+
+    def _set_blocking(self, driver, enabled: bool) -> None:
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS if enabled else []}
+        )
+
+    def _collect_stats(self, driver, settle: float = 0.0) -> LoadStats:
+        """
+        Sum network activity since the last call from Chrome's performance log.
+
+        Only requests that started since the last call count, so late events of
+        an earlier eager load never leak into this window. With ``settle`` the
+        log is drained until it stays quiet for that many seconds (at most
+        ``SETTLE_TIMEOUT``), so the requests an eager load issues after
+        ``driver.get()`` returns are counted too.
+        """
+        stats = LoadStats()
+        started = set()
+        deadline = time.monotonic() + SETTLE_TIMEOUT
+        entries = driver.get_log("performance")
+        while entries:
+            for entry in entries:
+                try:
+                    message = json.loads(entry["message"])["message"]
+                except (KeyError, ValueError):
+                    continue
+                method = message.get("method")
+                params = message.get("params", {})
+                if method == "Network.requestWillBeSent":
+                    started.add(params.get("requestId"))
+                    stats.requests += 1
+                elif params.get("requestId") not in started:
+                    continue
+                elif method == "Network.loadingFinished":
+                    stats.bytes_transferred += int(params.get("encodedDataLength", 0))
+                elif method == "Network.loadingFailed" and (
+                    params.get("blockedReason") or params.get("errorText") == "net::ERR_BLOCKED_BY_CLIENT"
+                ):
+                    stats.blocked_requests += 1
+            if not settle or time.monotonic() >= deadline:
+                break
+            time.sleep(settle)
+            entries = driver.get_log("performance")
+        return stats
+
+    def _measure_baseline(self, driver, url: str) -> int:
+        self._set_blocking(driver, False)
+        try:
+            driver.get(url)
+            # Drain the unblocked load completely so none of it lands in the lean window
+            return self._collect_stats(driver, settle=BASELINE_SETTLE).bytes_transferred
+        finally:
+            self._set_blocking(driver, True)
+
+    def _challenged(self, driver) -> bool:
+        from .fetcher import detect_challenge
+
+        return bool(detect_challenge(200, driver.page_source, driver.title, self.soft_block))
+
+    def render(self, url: str) -> BrowserPage:
+        """Load ``url``, wait out any challenge page and return the final HTML."""
+        driver = self._acquire()
+        try:
+            baseline_bytes = 0
+            if self.lean:
+                with self._lock:  # pages may render on several drivers at once
+                    self._pages += 1
+                    page_number = self._pages
+                self._collect_stats(driver)  # discard events from earlier pages
+                if self.baseline_every and page_number % self.baseline_every == 1:
+                    baseline_bytes = self._measure_baseline(driver, url)
+            driver.get(url)
+            deadline = time.monotonic() + self.challenge_timeout
+            while self._challenged(driver) and time.monotonic() < deadline:
+                time.sleep(1.0)
+            if self._challenged(driver):
+                # Generic/404 pages are sometimes served while the clearance settles
+                print(f"Challenge page still shown for {url}, retrying once...")
+                time.sleep(5)
+                driver.get(url)
+                time.sleep(3)
+            self._wait_for_content(driver, url)
+            stats = self._lean_stats(driver, url, baseline_bytes) if self.lean else None
+            return BrowserPage(
+                url=url,
+                html=driver.page_source,
+                title=driver.title,
+                user_agent=driver.execute_script("return navigator.userAgent") or self.user_agent,
+                cookies=driver.get_cookies(),
+                stats=stats,
+            )
+        finally:
+            self._idle.put(driver)
+
+    def _lean_stats(self, driver, url: str, baseline_bytes: int) -> LoadStats:
+        from .metrics import METRICS
+
+        # Against a baseline, measure the lean load to the same quiet point
+        stats = self._collect_stats(driver, settle=BASELINE_SETTLE if baseline_bytes else 0.0)
+        if baseline_bytes and stats.bytes_transferred:
+            stats.bytes_saved = max(baseline_bytes - stats.bytes_transferred, 0)
+            ratio = baseline_bytes / stats.bytes_transferred
+            self._baseline_ratio = ratio if not self._baseline_ratio else 0.8 * self._baseline_ratio + 0.2 * ratio
+        elif self._baseline_ratio:
+            stats.bytes_saved = int(stats.bytes_transferred * max(self._baseline_ratio - 1.0, 0.0))
+        METRICS.inc("browser_bytes_transferred_total", stats.bytes_transferred)
+        METRICS.inc("browser_blocked_requests_total", stats.blocked_requests)
+        METRICS.inc("browser_bytes_saved_total", stats.bytes_saved)
+        print(
+            f"Lean load {url}: {stats.bytes_transferred / 1024:.0f} KB transferred, "
+            f"{stats.blocked_requests} requests blocked, ~{stats.bytes_saved / 1024:.0f} KB saved"
+        )
+        return stats
+
+    def _wait_for_content(self, driver, url: str) -> None:
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        try:
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, self.content_selector))
+            )
+        except TimeoutException:
+            print(f"Warning: Timeout waiting for content on {url}")
+            print(f"Page title: {driver.title}")
+
+    def close(self) -> None:
+        for driver in self._drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self._drivers = []
+        self._started = 0
+        self._idle = queue.Queue()
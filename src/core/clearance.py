@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+from .client import HttpClient
+
+
+# Cookies Cloudflare uses to remember a passed challenge
+CLEARANCE_COOKIES = ("cf_clearance", "__cf_bm")
+
+
+@dataclass
+class Clearance:
+    host: str
+    user_agent: str
+    cookies: List[dict] = field(default_factory=list)
+    harvested_at: float = 0.0
+    expires_at: float = 0.0
+
+    def is_valid(self, now: Optional[float] = None, margin: float = 30.0) -> bool:
+        return (now or time.time()) + margin < self.expires_at
+
+
+class ClearanceStore:
+    """
+    Hand browser-earned clearance cookies over to the plain HTTP client.
+
+    After a browser session passes a challenge, its cookies and exact user
+    agent are harvested per host and injected into ``HttpClient`` so later
+    requests to that host can skip the browser. Clearances expire with the
+    ``cf_clearance`` cookie (or ``default_ttl`` when it carries no expiry) and
+    are dropped early when a request comes back challenged anyway.
+    """
+
+    def __init__(self, path: Optional[Path] = None, default_ttl: float = 1800.0) -> None:
+        self.path = path
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._clearances: Dict[str, Clearance] = {}
+        if path and path.exists():
+            for entry in json.loads(path.read_text(encoding="utf-8")):
+                clearance = Clearance(**entry)
+                if clearance.is_valid():
+                    self._clearances[clearance.host] = clearance
+
+    def harvest(self, host: str, cookies: List[dict], user_agent: str) -> Clearance:
+        now = time.time()
+        expiries = [
+            float(cookie["expiry"])
+            for cookie in cookies
+            if cookie.get("name") in CLEARANCE_COOKIES and cookie.get("expiry")
+        ]
+        clearance = Clearance(
+            host=host,
+            user_agent=user_agent,
+            cookies=cookies,
+            harvested_at=now,
+            expires_at=min(expiries) if expiries else now + self.default_ttl,
+        )
+        with self._lock:
+            self._clearances[host] = clearance
+            self._save()
+        return clearance
+
+    def get(self, host: str) -> Optional[Clearance]:
+        with self._lock:
+            clearance = self._clearances.get(host)
+            if clearance and not clearance.is_valid():
+                del self._clearances[host]
+                self._save()
+                return None
+            return clearance
+
+    def invalidate(self, host: str, client: Optional[HttpClient] = None) -> None:
+        """Forget the clearance for ``host`` and, given ``client``, remove its cookies and user agent there."""
+        with self._lock:
+            if self._clearances.pop(host, None):
+                self._save()
+        if client is not None:
+            # The session jar is process-wide: a stale cf_clearance would keep being sent
+            client.clear_cookies(host)
+            client.host_headers.pop(host, None)
+
+    def apply(self, client: HttpClient, clearance: Clearance) -> None:
+        """Inject the cookies and user agent into ``client`` for ``clearance.host``."""
+        for cookie in clearance.cookies:
+            client.set_cookie(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain") or clearance.host,
+                path=cookie.get("path", "/"),
+            )
+        # The clearance is bound to the user agent that earned it
+        client.host_headers.setdefault(clearance.host, {})["User-Agent"] = clearance.user_agent
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = [asdict(clearance) for clearance in self._clearances.values()]
+        self.path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
@@ -1,8 +1,21 @@
 import time
-from typing import Dict, Optional
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from .metrics import METRICS
+from .resilience import BREAKERS, RUN_BUDGET, CircuitBreakers, DeadlineExceeded, HostUnavailable
+from .transport import (
+    RETRY_METHODS,
+    RETRY_STATUSES,
+    TransportConfig,
+    http2_available,
+    httpx,
+    retry_backoff,
+    shared_http2_client,
+    shared_session,
+)
 
 
 class HttpClient:
@@ -15,27 +28,29 @@ class HttpClient:
         ),
         retries: int = 5,
         backoff_factor: float = 1.0,
+        config: Optional[TransportConfig] = None,
+        breakers: Optional[CircuitBreakers] = None,
     ) -> None:
-        self.session = requests.Session()
-        retry = Retry(
-            total=retries,
-            backoff_factor=backoff_factor,
-            status_forcelist=[500, 502, 503, 504],  # handle 429 manually
-            allowed_methods=["GET", "POST"],
-        )
-        adapter = HTTPAdapter(max_retries=retry)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
-        self.session.headers.update(
-            {
-                "User-Agent": user_agent,
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9,de;q=0.8",
-                "sec-ch-ua": '"Chromium";v="121", "Not A(Brand";v="99"',
-                "sec-ch-ua-mobile": "?0",
-                "sec-ch-ua-platform": "macOS",
-            }
-        )
+        self.config = config or TransportConfig(retries=retries, backoff_factor=backoff_factor)
+        self.breakers = breakers or BREAKERS
+        # Pools are shared process-wide; headers stay per client
+        self.session = shared_session(self.config)
+        self.http2 = None
+        if self.config.http2:
+            if http2_available():
+                self.http2 = shared_http2_client(self.config)
+            else:
+                print("Warning: HTTP/2 requested but httpx[http2] is not installed, using HTTP/1.1")
+        self.headers: Dict[str, str] = {
+            "User-Agent": user_agent,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9,de;q=0.8",
+            "sec-ch-ua": '"Chromium";v="121", "Not A(Brand";v="99"',
+            "sec-ch-ua-mobile": "?0",
+            "sec-ch-ua-platform": "macOS",
+        }
+        # Per-host overrides, e.g. the user agent a browser clearance is bound to
+        self.host_headers: Dict[str, Dict[str, str]] = {}
 
     def fetch(
         self,
@@ -45,24 +60,221 @@ class HttpClient:
         params: Optional[Dict[str, str]] = None,
         json_body: Optional[Dict] = None,
     ) -> requests.Response:
-        # Manual retry for 429 with exponential backoff
+        return self._send(method, url, headers, params, json_body)
+
+    @contextmanager
+    def stream(self, url: str, headers: Optional[Dict[str, str]] = None) -> Iterator[requests.Response]:
+        """
+        GET ``url`` without reading the body; the caller consumes ``iter_chunks``.
+
+        Goes through the same transport, 429 backoff, breaker and deadline as ``fetch``.
+        """
+        response = self._send("GET", url, headers, None, None, stream=True)
+        try:
+            yield response
+        finally:
+            response.close()
+
+    @staticmethod
+    def iter_chunks(response, chunk_size: int) -> Iterator[bytes]:
+        """Body chunks of a ``stream()`` response from either transport."""
+        if isinstance(response, requests.Response):
+            yield from response.iter_content(chunk_size=chunk_size)
+            return
+        try:
+            yield from response.iter_bytes(chunk_size)
+        except httpx.HTTPError as exc:
+            raise requests.ConnectionError(str(exc)) from exc
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        params: Optional[Dict[str, str]],
+        json_body: Optional[Dict],
+        stream: bool = False,
+    ):
+        host = urlparse(url).netloc
+        breaker = self._admit(host)
+        deadline = self._deadline()
+        # Manual retry for 429 with capped exponential backoff, bounded by the deadline
         delay = 3.0
         max_attempts = 12
         attempt = 0
         while True:
             attempt += 1
-            response = self.session.request(
-                method=method,
-                url=url,
-                headers=headers,
-                params=params,
-                json=json_body,
-                timeout=20,
-            )
+            timeout = self._timeout(url, deadline, attempt)
+            start = time.perf_counter()
+            try:
+                response = self._request(method, url, headers, params, json_body, timeout, stream)
+            except requests.exceptions.RetryError:
+                # The transport exhausted its 5xx retries
+                METRICS.inc("http_5xx_total", host=host)
+                METRICS.inc("fetch_errors_total", host=host)
+                breaker.record_failure("5xx retries exhausted")
+                raise
+            except requests.RequestException as exc:
+                METRICS.inc("fetch_errors_total", host=host)
+                breaker.record_failure(type(exc).__name__)
+                raise
+            finally:
+                METRICS.observe("fetch_seconds", time.perf_counter() - start, host=host)
+            self._record_response(host, response, stream)
             if response.status_code != 429:
-                response.raise_for_status()
+                if response.status_code >= 500:
+                    breaker.record_failure(f"HTTP {response.status_code}")
+                else:
+                    breaker.record_success()
+                if stream and response.status_code >= 400:
+                    response.close()
+                self._raise_for_status(response)
                 return response
+            METRICS.inc("http_429_total", host=host)
+            breaker.record_failure("HTTP 429")
+            if stream:
+                # The 429 body is never read; free the connection before waiting
+                response.close()
+            if breaker.is_open:
+                # Stop hammering the host; the caller defers this URL
+                raise HostUnavailable(host, breaker.retry_in(), "HTTP 429", response=response)
             if attempt >= max_attempts:
-                response.raise_for_status()  # will raise HTTPError with 429
-            time.sleep(delay)
+                self._raise_for_status(response)  # will raise HTTPError with 429
+            wait = min(self._retry_after(response) or delay, self.config.max_backoff)
+            if time.monotonic() + wait >= deadline:
+                METRICS.inc("deadline_exceeded_total", host=host)
+                raise DeadlineExceeded(
+                    f"{url}: still HTTP 429 after {attempt} attempts, next retry would pass the deadline",
+                    response=response,
+                )
+            time.sleep(wait)
+            METRICS.inc("backoff_seconds_total", wait, host=host)
             delay *= 1.8
+
+    def set_cookie(self, name: str, value: str, domain: str, path: str = "/") -> None:
+        """Set a cookie on the transport requests go through (the HTTP/2 client has its own jar)."""
+        self.session.cookies.set(name, value, domain=domain, path=path)
+        if self.http2 is not None:
+            self.http2.cookies.set(name, value, domain=domain, path=path)
+
+    def clear_cookies(self, host: str) -> None:
+        """Drop every cookie that would be sent to ``host`` from both transports."""
+        host = host.split(":")[0]
+        jars = [self.session.cookies]
+        if self.http2 is not None:
+            jars.append(self.http2.cookies.jar)
+        for jar in jars:
+            for cookie in list(jar):
+                domain = cookie.domain.lstrip(".")
+                if host == domain or host.endswith("." + domain):
+                    jar.clear(cookie.domain, cookie.path, cookie.name)
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        params: Optional[Dict[str, str]],
+        json_body: Optional[Dict],
+        timeout: Optional[Tuple[float, float]] = None,
+        stream: bool = False,
+    ):
+        connect_timeout, read_timeout = timeout or self.config.timeout
+        host_headers = self.host_headers.get(urlparse(url).netloc, {})
+        merged_headers = {**self.headers, **host_headers, **(headers or {})}
+        if self.http2 is not None:
+            request = self.http2.build_request(
+                method,
+                url,
+                headers=merged_headers,
+                params=params,
+                json=json_body,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            )
+            return self._send_http2(request, stream)
+        return self.session.request(
+            method=method,
+            url=url,
+            headers=merged_headers,
+            params=params,
+            json=json_body,
+            timeout=(connect_timeout, read_timeout),
+            stream=stream,
+        )
+
+    def _send_http2(self, request, stream: bool):
+        """Send over HTTP/2 with the 5xx retry policy the requests adapter applies (see ``transport``)."""
+        host = urlparse(str(request.url)).netloc
+        retry = 0
+        while True:
+            try:
+                response = self.http2.send(request, stream=stream)
+            except httpx.HTTPError as exc:
+                # Keep the requests exception contract for callers
+                raise requests.ConnectionError(str(exc)) from exc
+            if response.status_code not in RETRY_STATUSES or request.method not in RETRY_METHODS:
+                return response
+            response.close()
+            retry += 1
+            if retry > self.config.retries:
+                raise requests.exceptions.RetryError(
+                    f"{request.url}: HTTP {response.status_code} after {retry} attempts", response=response
+                )
+            METRICS.inc("http_5xx_total", host=host)
+            time.sleep(retry_backoff(self.config, retry))
+
+    def _admit(self, host: str):
+        breaker = self.breakers.get(host)
+        if not breaker.allow():
+            METRICS.inc("circuit_rejections_total", host=host)
+            raise HostUnavailable(host, breaker.retry_in())
+        return breaker
+
+    def _deadline(self) -> float:
+        """Monotonic deadline for one fetch: ``request_deadline``, clipped to the run budget."""
+        deadline = time.monotonic() + self.config.request_deadline
+        budget_left = RUN_BUDGET.remaining()
+        if budget_left is not None:
+            deadline = min(deadline, time.monotonic() + budget_left)
+        return deadline
+
+    def _timeout(self, url: str, deadline: float, attempt: int) -> Tuple[float, float]:
+        """Connect/read timeouts for the next attempt, never reaching past ``deadline``."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            METRICS.inc("deadline_exceeded_total", host=urlparse(url).netloc)
+            raise DeadlineExceeded(f"{url}: deadline reached before attempt {attempt}")
+        return (min(self.config.connect_timeout, remaining), min(self.config.read_timeout, remaining))
+
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        value = (response.headers.get("Retry-After") or "").strip()
+        if not value:
+            return None
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _raise_for_status(response) -> None:
+        if isinstance(response, requests.Response):
+            response.raise_for_status()
+        elif response.status_code >= 400:
+            raise requests.HTTPError(f"{response.status_code} Error for url: {response.url}", response=response)
+
+    def _record_response(self, host: str, response, stream: bool = False) -> None:
+        METRICS.inc("responses_total", host=host, status=str(response.status_code))
+        if not stream:
+            # Streamed bodies are counted by their consumer, which may stop early
+            METRICS.inc("bytes_downloaded_total", len(response.content), host=host)
+        # 5xx responses retried transparently by urllib3 only show up in its history
+        retries = getattr(getattr(response, "raw", None), "retries", None)
+        history = getattr(retries, "history", None) or ()
+        retried_5xx = sum(1 for entry in history if entry.status and entry.status >= 500)
+        if response.status_code >= 500:
+            retried_5xx += 1
+        if retried_5xx:
+            METRICS.inc("http_5xx_total", retried_5xx, host=host)
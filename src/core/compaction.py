@@ -0,0 +1,151 @@
+"""
+Bounded-memory compaction of product shards into one products file.
+
+Inputs are read oldest first (the current output, then shards in name order,
+which is write-time order). Rows are buffered up to ``memory_rows``, reduced
+to the newest row per product key, sorted by key and spilled to a run file.
+Runs are then k-way merged with ``heapq.merge``, at most ``fan_in`` at a time;
+for equal keys the row from the later run (newer input) wins. Memory use is
+bounded by ``memory_rows`` plus one buffered line per open run.
+"""
+import heapq
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+from .metrics import METRICS
+from .writer import HEADER, open_locked
+
+
+FIELD_COUNT = HEADER.count("|") + 1
+
+
+def product_key(row: str) -> Optional[str]:
+    """Barcode, or brand + name for products without one; None for malformed rows."""
+    fields = row.split("|")
+    if len(fields) != FIELD_COUNT:
+        return None
+    barcode = "".join(fields[0].split())
+    if barcode:
+        return barcode
+    # "~" sorts after digits, keeping barcode-less products together at the end
+    return "~" + " ".join(f"{fields[5]}|{fields[1]}".lower().split())
+
+
+def iter_rows(paths: Iterable[Path]) -> Iterator[Tuple[str, str]]:
+    """``(key, row)`` for every well-formed data row of ``paths``, in order."""
+    for path in paths:
+        with path.open("r", encoding="utf-8") as handle:
+            for number, line in enumerate(handle, 1):
+                row = line.rstrip("\n")
+                if not row or (number == 1 and row.startswith("barcode|")):
+                    continue
+                key = product_key(row)
+                if key is None:
+                    METRICS.inc("rows_malformed_total")
+                    print(f"Skipping {path}:{number}: expected {FIELD_COUNT} fields")
+                    continue
+                yield key, row
+
+
+class Compactor:
+    """External sort-merge of shards, keeping the newest row per product key."""
+
+    def __init__(self, memory_rows: int = 200_000, fan_in: int = 64, tmp_dir: Optional[Path] = None) -> None:
+        self.memory_rows = memory_rows
+        self.fan_in = max(fan_in, 2)
+        self.tmp_dir = tmp_dir
+        self.rows_read = 0
+        self.runs_written = 0
+
+    def compact(self, shards: List[Path], output: Path) -> int:
+        """Merge ``output`` and ``shards`` into ``output``; returns the number of products."""
+        with open_locked(output), tempfile.TemporaryDirectory(
+            prefix="compact-", dir=self.tmp_dir
+        ) as work_dir:
+            inputs = ([output] if output.stat().st_size else []) + shards
+            tmp_path = output.with_name(output.name + ".compact.tmp")
+            with tmp_path.open("w", encoding="utf-8") as handle:
+                handle.write(f"{HEADER}\n")
+                count = 0
+                for _, row in self.sorted_rows(inputs, Path(work_dir)):
+                    handle.write(f"{row}\n")
+                    count += 1
+                handle.flush()
+                os.fsync(handle.fileno())
+            # Replaced while still locked: waiting writers reopen the new file
+            os.replace(tmp_path, output)
+        return count
+
+    def sorted_rows(self, inputs: List[Path], work_dir: Path) -> Iterator[Tuple[str, str]]:
+        """Newest ``(key, row)`` per product key of ``inputs`` (oldest first), in key order."""
+        return self.sort_keyed(iter_rows(inputs), work_dir)
+
+    def sort_keyed(self, rows: Iterable[Tuple[str, str]], work_dir: Path) -> Iterator[Tuple[str, str]]:
+        """
+        External sort of ``(key, row)`` pairs, keeping the last row per key.
+
+        Keys must not contain tabs and rows must not contain newlines; runs
+        are spilled to ``work_dir``, which must outlive the returned iterator.
+        """
+        runs = self._spill(iter(rows), work_dir)
+        while len(runs) > self.fan_in:
+            runs = [
+                self._merge_to_run(runs[start:start + self.fan_in], work_dir)
+                for start in range(0, len(runs), self.fan_in)
+            ]
+        return self._newest(runs)
+
+    def _spill(self, rows: Iterator[Tuple[str, str]], work_dir: Path) -> List[Path]:
+        runs: List[Path] = []
+        newest: dict = {}
+        for key, row in rows:
+            self.rows_read += 1
+            newest[key] = row  # later input wins
+            if len(newest) >= self.memory_rows:
+                runs.append(self._write_run(newest, work_dir))
+                newest = {}
+        if newest or not runs:
+            runs.append(self._write_run(newest, work_dir))
+        return runs
+
+    def _write_run(self, newest: dict, work_dir: Path) -> Path:
+        path = work_dir / f"run-{self.runs_written:06d}.txt"
+        self.runs_written += 1
+        with path.open("w", encoding="utf-8") as handle:
+            for key in sorted(newest):
+                handle.write(f"{key}\t{newest[key]}\n")
+        return path
+
+    def _merge_to_run(self, runs: List[Path], work_dir: Path) -> Path:
+        path = work_dir / f"run-{self.runs_written:06d}.txt"
+        self.runs_written += 1
+        with path.open("w", encoding="utf-8") as handle:
+            for key, row in self._newest(runs):
+                handle.write(f"{key}\t{row}\n")
+        for run in runs:
+            run.unlink()
+        return path
+
+    @staticmethod
+    def _newest(runs: List[Path]) -> Iterator[Tuple[str, str]]:
+        """Merge sorted runs (oldest first); yield the newest ``(key, row)`` per key."""
+        handles = [run.open("r", encoding="utf-8") for run in runs]
+        try:
+            streams = [_keyed(handle, age) for age, handle in enumerate(handles)]
+            current_key, current_line = None, None
+            # Ties on key are ordered by run age, so the last line of a group is the newest
+            for key, _, line in heapq.merge(*streams):
+                if key != current_key and current_line is not None:
+                    yield current_key, current_line.rstrip("\n").partition("\t")[2]
+                current_key, current_line = key, line
+            if current_line is not None:
+                yield current_key, current_line.rstrip("\n").partition("\t")[2]
+        finally:
+            for handle in handles:
+                handle.close()
+
+
+def _keyed(handle: TextIO, age: int) -> Iterator[Tuple[str, int, str]]:
+    for line in handle:
+        yield line.partition("\t")[0], age, line
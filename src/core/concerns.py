@@ -0,0 +1,170 @@
+"""
+Rule- and lexicon-based skin concern tagging.
+
+Every lexicon phrase (marketing terms in English and German, plus INCI
+ingredients that signal a concern) is compiled into one regular expression,
+factored as a character trie so matching costs one pass per field. A match
+adds the phrase's weight, times the field weight (name > description =
+ingredients), to each concern the phrase signals. Each distinct phrase counts
+once per field, and concerns whose score reaches ``threshold`` are tagged,
+highest score first.
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .models import Product
+
+
+# concern -> phrase -> weight. Phrases are lowercase; a plural "s"/"es" is matched automatically.
+# Words that are ambiguous outside skin care ("shine", "dull", "glow", "sensitive") only count
+# with a skin context ("dull skin"). A weight below 2 / FIELD_WEIGHTS["name"] never tags on its own.
+LEXICON: Dict[str, Dict[str, float]] = {
+    "acne": {
+        "acne": 2, "acne-prone": 2, "blemish": 2, "blemish-prone": 2, "breakout": 2, "pimple": 2,
+        "blackhead": 2, "whitehead": 2, "comedone": 2, "clogged pores": 2, "spot treatment": 2,
+        "akne": 2, "unreinheit": 2, "unreine haut": 2, "pickel": 2, "mitesser": 2,
+        "salicylic acid": 1.5, "bha": 1.5, "benzoyl peroxide": 2, "adapalene": 2, "azelaic acid": 1,
+        "zinc pca": 1, "tea tree": 1, "melaleuca alternifolia": 1, "sulfur": 1, "sulphur": 1,
+    },
+    "hydration": {
+        "hydrating": 2, "hydration": 2, "hydrate": 2, "moisturising": 2, "moisturizing": 2,
+        "moisturiser": 2, "moisturizer": 2, "moisture": 2, "dehydrated": 2, "dry skin": 2, "dryness": 2,
+        "feuchtigkeit": 2, "feuchtigkeitsspendend": 2, "trockene haut": 2,
+        "hyaluronic acid": 1.5, "sodium hyaluronate": 1.5, "polyglutamic acid": 1.5, "squalane": 1,
+        "urea": 1, "glycerin": 0.5, "panthenol": 0.5, "betaine": 0.5,
+    },
+    "anti-ageing": {
+        "anti-ageing": 2, "anti-aging": 2, "wrinkle": 2, "fine lines": 2, "firming": 2, "elasticity": 2,
+        "ageing": 1, "aging": 1, "mature skin": 2, "lifting": 1, "anti-falten": 2, "falten": 2,
+        "reife haut": 2, "straffend": 2,
+        "retinol": 2, "retinal": 2, "retinaldehyde": 2, "retinyl palmitate": 1.5, "bakuchiol": 2,
+        "peptide": 1.5, "palmitoyl tripeptide": 1.5, "palmitoyl tetrapeptide": 1.5, "matrixyl": 1.5,
+        "collagen": 1, "adenosine": 1, "ubiquinone": 1, "coenzyme q10": 1,
+    },
+    "pigmentation": {
+        "pigmentation": 2, "hyperpigmentation": 2, "dark spot": 2, "age spot": 2, "sun spot": 2,
+        "uneven skin tone": 2, "uneven tone": 2, "discoloration": 2, "discolouration": 2, "melasma": 2,
+        "pigmentflecken": 2, "altersflecken": 2, "pigmentstörung": 2,
+        "tranexamic acid": 2, "alpha arbutin": 2, "arbutin": 1.5, "kojic acid": 2, "ascorbic acid": 1,
+        "vitamin c": 1, "glycyrrhiza glabra": 1, "licorice": 1, "niacinamide": 1,
+    },
+    "sensitivity": {
+        "sensitive skin": 2, "sensitive complexion": 2, "sensitised skin": 2, "sensitized skin": 2,
+        "soothing": 2, "calming": 2, "irritation": 2, "irritated": 2,
+        "redness": 2, "rosacea": 2, "reactive skin": 2, "empfindliche haut": 2, "beruhigend": 2, "rötung": 2,
+        "centella asiatica": 1.5, "madecassoside": 1.5, "allantoin": 1, "bisabolol": 1, "avena sativa": 1,
+        "colloidal oatmeal": 1.5,
+    },
+    "dullness": {
+        "dull skin": 2, "dull complexion": 2, "dull-looking skin": 2, "dullness": 1, "skin radiance": 2,
+        "radiant skin": 2, "radiant complexion": 2, "glowing skin": 2, "skin glow": 2, "brightening": 1,
+        "fahle haut": 2, "strahlende haut": 2, "strahlender teint": 2, "fahler teint": 2,
+        "glycolic acid": 1.5, "lactic acid": 1, "mandelic acid": 1, "aha": 1.5, "ascorbic acid": 1,
+    },
+    "oiliness": {
+        "oily skin": 2, "excess oil": 2, "shine control": 2, "oil control": 2, "shiny skin": 2,
+        "mattifying": 2, "mattify": 2, "sebum": 2,
+        "enlarged pores": 2, "pores": 1.5, "fettige haut": 2, "mattierend": 2, "poren": 1.5,
+        "zinc pca": 1, "kaolin": 1, "bentonite": 1, "niacinamide": 0.5, "salicylic acid": 0.5,
+    },
+    "dark circles": {
+        "dark circles": 2, "puffiness": 2, "puffy eyes": 2, "eye bags": 2, "augenringe": 2,
+        "caffeine": 1,
+    },
+    "sun protection": {
+        "spf": 2, "sunscreen": 2, "sun protection": 2, "uv protection": 2, "uva": 1, "uvb": 1,
+        "sonnenschutz": 2, "lichtschutzfaktor": 2,
+        "zinc oxide": 1, "butyl methoxydibenzoylmethane": 1.5, "avobenzone": 1.5, "octocrylene": 1.5,
+        "ethylhexyl methoxycinnamate": 1.5, "homosalate": 1.5,
+    },
+}
+
+FIELD_WEIGHTS = {"name": 1.5, "description": 1.0, "ingredients": 1.0}
+
+
+def trie_regex(phrases: Iterable[str]) -> str:
+    """Alternation of ``phrases`` factored by common prefix (``a(?:cne|ha)``), so the regex engine never rescans."""
+    root: dict = {}
+    for phrase in phrases:
+        node = root
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        if "" in node:
+            return "(?:" + "|".join(alternatives) + ")?"
+        return alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+
+    return build(root)
+
+
+class ConcernTagger:
+    """Compiled lexicon; ``tag(product)`` returns the product's concerns."""
+
+    def __init__(
+        self,
+        lexicon: Optional[Dict[str, Dict[str, float]]] = None,
+        threshold: float = 2.0,
+        field_weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.field_weights = FIELD_WEIGHTS if field_weights is None else field_weights
+        self.signals: Dict[str, List[Tuple[str, float]]] = {}
+        for concern, phrases in (LEXICON if lexicon is None else lexicon).items():
+            for phrase, weight in phrases.items():
+                self.signals.setdefault(phrase.lower(), []).append((concern, weight))
+        # Group 1 is the lexicon phrase; an optional plural suffix may follow it
+        self.pattern = re.compile(r"(?<!\w)(" + trie_regex(self.signals) + r")(?:e?s)?(?!\w)")
+
+    def scores(self, product: Product) -> Dict[str, float]:
+        ingredients = product.ingredients
+        if isinstance(ingredients, list):
+            ingredients = ", ".join(ingredients)
+        scores: Dict[str, float] = {}
+        for field, text in (
+            ("name", product.product_name),
+            ("description", product.description),
+            ("ingredients", ingredients),
+        ):
+            if not text:
+                continue
+            multiplier = self.field_weights[field]
+            for phrase in set(self.pattern.findall(text.lower())):
+                for concern, weight in self.signals[phrase]:
+                    scores[concern] = scores.get(concern, 0.0) + weight * multiplier
+        return scores
+
+    def tag(self, product: Product) -> List[str]:
+        scores = self.scores(product)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [concern for concern, score in ranked if score >= self.threshold]
+
+    def tag_batch(self, products: List[Product], overwrite: bool = False) -> int:
+        """Fill ``concerns`` in place (only empty ones unless ``overwrite``); returns how many got concerns."""
+        tagged = 0
+        for product in products:
+            if product.concerns and not overwrite:
+                continue
+            product.concerns = self.tag(product)
+            tagged += bool(product.concerns)
+        return tagged
+
+    def tag_stream(
+        self, products: Iterable[Product], batch_size: int = 1000, overwrite: bool = False
+    ) -> Iterator[Product]:
+        """Pipeline stage: tag ``products`` in batches as they stream past."""
+        batch: List[Product] = []
+        for product in products:
+            batch.append(product)
+            if len(batch) >= batch_size:
+                self.tag_batch(batch, overwrite)
+                yield from batch
+                batch = []
+        self.tag_batch(batch, overwrite)
+        yield from batch
+
+
+CONCERNS = ConcernTagger()
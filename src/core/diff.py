@@ -0,0 +1,144 @@
+"""
+Streaming diff of two products snapshots into a change feed.
+
+Rows are matched on ``compaction.product_key`` (barcode, else brand + name).
+When a snapshot repeats a key (products files are append-only), its last row
+is the current one. Two strategies produce the same events:
+
+* hash join: both snapshots are memory-mapped with ``ProductFile``, and only a
+  ``key -> row number`` dict per side is held in memory. Events follow the new
+  snapshot's order, and removals come last;
+* sorted merge: each snapshot is reduced and sorted by key with the
+  compactor's external sort (bounded memory, spilled runs), and the two
+  sorted streams are merge-joined. Events come out in key order.
+
+``mode="auto"`` uses the hash join while both snapshots together fit in
+``memory_rows`` rows. Unchanged rows are detected by comparing raw row
+bytes, and only changed rows are split into fields.
+"""
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from .compaction import Compactor, product_key
+from .metrics import METRICS
+from .reader import ProductFile
+from .writer import HEADER
+
+
+FIELDS = HEADER.split("|")
+JSON_FIELDS = {"ingredients", "concerns"}
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+def record(row: str) -> Dict[str, object]:
+    """Row as a field dict, with JSON-array fields decoded."""
+    values = dict(zip(FIELDS, row.split("|")))
+    for name in JSON_FIELDS:
+        value = values.get(name, "")
+        if value.startswith("["):
+            try:
+                values[name] = json.loads(value)
+            except ValueError:
+                pass
+    return values
+
+
+def changed_fields(old_row: str, new_row: str) -> Dict[str, List[object]]:
+    """``{field: [old, new]}`` for the fields that differ."""
+    old, new = record(old_row), record(new_row)
+    return {name: [old[name], new[name]] for name in FIELDS if old.get(name) != new.get(name)}
+
+
+class SnapshotDiff:
+    """Diff an old and a new products snapshot; ``diff()`` yields change events."""
+
+    def __init__(self, memory_rows: int = 2_000_000, fan_in: int = 64, tmp_dir: Optional[Path] = None) -> None:
+        self.memory_rows = memory_rows
+        self.fan_in = fan_in
+        self.tmp_dir = tmp_dir
+        self.counts: Dict[str, int] = {ADDED: 0, REMOVED: 0, CHANGED: 0, "unchanged": 0}
+
+    def diff(self, old: Path, new: Path, mode: str = "auto") -> Iterator[Dict[str, object]]:
+        if mode == "auto":
+            with ProductFile(old, final=True) as old_file, ProductFile(new, final=True) as new_file:
+                mode = "hash" if len(old_file) + len(new_file) <= self.memory_rows else "merge"
+        if mode == "hash":
+            events = self._hash_join(old, new)
+        elif mode == "merge":
+            events = self._merge_join(old, new)
+        else:
+            raise ValueError(f"Unknown diff mode: {mode}")
+        for event in events:
+            METRICS.inc("diff_events_total", op=str(event["op"]))
+            yield event
+
+    def _event(self, op: str, key: str, old_row: Optional[str], new_row: Optional[str]) -> Dict[str, object]:
+        self.counts[op] += 1
+        if op == ADDED:
+            return {"op": op, "key": key, "record": record(new_row)}
+        if op == REMOVED:
+            return {"op": op, "key": key, "record": record(old_row)}
+        return {"op": op, "key": key, "changes": changed_fields(old_row, new_row), "record": record(new_row)}
+
+    # -- hash join ---------------------------------------------------------------
+
+    def _hash_join(self, old: Path, new: Path) -> Iterator[Dict[str, object]]:
+        with ProductFile(old, final=True) as old_file, ProductFile(new, final=True) as new_file:
+            old_rows = _key_index(old_file)
+            new_rows = _key_index(new_file)
+            for key, row in new_rows.items():
+                new_line = new_file.line(row)
+                old_row = old_rows.pop(key, None)
+                if old_row is None:
+                    yield self._event(ADDED, key, None, new_line.decode("utf-8"))
+                    continue
+                old_line = old_file.line(old_row)
+                if old_line == new_line:
+                    self.counts["unchanged"] += 1
+                    continue
+                yield self._event(CHANGED, key, old_line.decode("utf-8"), new_line.decode("utf-8"))
+            for key, row in old_rows.items():
+                yield self._event(REMOVED, key, old_file.line(row).decode("utf-8"), None)
+
+    # -- sorted merge ------------------------------------------------------------
+
+    def _merge_join(self, old: Path, new: Path) -> Iterator[Dict[str, object]]:
+        with tempfile.TemporaryDirectory(prefix="diff-", dir=self.tmp_dir) as work_dir:
+            old_dir, new_dir = Path(work_dir) / "old", Path(work_dir) / "new"
+            old_dir.mkdir()
+            new_dir.mkdir()
+            # Half the row budget per side
+            compactor = Compactor(max(self.memory_rows // 2, 1), self.fan_in)
+            old_rows = compactor.sorted_rows([old], old_dir)
+            new_rows = compactor.sorted_rows([new], new_dir)
+            old_item, new_item = next(old_rows, None), next(new_rows, None)
+            while old_item is not None or new_item is not None:
+                if new_item is None or (old_item is not None and old_item[0] < new_item[0]):
+                    yield self._event(REMOVED, old_item[0], old_item[1], None)
+                    old_item = next(old_rows, None)
+                elif old_item is None or new_item[0] < old_item[0]:
+                    yield self._event(ADDED, new_item[0], None, new_item[1])
+                    new_item = next(new_rows, None)
+                else:
+                    if old_item[1] == new_item[1]:
+                        self.counts["unchanged"] += 1
+                    else:
+                        yield self._event(CHANGED, new_item[0], old_item[1], new_item[1])
+                    old_item, new_item = next(old_rows, None), next(new_rows, None)
+
+
+def _key_index(products: ProductFile) -> Dict[str, int]:
+    """``key -> last row number`` for the well-formed rows of ``products``."""
+    rows: Dict[str, int] = {}
+    for number, line in enumerate(products.lines()):
+        key = product_key(line.decode("utf-8"))
+        if key is None:
+            METRICS.inc("rows_malformed_total")
+            continue
+        rows.pop(key, None)  # re-insert so the dict follows the row's latest position
+        rows[key] = number
+    return rows
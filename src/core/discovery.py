@@ -0,0 +1,147 @@
+"""
+Concurrent product URL discovery from listing pages.
+
+``ListingCrawler`` walks brand/category listing pages and their pagination
+on a bounded thread pool. A site supplies ``parse(url, html) -> Listing``,
+which returns the product URLs on the page, keyed by product ID, plus the
+pagination pages and sub-listings to visit next. Pagination keeps the depth
+of its page; sub-listings are one level deeper, up to ``max_depth``.
+
+Products are deduplicated by ID rather than URL string (tracking parameters,
+variant slugs and relative/absolute forms all map to one product). New
+product URLs are appended to the output file as each page is parsed, and
+the IDs already in that file are loaded first, so an interrupted or repeated
+run only adds products it has not seen before.
+"""
+import re
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urldefrag
+from .metrics import METRICS
+
+
+def load_urls(file_path: Path) -> List[str]:
+    """Non-blank lines of a URL file (the format ``ListingCrawler`` writes)."""
+    with file_path.open("r", encoding="utf-8") as handle:
+        return [line.strip() for line in handle if line.strip()]
+
+
+@dataclass
+class Listing:
+    products: Dict[str, str] = field(default_factory=dict)  # product ID -> canonical URL
+    pages: List[str] = field(default_factory=list)  # pagination of the same listing
+    listings: List[str] = field(default_factory=list)  # brand/category pages linked from it
+
+
+class ListingCrawler:
+    """Breadth-first, concurrent walk of listing pages that appends new product URLs to ``output``."""
+
+    def __init__(
+        self,
+        fetch: Callable[[str], str],
+        parse: Callable[[str, str], Listing],
+        output: Path,
+        product_id: Callable[[str], Optional[str]],
+        workers: int = 4,
+        max_pages: int = 1000,
+        max_depth: int = 1,
+        delay: float = 1.0,
+    ) -> None:
+        self.fetch = fetch
+        self.parse = parse
+        self.output = output
+        self.product_id = product_id
+        self.workers = max(workers, 1)
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.delay = delay
+        self.seen_products: Set[str] = set()
+        self.seen_pages: Set[str] = set()
+        self.pages_fetched = 0
+        self.pages_failed = 0
+        self.products_added = 0
+
+    def run(self, seeds: Iterable[str]) -> int:
+        """Crawl from ``seeds``; returns how many new product URLs were written."""
+        self._load_known()
+        frontier: Deque[Tuple[str, int]] = deque()
+        for seed in seeds:
+            self._enqueue(frontier, seed, 0)
+        in_flight: Dict[Future, Tuple[str, int]] = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="discovery") as executor, \
+                self.output.open("a", encoding="utf-8") as handle:
+            while frontier or in_flight:
+                while frontier and len(in_flight) < self.workers and self.pages_fetched < self.max_pages:
+                    url, depth = frontier.popleft()
+                    self.pages_fetched += 1
+                    in_flight[executor.submit(self._visit, url)] = (url, depth)
+                if not in_flight:
+                    break  # page budget spent
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    try:
+                        listing = future.result()
+                    except Exception as exc:
+                        self.pages_failed += 1
+                        METRICS.inc("discovery_pages_total", outcome="failed")
+                        print(f"  listing {url} failed: {exc}")
+                        continue
+                    METRICS.inc("discovery_pages_total", outcome="ok")
+                    added = self._write_new(listing.products, handle)
+                    print(f"  {url}: {len(listing.products)} products ({added} new)")
+                    for page in listing.pages:
+                        self._enqueue(frontier, page, depth)
+                    if depth < self.max_depth:
+                        for child in listing.listings:
+                            self._enqueue(frontier, child, depth + 1)
+        return self.products_added
+
+    def _visit(self, url: str) -> Listing:
+        try:
+            return self.parse(url, self.fetch(url))
+        finally:
+            if self.delay:
+                time.sleep(self.delay)  # per worker, so at most ``workers`` requests per delay
+
+    def _enqueue(self, frontier: Deque[Tuple[str, int]], url: str, depth: int) -> None:
+        url = urldefrag(url)[0]
+        if url in self.seen_pages:
+            return
+        self.seen_pages.add(url)
+        frontier.append((url, depth))
+
+    def _write_new(self, products: Dict[str, str], handle) -> int:
+        added = 0
+        for product_id, url in products.items():
+            if product_id in self.seen_products:
+                continue
+            self.seen_products.add(product_id)
+            handle.write(f"{url}\n")
+            added += 1
+        # Flushed per page: the file is usable (and resumable) while the crawl runs
+        handle.flush()
+        self.products_added += added
+        METRICS.inc("discovery_products_total", added)
+        return added
+
+    def _load_known(self) -> None:
+        if not self.output.exists():
+            return
+        with self.output.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                product_id = self.product_id(line.strip())
+                if product_id:
+                    self.seen_products.add(product_id)
+
+
+def links(html: str, pattern: "re.Pattern") -> Iterable[str]:
+    """Group 1 of every ``pattern`` match, with JSON-escaped slashes (``\\u002F``, ``\\/``) decoded."""
+    if "\\u002F" in html or "\\/" in html:
+        html = html.replace("\\u002F", "/").replace("\\/", "/")
+    for match in pattern.finditer(html):
+        yield match.group(1)
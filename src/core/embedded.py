@@ -0,0 +1,124 @@
+"""
+Find and decode JSON state embedded in raw HTML without building a DOM.
+
+Pages ship their data as ``window.X = {...}`` assignments, ``<script
+id="__APOLLO_STATE__">`` / ``__NEXT_DATA__`` blobs and JSON-LD. Instead of
+walking every ``<script>`` tag, the helpers here jump to the marker in the
+raw HTML and let ``json.JSONDecoder.raw_decode`` consume exactly one JSON
+value from there (so braces inside strings are handled by the real JSON
+parser). ``find_key`` decodes only the values of one key inside a region,
+which avoids materializing multi-megabyte state objects.
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Any, Iterator, Optional, Tuple
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+_LD_JSON_OPEN = re.compile(
+    r"<script[^>]*type\s*=\s*[\"']application/ld\+json[\"'][^>]*>", re.IGNORECASE
+)
+
+
+def _decode_at(text: str, pos: int, end: Optional[int] = None) -> Tuple[Any, int]:
+    """Decode one JSON value starting at ``pos`` (leading whitespace allowed)."""
+    pos = _WHITESPACE.match(text, pos).end()
+    if end is not None and pos >= end:
+        raise ValueError("no JSON value before end of region")
+    return _DECODER.raw_decode(text, pos)
+
+
+@lru_cache(maxsize=64)
+def _assignment_pattern(name: str) -> "re.Pattern":
+    return re.compile(re.escape(name) + r"\s*=\s*(?!=)")
+
+
+def find_assignment(html: str, name: str) -> Optional[Any]:
+    """Decode the value of the first ``name = <json>`` assignment (e.g. ``window.SwymProductInfo.product``)."""
+    for match in _assignment_pattern(name).finditer(html):
+        try:
+            value, _ = _decode_at(html, match.end())
+        except ValueError:
+            continue
+        return value
+    return None
+
+
+@lru_cache(maxsize=64)
+def _script_id_pattern(script_id: str) -> "re.Pattern":
+    return re.compile(r"<script[^>]*\bid\s*=\s*[\"']" + re.escape(script_id) + r"[\"'][^>]*>", re.IGNORECASE)
+
+
+def script_span(html: str, script_id: str) -> Optional[Tuple[int, int]]:
+    """Return the ``(start, end)`` offsets of the body of ``<script id=script_id>``."""
+    match = _script_id_pattern(script_id).search(html)
+    if not match:
+        return None
+    end = html.find("</script", match.end())
+    return match.end(), (end if end != -1 else len(html))
+
+
+def find_script_json(html: str, script_id: str) -> Optional[Any]:
+    """Decode the JSON body of ``<script id=script_id>`` (``__APOLLO_STATE__``, ``__NEXT_DATA__``)."""
+    span = script_span(html, script_id)
+    if not span:
+        return None
+    try:
+        value, _ = _decode_at(html, span[0], span[1])
+    except ValueError:
+        return None
+    return value
+
+
+def find_next_data(html: str) -> Optional[Any]:
+    return find_script_json(html, "__NEXT_DATA__")
+
+
+def iter_ld_json(html: str) -> Iterator[dict]:
+    """Yield every JSON-LD object on the page, flattening top-level arrays and ``@graph``."""
+    for match in _LD_JSON_OPEN.finditer(html):
+        end = html.find("</script", match.end())
+        try:
+            value, _ = _decode_at(html, match.end(), end if end != -1 else None)
+        except ValueError:
+            continue
+        items = value if isinstance(value, list) else [value]
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            graph = item.get("@graph")
+            if isinstance(graph, list):
+                yield from (entry for entry in graph if isinstance(entry, dict))
+            else:
+                yield item
+
+
+@lru_cache(maxsize=256)
+def _key_pattern(key: str) -> "re.Pattern":
+    return re.compile(r'(?<!\\)"' + re.escape(key) + r'"\s*:')
+
+
+def find_key(text: str, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[Any]:
+    """
+    Lazily yield the values of ``"key": <json>`` pairs inside ``text[start:end]``.
+
+    Only the matched values are decoded, so looking up one field of a large
+    state blob costs a regex scan plus one small ``raw_decode``.
+    """
+    end = len(text) if end is None else end
+    for match in _key_pattern(key).finditer(text, start, end):
+        try:
+            value, _ = _decode_at(text, match.end(), end)
+        except ValueError:
+            continue
+        yield value
+
+
+def find_first_key(text: str, keys: Tuple[str, ...], start: int = 0, end: Optional[int] = None) -> Any:
+    """Return the first non-empty value among ``keys`` (checked in order), or None."""
+    for key in keys:
+        for value in find_key(text, key, start, end):
+            if value not in (None, "", [], {}):
+                return value
+    return None
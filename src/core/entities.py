@@ -0,0 +1,369 @@
+"""
+Resolve the same product scraped from different sites into one entity.
+
+Records are matched in a single streaming pass:
+
+1. by barcode - GTIN-8/12/13/14 normalized to GTIN-13 and checksum-validated,
+   looked up in a hash index (in memory, or SQLite when it must spill to disk);
+2. otherwise by a blocked fuzzy match - candidates come from a token index
+   inside the record's normalized-brand block (rarest tokens first), and are
+   scored by character-trigram Jaccard on the normalized name. Differing
+   pack sizes or conflicting barcodes never match.
+
+Clusters are tracked with union-find so a record can join two clusters that
+were created separately (e.g. a barcode hit on one and a name hit on another).
+``GoldenRecords`` then folds each cluster into one record with per-field
+provenance. Cluster members are external-sorted by entity on disk (the
+compactor's sort), so only one entity's members are in memory at a time.
+"""
+import json
+import re
+import sqlite3
+import tempfile
+import unicodedata
+from array import array
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from .compaction import Compactor
+from .models import Product
+
+
+GOLDEN_FIELDS = ("barcode", "product_name", "description", "ingredients", "image", "brand_name", "category", "concerns")
+
+# For these, a longer value from an equally preferred source wins
+LONG_FIELDS = {"description", "ingredients", "concerns"}
+
+STOPWORDS = {
+    "the", "and", "for", "with", "of", "a", "de", "la", "le", "et", "und", "mit", "fur", "der", "die", "das",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_SIZE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(fl\.?\s*oz|ml|l|mg|g|kg|oz)\b")
+_SIZE_UNITS = {"ml": ("ml", 1), "l": ("ml", 1000), "mg": ("g", 0.001), "g": ("g", 1), "kg": ("g", 1000), "oz": ("oz", 1)}
+
+
+def gtin_check_digit(body: str) -> int:
+    """GS1 mod-10 check digit for the digits before the check digit."""
+    total = sum(int(digit) * (3 if index % 2 == 0 else 1) for index, digit in enumerate(reversed(body)))
+    return (10 - total % 10) % 10
+
+
+def normalize_gtin(raw: str) -> Optional[str]:
+    """
+    Return ``raw`` as a checksum-valid GTIN-13, or None.
+
+    EAN-8 and UPC-A are left-padded with zeros (which keeps the check digit
+    valid); GTIN-14 is accepted only with indicator digit 0 (a consumer unit).
+    """
+    digits = re.sub(r"\D", "", raw or "")
+    if len(digits) not in (8, 12, 13, 14):
+        return None
+    if len(digits) == 14:
+        if digits[0] != "0":
+            return None
+        digits = digits[1:]
+    digits = digits.zfill(13)
+    if not digits.strip("0") or gtin_check_digit(digits[:-1]) != int(digits[-1]):
+        return None
+    return digits
+
+
+def fold(text: str) -> str:
+    """Lowercase, strip accents and collapse everything but letters/digits to single spaces."""
+    text = text or ""
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+@lru_cache(maxsize=65536)
+def normalize_brand(brand: str) -> str:
+    folded = fold(brand)
+    if folded.startswith("the "):
+        folded = folded[4:]
+    return folded.replace(" ", "")
+
+
+def parse_size(name: str) -> str:
+    """``"Cleanser 236 ml"`` -> ``"236ml"``; empty when no pack size is given."""
+    match = _SIZE.search((name or "").lower())
+    if not match:
+        return ""
+    unit, factor = _SIZE_UNITS.get(re.sub(r"\W", "", match.group(2)).replace("fl", ""), ("", 1))
+    value = float(match.group(1).replace(",", ".")) * factor
+    return f"{value:g}{unit}"
+
+
+def name_tokens(name: str, brand_key: str) -> List[str]:
+    """Name tokens without the brand, pack size and stopwords."""
+    folded = fold(_SIZE.sub(" ", (name or "").lower()))
+    brand_tokens = set(fold(brand_key).split()) | {brand_key}
+    return [
+        token
+        for token in folded.split()
+        if token not in STOPWORDS and token not in brand_tokens and not token.isdigit()
+    ]
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(left: str, right: str) -> float:
+    a, b = trigrams(left), trigrams(right)
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class BarcodeIndex:
+    """In-memory GTIN-13 -> cluster id index."""
+
+    def __init__(self) -> None:
+        self._index: Dict[str, int] = {}
+
+    def get(self, gtin: str) -> Optional[int]:
+        return self._index.get(gtin)
+
+    def put(self, gtin: str, cluster: int) -> None:
+        self._index[gtin] = cluster
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBarcodeIndex(BarcodeIndex):
+    """On-disk variant for runs whose barcode set does not fit in memory. Cluster ids are per run."""
+
+    def __init__(self, path: Path, commit_every: int = 10_000) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")  # rebuilt on every run anyway
+        self.conn.execute("DROP TABLE IF EXISTS gtins")
+        self.conn.execute("CREATE TABLE gtins (gtin TEXT PRIMARY KEY, cluster INTEGER NOT NULL) WITHOUT ROWID")
+        self.commit_every = commit_every
+        self._pending = 0
+
+    def get(self, gtin: str) -> Optional[int]:
+        row = self.conn.execute("SELECT cluster FROM gtins WHERE gtin = ?", (gtin,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, gtin: str, cluster: int) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO gtins (gtin, cluster) VALUES (?, ?)", (gtin, cluster))
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+
+class UnionFind:
+    def __init__(self) -> None:
+        self.parent = array("q")
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]  # path halving
+            item = parent[item]
+        return item
+
+    def union(self, left: int, right: int) -> int:
+        left, right = self.find(left), self.find(right)
+        if left != right:
+            # Keep the older id as root so entity ids follow first appearance
+            left, right = min(left, right), max(left, right)
+            self.parent[right] = left
+        return left
+
+
+class EntityResolver:
+    """
+    Assign each incoming product to an entity (cluster) id.
+
+    Memory per cluster is one normalized name, its pack size, a few token
+    postings and (if any) its barcode, so millions of rows fit comfortably;
+    pass an ``SQLiteBarcodeIndex`` to move the barcode index to disk.
+    """
+
+    def __init__(
+        self,
+        barcode_index: Optional[BarcodeIndex] = None,
+        threshold: float = 0.7,
+        probe_tokens: int = 3,
+        max_candidates: int = 200,
+        max_scored: int = 50,
+    ) -> None:
+        self.barcodes = barcode_index or BarcodeIndex()
+        self.threshold = threshold
+        self.probe_tokens = probe_tokens
+        self.max_candidates = max_candidates
+        self.max_scored = max_scored
+        self.clusters = UnionFind()
+        self.cluster_gtin: Dict[int, str] = {}
+        # cluster id (at creation) -> (brand key, normalized name, pack size)
+        self.signatures: Dict[int, Tuple[str, str, str]] = {}
+        # "brand\0token" -> clusters created with that token
+        self.postings: Dict[str, List[int]] = {}
+        self.barcode_matches = 0
+        self.name_matches = 0
+
+    def add(self, product: Product) -> int:
+        gtin = normalize_gtin(product.barcode)
+        brand = normalize_brand(product.brand_name)
+        tokens = name_tokens(product.product_name, brand)
+        name = " ".join(tokens)
+        size = parse_size(product.product_name)
+
+        cluster = None
+        if gtin:
+            hit = self.barcodes.get(gtin)
+            if hit is not None:
+                cluster = self.clusters.find(hit)
+                self.barcode_matches += 1
+        match = self._match_name(brand, tokens, name, size, gtin) if brand and tokens else None
+        if cluster is None:
+            cluster = match
+            if cluster is not None:
+                self.name_matches += 1
+        elif match is not None and match != cluster and self.cluster_gtin.get(match) is None:
+            # Same product seen earlier without a barcode
+            cluster = self._union(cluster, match)
+        if cluster is None:
+            cluster = self.clusters.add()
+            if brand and tokens:
+                self.signatures[cluster] = (brand, name, size)
+                for token in set(tokens):
+                    self.postings.setdefault(f"{brand}\0{token}", []).append(cluster)
+        if gtin:
+            if self.barcodes.get(gtin) is None:
+                self.barcodes.put(gtin, cluster)
+            self.cluster_gtin.setdefault(cluster, gtin)
+        return cluster
+
+    def find(self, cluster: int) -> int:
+        return self.clusters.find(cluster)
+
+    def _union(self, left: int, right: int) -> int:
+        gtin = self.cluster_gtin.pop(left, None) or self.cluster_gtin.pop(right, None)
+        root = self.clusters.union(left, right)
+        if gtin:
+            self.cluster_gtin[root] = gtin
+        return root
+
+    def _match_name(self, brand: str, tokens: List[str], name: str, size: str, gtin: Optional[str]) -> Optional[int]:
+        # Probe the rarest tokens only; common ones ("cream") add cost, not recall
+        lists = sorted(
+            (self.postings.get(f"{brand}\0{token}", ()) for token in set(tokens)),
+            key=len,
+        )
+        overlap: Counter = Counter()
+        for postings in lists[: self.probe_tokens]:
+            overlap.update(postings[-self.max_candidates:])
+        # Only the clusters sharing the most probed tokens get the trigram comparison
+        candidates = [candidate for candidate, _ in overlap.most_common(self.max_scored)]
+        query = trigrams(name)
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            _, candidate_name, candidate_size = self.signatures[candidate]
+            if size and candidate_size and size != candidate_size:
+                continue
+            # Trigram Jaccard is roughly bounded by the length ratio; skip hopeless pairs
+            lengths = sorted((len(name), len(candidate_name)))
+            if (lengths[0] + 2) / (lengths[1] + 2) < best_score:
+                continue
+            root = self.clusters.find(candidate)
+            root_gtin = self.cluster_gtin.get(root)
+            if gtin and root_gtin and root_gtin != gtin:
+                continue
+            other = trigrams(candidate_name)
+            score = len(query & other) / len(query | other)
+            if score >= best_score:
+                best, best_score = root, score
+        return best
+
+    def close(self) -> None:
+        self.barcodes.close()
+
+
+class GoldenRecords:
+    """
+    Fold cluster members into one record per entity.
+
+    Each field takes the value from the most preferred source (order of
+    ``prefer``; unknown sources rank last), breaking ties by length for
+    long-text fields and by first appearance otherwise. ``provenance`` maps
+    each field to the ``source:line`` it came from.
+
+    Members are spilled to sorted runs of at most ``memory_rows`` rows and
+    merged back in ``(entity, input order)`` order, so each golden record is
+    built and emitted in one streaming pass.
+    """
+
+    def __init__(self, prefer: Sequence[str] = (), memory_rows: int = 200_000, tmp_dir: Optional[Path] = None) -> None:
+        self.rank = {source: index for index, source in enumerate(prefer)}
+        self.memory_rows = memory_rows
+        self.tmp_dir = tmp_dir
+
+    def build(self, members: Iterable[Tuple[int, str, int, Product]]) -> Iterator[dict]:
+        """Golden records, in entity order, from ``(entity, source, row, product)`` in input order."""
+        keyed = (
+            (
+                f"{entity:012d}.{position:012d}",
+                json.dumps(
+                    [source, row, [getattr(product, name) for name in GOLDEN_FIELDS]], ensure_ascii=False
+                ),
+            )
+            for position, (entity, source, row, product) in enumerate(members)
+        )
+        with tempfile.TemporaryDirectory(prefix="golden-", dir=self.tmp_dir) as work_dir:
+            current, record = None, None
+            for key, payload in Compactor(self.memory_rows).sort_keyed(keyed, Path(work_dir)):
+                entity = int(key.partition(".")[0])
+                if entity != current:
+                    if record is not None:
+                        yield self._golden(current, record)
+                    current, record = entity, {"fields": {}, "sources": []}
+                source, row, values = json.loads(payload)
+                self._fold(record, source, row, dict(zip(GOLDEN_FIELDS, values)))
+            if record is not None:
+                yield self._golden(current, record)
+
+    def _fold(self, record: dict, source: str, row: int, values: dict) -> None:
+        record["sources"].append({"source": source, "row": row, "barcode": values["barcode"]})
+        rank = self.rank.get(source, len(self.rank))
+        for field_name in GOLDEN_FIELDS:
+            value = values[field_name]
+            if field_name == "barcode":
+                value = normalize_gtin(value)  # invalid barcodes stay visible in "sources" only
+            if not value:
+                continue
+            length = len(value) if field_name in LONG_FIELDS else 0
+            score = (rank, -length)
+            current = record["fields"].get(field_name)
+            if current is None or score < current[0]:
+                record["fields"][field_name] = (score, value, f"{source}:{row}")
+
+    @staticmethod
+    def _golden(entity: int, record: dict) -> dict:
+        golden = {"entity_id": entity}
+        for field_name in GOLDEN_FIELDS:
+            entry = record["fields"].get(field_name)
+            golden[field_name] = entry[1] if entry else ([] if field_name == "concerns" else "")
+        golden["provenance"] = {name: entry[2] for name, entry in record["fields"].items()}
+        golden["sources"] = record["sources"]
+        return golden
+
+    @staticmethod
+    def to_product(golden: dict) -> Product:
+        return Product(**{field_name: golden[field_name] for field_name in GOLDEN_FIELDS})
@@ -0,0 +1,221 @@
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+from .archive import ARCHIVE, utf8_headers
+from .clearance import ClearanceStore
+from .client import HttpClient
+from .metrics import METRICS
+
+
+# Markers of Cloudflare interstitials / bot walls in the returned HTML. The bare
+# "challenge-platform" path is not one: every Cloudflare-fronted page loads
+# /cdn-cgi/challenge-platform/scripts/jsd/main.js.
+CHALLENGE_MARKERS = (
+    "cf-browser-verification",
+    "cf_chl_opt",
+    "<title>just a moment...</title>",
+    "attention required! | cloudflare",
+)
+# The interstitial's orchestration script, only a challenge when its form is on the page too
+CHALLENGE_SCRIPT = "/cdn-cgi/challenge-platform/h/"
+CHALLENGE_FORM = 'id="challenge-form"'
+CHALLENGE_TITLES = ("just a moment...",)
+
+HTTP_TIER = "http"
+BROWSER_TIER = "browser"
+
+
+@dataclass(frozen=True)
+class SoftBlock:
+    """
+    Pages a site serves blocked clients instead of the product (a generic
+    homepage, a 404). Site-specific: pass one per scraper to ``TieredFetcher``
+    and ``BrowserPool``, never apply it to every host.
+    """
+
+    markers: Tuple[str, ...] = ()  # lowercase substrings of the HTML
+    titles: Tuple[str, ...] = ()  # substrings of the page title
+
+
+def detect_challenge(status: int, html: str, title: str = "", soft_block: Optional[SoftBlock] = None) -> Optional[str]:
+    """Return why a response looks like a challenge (or ``soft_block`` page), or None."""
+    lowered = (html or "")[:200_000].lower()
+    for marker in CHALLENGE_MARKERS:
+        if marker in lowered:
+            return f"challenge marker {marker!r}"
+    if CHALLENGE_SCRIPT in lowered and CHALLENGE_FORM in lowered:
+        return "challenge form"
+    if title.strip().lower() in CHALLENGE_TITLES:
+        return f"challenge title {title.strip()!r}"
+    if status in (403, 503) and "cloudflare" in lowered:
+        return f"cloudflare {status}"
+    if soft_block is None:
+        return None
+    for marker in soft_block.markers:
+        if marker in lowered:
+            return f"soft block marker {marker!r}"
+    for marker in soft_block.titles:
+        if marker in title:
+            return f"soft block title {marker!r}"
+    return None
+
+
+@dataclass
+class FetchResult:
+    url: str
+    html: str
+    status: int
+    tier: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    challenge: Optional[str] = None
+
+
+class TieredFetcher:
+    """
+    Fetch pages with the cheapest tier that works for each host.
+
+    Plain HTTP is tried first; responses that look like a challenge escalate
+    to a pooled headless browser. The winning tier is remembered per host
+    (optionally persisted to ``state_path``), and browser hosts are re-probed
+    over HTTP every ``reprobe_every`` fetches in case the block was lifted.
+
+    With a ``ClearanceStore``, cookies earned by the browser are handed to
+    the HTTP client, so a browser-tier host is fetched over HTTP while its
+    clearance lasts and re-cleared in the browser only when it expires or a
+    challenge comes back. ``soft_block`` adds the site's own "blocked" pages
+    to the Cloudflare checks.
+    """
+
+    def __init__(
+        self,
+        client: HttpClient,
+        browser_pool=None,
+        allow_browser: bool = True,
+        state_path: Optional[Path] = None,
+        reprobe_every: int = 50,
+        start_tier: Optional[str] = None,
+        clearances: Optional[ClearanceStore] = None,
+        soft_block: Optional[SoftBlock] = None,
+    ) -> None:
+        self.client = client
+        self.allow_browser = allow_browser
+        self.state_path = state_path
+        self.reprobe_every = reprobe_every
+        self.start_tier = start_tier
+        self._browser_pool = browser_pool
+        self.clearances = clearances
+        self.soft_block = soft_block
+        self._lock = threading.Lock()
+        self.host_tiers: Dict[str, str] = {}
+        self._browser_fetches: Dict[str, int] = {}
+        if state_path and state_path.exists():
+            self.host_tiers = json.loads(state_path.read_text(encoding="utf-8"))
+
+    @property
+    def browser_pool(self):
+        if self._browser_pool is None:
+            from .browser import BrowserPool
+
+            self._browser_pool = BrowserPool()
+        return self._browser_pool
+
+    def tier_for(self, host: str) -> str:
+        tier = self.host_tiers.get(host) or self.start_tier or HTTP_TIER
+        if tier == BROWSER_TIER and self.reprobe_every:
+            count = self._browser_fetches.get(host, 0)
+            if count and count % self.reprobe_every == 0:
+                return HTTP_TIER
+        return tier
+
+    def fetch(self, url: str) -> FetchResult:
+        result = self._fetch(url)
+        if ARCHIVE.enabled:
+            ARCHIVE.record(
+                url, result.status, utf8_headers(result.headers), result.html.encode("utf-8"), result.tier, result.challenge
+            )
+        return result
+
+    def _fetch(self, url: str) -> FetchResult:
+        host = urlparse(url).netloc
+        tier = self.tier_for(host)
+        if tier == BROWSER_TIER and self.clearances is not None:
+            result = self._fetch_with_clearance(url, host)
+            if result is not None:
+                return result
+        if tier == HTTP_TIER or not self.allow_browser:
+            result = self._fetch_http(url)
+            if not result.challenge:
+                self._remember(host, HTTP_TIER)
+                return result
+            if not self.allow_browser:
+                print(f"Warning: {url} returned a challenge page ({result.challenge}), no browser fallback")
+                return result
+            print(f"Escalating {host} to browser: {result.challenge}")
+            METRICS.inc("fetch_escalations_total", host=host)
+        result = self._fetch_browser(url)
+        self._remember(host, BROWSER_TIER)
+        return result
+
+    def _fetch_with_clearance(self, url: str, host: str) -> Optional[FetchResult]:
+        clearance = self.clearances.get(host)
+        if clearance is None:
+            return None
+        self.clearances.apply(self.client, clearance)
+        try:
+            result = self._fetch_http(url)
+        except (requests.ConnectionError, requests.Timeout):
+            result = None
+        if result is not None and not result.challenge:
+            METRICS.inc("clearance_hits_total", host=host)
+            return result
+        # Clearance no longer accepted: drop it and re-clear in the browser
+        print(f"Clearance for {host} rejected, re-clearing in the browser")
+        METRICS.inc("clearance_rejections_total", host=host)
+        self.clearances.invalidate(host, self.client)
+        return None
+
+    def _fetch_http(self, url: str) -> FetchResult:
+        host = urlparse(url).netloc
+        try:
+            response = self.client.fetch(url)
+        except requests.HTTPError as exc:
+            response = exc.response
+            if response is None:
+                raise
+            reason = detect_challenge(response.status_code, response.text, soft_block=self.soft_block)
+            if not reason:
+                raise
+            METRICS.inc("fetch_tier_total", host=host, tier=HTTP_TIER)
+            return FetchResult(url, response.text, response.status_code, HTTP_TIER, dict(response.headers), reason)
+        METRICS.inc("fetch_tier_total", host=host, tier=HTTP_TIER)
+        reason = detect_challenge(response.status_code, response.text, soft_block=self.soft_block)
+        return FetchResult(url, response.text, response.status_code, HTTP_TIER, dict(response.headers), reason)
+
+    def _fetch_browser(self, url: str) -> FetchResult:
+        host = urlparse(url).netloc
+        with self._lock:
+            self._browser_fetches[host] = self._browser_fetches.get(host, 0) + 1
+        page = self.browser_pool.render(url)
+        METRICS.inc("fetch_tier_total", host=host, tier=BROWSER_TIER)
+        reason = detect_challenge(200, page.html, page.title, self.soft_block)
+        if not reason and self.clearances is not None and page.cookies:
+            clearance = self.clearances.harvest(host, page.cookies, page.user_agent)
+            self.clearances.apply(self.client, clearance)
+        return FetchResult(url, page.html, 200, BROWSER_TIER, {}, reason)
+
+    def _remember(self, host: str, tier: str) -> None:
+        with self._lock:
+            if self.host_tiers.get(host) == tier:
+                return
+            self.host_tiers[host] = tier
+            if self.state_path:
+                self.state_path.parent.mkdir(parents=True, exist_ok=True)
+                self.state_path.write_text(json.dumps(self.host_tiers, indent=2), encoding="utf-8")
+
+    def close(self) -> None:
+        if self._browser_pool is not None:
+            self._browser_pool.close()
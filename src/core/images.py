@@ -0,0 +1,259 @@
+import hashlib
+import json
+import struct
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from .client import HttpClient
+from .metrics import METRICS
+from .models import Product
+
+
+# Cache-busting query parameters that do not change the image bytes
+IGNORED_QUERY_PARAMS = {"v", "_", "cb", "version"}
+
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+}
+
+
+def canonicalize_image_url(url: str, base_url: str = "") -> str:
+    """Normalize scheme/host and drop cache-busting params such as Shopify's ``?v=``."""
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if url.startswith("//"):
+        url = "https:" + url
+    elif url.startswith("/") and base_url:
+        url = base_url.rstrip("/") + url
+    parts = urlsplit(url)
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in IGNORED_QUERY_PARAMS
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+def image_dimensions(data: bytes) -> Tuple[int, int]:
+    """Read width/height from PNG, GIF, JPEG or WebP headers; (0, 0) if unknown."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            width = int.from_bytes(data[24:27], "little") + 1
+            height = int.from_bytes(data[27:30], "little") + 1
+            return width, height
+    if data[:2] == b"\xff\xd8":
+        idx = 2
+        while idx + 9 < len(data):
+            if data[idx] != 0xFF:
+                idx += 1
+                continue
+            marker = data[idx + 1]
+            # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[idx + 5:idx + 9])
+                return width, height
+            segment_length = struct.unpack(">H", data[idx + 2:idx + 4])[0]
+            idx += 2 + segment_length
+    return 0, 0
+
+
+class BlobStore:
+    """Content-addressed image store: ``root/ab/cd/<sha256><ext>``."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def path_for(self, digest: str, extension: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / f"{digest}{extension}"
+
+    def put(self, data: bytes, extension: str = "") -> Tuple[str, Path]:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest, extension)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        return digest, path
+
+
+@dataclass
+class ImageResult:
+    url: str
+    ok: bool = False
+    status: int = 0
+    size: int = 0
+    width: int = 0
+    height: int = 0
+    content_hash: str = ""
+    error: str = ""
+
+
+class ImagePipeline:
+    """
+    Verify (``head``) or download (``download``) product images on a bounded
+    thread pool while the HTML scrape keeps producing products.
+
+    Results are memoized per canonical URL, so products sharing a packshot
+    cost one request, and downloads are deduplicated by content hash in the
+    blob store.
+    """
+
+    def __init__(
+        self,
+        client: HttpClient,
+        mode: str = "head",
+        store: Optional[BlobStore] = None,
+        workers: int = 8,
+        max_in_flight: int = 256,
+        manifest: Optional[Path] = None,
+    ) -> None:
+        if mode not in ("head", "download"):
+            raise ValueError(f"Unknown image mode: {mode}")
+        if mode == "download" and store is None:
+            raise ValueError("Download mode needs a BlobStore")
+        self.client = client
+        self.mode = mode
+        self.store = store
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="images")
+        self._results: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # The image fields are not part of the pipe output; they are kept in this JSONL sidecar
+        self._manifest = None
+        if manifest:
+            manifest.parent.mkdir(parents=True, exist_ok=True)
+            self._manifest = manifest.open("a", encoding="utf-8")
+
+    def check(self, url: str) -> Future:
+        with self._lock:
+            future = self._results.get(url)
+            if future is None:
+                future = self._results[url] = self._executor.submit(self._check, url)
+                METRICS.inc("image_checks_total", mode=self.mode)
+            else:
+                METRICS.inc("image_dedupe_hits_total")
+            return future
+
+    def process(self, products: Iterable[Product]) -> Iterator[Product]:
+        """Yield products in input order with image fields filled in."""
+        pending: Deque[Tuple[Product, Optional[Future]]] = deque()
+        for product in products:
+            # The canonical URL is only used to dedupe and fetch; the scraped value is kept
+            url = canonicalize_image_url(product.image)
+            pending.append((product, self.check(url) if url else None))
+            while len(pending) >= self.max_in_flight:
+                yield self._finish(*pending.popleft())
+        while pending:
+            yield self._finish(*pending.popleft())
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self._manifest:
+            self._manifest.close()
+            self._manifest = None
+
+    def _finish(self, product: Product, future: Optional[Future]) -> Product:
+        if future is None:
+            return product
+        result: ImageResult = future.result()
+        product.image_ok = result.ok
+        product.image_size = result.size
+        product.image_width = result.width
+        product.image_height = result.height
+        product.image_hash = result.content_hash
+        if self._manifest:
+            entry = {
+                "barcode": product.barcode,
+                "image": product.image,
+                "url": result.url,
+                "ok": result.ok,
+                "status": result.status,
+                "size": result.size,
+                "width": result.width,
+                "height": result.height,
+                "content_hash": result.content_hash,
+            }
+            self._manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        if not result.ok:
+            print(f"Warning: image check failed for {result.url}: {result.error or result.status}")
+        return product
+
+    def _check(self, url: str) -> ImageResult:
+        result = ImageResult(url=url)
+        try:
+            if self.mode == "head":
+                self._head(url, result)
+            else:
+                self._download(url, result)
+        except requests.RequestException as exc:
+            result.error = str(exc)
+        METRICS.inc("image_results_total", ok=str(result.ok).lower())
+        return result
+
+    # Both go through HttpClient, so CDNs get the same 429 backoff, breaker and deadline as pages
+
+    def _head(self, url: str, result: ImageResult) -> None:
+        try:
+            response = self.client.fetch(url, method="HEAD")
+        except requests.HTTPError as exc:
+            if exc.response is None:
+                raise
+            result.status = exc.response.status_code
+            return
+        result.status = response.status_code
+        result.size = int(response.headers.get("Content-Length") or 0)
+        content_type = response.headers.get("Content-Type", "")
+        result.ok = not content_type or content_type.startswith("image/")
+        if not result.ok:
+            result.error = f"unexpected content type {content_type}"
+
+    def _download(self, url: str, result: ImageResult) -> None:
+        try:
+            with self.client.stream(url) as response:
+                result.status = response.status_code
+                chunks = []
+                size = 0
+                for chunk in self.client.iter_chunks(response, 64 * 1024):
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        result.error = f"image larger than {MAX_IMAGE_BYTES} bytes"
+                        return
+                    chunks.append(chunk)
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        except requests.HTTPError as exc:
+            if exc.response is None:
+                raise
+            result.status = exc.response.status_code
+            return
+        data = b"".join(chunks)
+        METRICS.inc("image_bytes_downloaded_total", len(data))
+        result.size = len(data)
+        # Whole file: JPEG SOF markers can sit behind a large EXIF/ICC block
+        result.width, result.height = image_dimensions(data)
+        extension = CONTENT_TYPE_EXTENSIONS.get(content_type, Path(urlsplit(url).path).suffix.lower())
+        result.content_hash, _ = self.store.put(data, extension)
+        result.ok = True
@@ -0,0 +1,236 @@
+"""
+INCI ingredient lists: tokenizing, canonical names and interned IDs.
+
+``split_inci`` splits on top-level commas/semicolons only, so
+``CI 77891 (Titanium Dioxide, Mica)`` stays one ingredient, and never on a
+comma between digits (``1,2-Hexanediol``). Every item is
+resolved through ``IngredientDictionary``: a trie of folded names and
+synonyms mapping to a small integer ID, so ``Aqua (Water/Eau)``, ``Water``
+and ``Aqua`` all become the ID of ``Aqua``. Only the base name (or slash
+alternatives of it) is resolved; the parenthetical part is never used, since
+it often names a parent ingredient (``Retinyl Palmitate (Vitamin A)`` is not
+``Retinol``). Unknown ingredients are interned under their base name on first
+sight.
+
+``parse_ingredients`` is memoized on the raw string: a brand's variants and
+shades usually repeat the exact same 25-item list.
+"""
+import json
+import re
+import threading
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+# canonical INCI name -> common synonyms / translations
+SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "Aqua": ("Water", "Eau", "Wasser", "Aqua/Water", "Aqua/Water/Eau", "Water/Aqua"),
+    "Parfum": ("Fragrance", "Perfume", "Parfum/Fragrance"),
+    "Glycerin": ("Glycerine", "Glycerol"),
+    "Tocopherol": ("Vitamin E",),
+    "Tocopheryl Acetate": ("Vitamin E Acetate",),
+    "Ascorbic Acid": ("Vitamin C",),
+    "Retinol": ("Vitamin A",),
+    "Niacinamide": ("Nicotinamide", "Vitamin B3"),
+    "Panthenol": ("D-Panthenol", "Dexpanthenol", "Provitamin B5", "Pro-Vitamin B5"),
+    "Alcohol Denat.": ("Alcohol Denat", "Denatured Alcohol", "SD Alcohol"),
+    "Butyrospermum Parkii Butter": ("Shea Butter", "Butyrospermum Parkii (Shea) Butter"),
+    "Simmondsia Chinensis Seed Oil": ("Jojoba Oil", "Simmondsia Chinensis (Jojoba) Seed Oil"),
+    "Aloe Barbadensis Leaf Juice": ("Aloe Vera", "Aloe Vera Leaf Juice"),
+    "Titanium Dioxide": ("CI 77891",),
+    "Sodium Hyaluronate": (),
+    "Hyaluronic Acid": (),
+}
+
+_LABEL = re.compile(r"^\s*(?:ingredients|inhaltsstoffe|zutaten|inci)\s*:\s*", re.IGNORECASE)
+# A comma between digits is part of a name (1,2-Hexanediol), not a separator
+_SEPARATORS = re.compile(r"[;•]|(?<!\d),|,(?!\d)")
+_PARENTHETICAL = re.compile(r"\s*[\(\[][^\)\]]*[\)\]]")
+_SPACES = re.compile(r"\s+")
+_SLASH = re.compile(r"\s*/\s*")
+_OPENERS = "(["
+_CLOSERS = ")]"
+
+
+def split_inci(text: str) -> List[str]:
+    """Split an INCI list on top-level separators; commas inside (...) or [...] are kept."""
+    text = _LABEL.sub("", text or "").strip().rstrip(".")
+    if not any(char in text for char in _OPENERS):
+        parts = _SEPARATORS.split(text)
+    else:
+        parts, depth, start = [], 0, 0
+        for index, char in enumerate(text):
+            if char in _OPENERS:
+                depth += 1
+            elif char in _CLOSERS:
+                depth = max(depth - 1, 0)
+            elif depth == 0 and char in ",;•" and not _numeric_comma(text, index):
+                parts.append(text[start:index])
+                start = index + 1
+        parts.append(text[start:])
+        if depth:
+            # Unbalanced (usually truncated) text: a naive split loses less
+            parts = _SEPARATORS.split(text)
+    return [item for item in (_SPACES.sub(" ", part).strip() for part in parts) if item]
+
+
+def _numeric_comma(text: str, index: int) -> bool:
+    return text[index] == "," and text[index - 1:index].isdigit() and text[index + 1:index + 2].isdigit()
+
+
+def fold_name(name: str) -> str:
+    """Lookup key: lowercase, single spaces, no spaces around slashes, no trailing dot."""
+    return _SLASH.sub("/", _SPACES.sub(" ", name.lower())).strip(" .*")
+
+
+class Trie:
+    """Character trie mapping folded names to IDs; supports prefix completion."""
+
+    _VALUE = ""  # never a child key, children are single characters
+
+    def __init__(self) -> None:
+        self._root: Dict[str, dict] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, key: str, value: int) -> None:
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+        if self._VALUE not in node:
+            self._size += 1
+        node[self._VALUE] = value
+
+    def get(self, key: str) -> Optional[int]:
+        node = self._root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node.get(self._VALUE)
+
+    def items(self, prefix: str = "") -> Iterator[Tuple[str, int]]:
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return
+        stack = [(prefix, node)]
+        while stack:
+            key, node = stack.pop()
+            for char, child in node.items():
+                if char == self._VALUE:
+                    yield key, child
+                else:
+                    stack.append((key + char, child))
+
+
+class IngredientDictionary:
+    """
+    Canonical ingredient names with interned integer IDs.
+
+    IDs are assigned in order of first appearance, so they are stable within
+    a process; ``save``/``load`` keep them stable across runs and processes.
+    """
+
+    def __init__(self, synonyms: Optional[Dict[str, Tuple[str, ...]]] = None) -> None:
+        self.names: List[str] = []
+        self.trie = Trie()
+        self._lock = threading.Lock()
+        for canonical, aliases in (SYNONYMS if synonyms is None else synonyms).items():
+            ident = self.intern(canonical)
+            for alias in aliases:
+                self.add_synonym(alias, ident)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, canonical: str) -> int:
+        key = fold_name(canonical)
+        with self._lock:
+            ident = self.trie.get(key)
+            if ident is None:
+                ident = len(self.names)
+                self.names.append(canonical)
+                self.trie.insert(key, ident)
+            return ident
+
+    def add_synonym(self, synonym: str, ident: int) -> None:
+        with self._lock:
+            self.trie.insert(fold_name(synonym), ident)
+
+    def lookup(self, name: str) -> Optional[int]:
+        return self.trie.get(fold_name(name))
+
+    def name(self, ident: int) -> str:
+        return self.names[ident]
+
+    def resolve(self, item: str) -> int:
+        """ID for one ingredient item, folding ``Name (Synonym/Translation)`` forms through ``Name``."""
+        ident = self.lookup(item)
+        if ident is not None:
+            return ident
+        base = _PARENTHETICAL.sub("", item).strip()
+        ident = self._lookup_alternatives(base) if base else None
+        if ident is None:
+            ident = self.intern(base or item)
+        self.add_synonym(item, ident)
+        return ident
+
+    def _lookup_alternatives(self, name: str) -> Optional[int]:
+        ident = self.lookup(name)
+        if ident is not None or "/" not in name:
+            return ident
+        # "Aqua/Water/Eau" lists translations, but copolymer names use slashes
+        # too; only fold when every part is a known name of the same ingredient
+        idents = {self.lookup(part) for part in _SLASH.split(name)}
+        return idents.pop() if len(idents) == 1 and None not in idents else None
+
+    def complete(self, prefix: str, limit: int = 20) -> List[str]:
+        """Canonical names having a name or synonym that starts with ``prefix``."""
+        seen: Dict[int, None] = {}
+        for _, ident in self.trie.items(fold_name(prefix)):
+            seen.setdefault(ident)
+            if len(seen) >= limit:
+                break
+        return [self.names[ident] for ident in seen]
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payload = {"names": self.names, "synonyms": dict(self.trie.items())}
+        path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+
+    def load(self, path: Path) -> None:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        with self._lock:
+            self.names = payload["names"]
+            self.trie = Trie()
+            for key, ident in payload["synonyms"].items():
+                self.trie.insert(key, ident)
+        parse_ingredients.cache_clear()
+
+
+INCI = IngredientDictionary()
+
+
+class InciList(NamedTuple):
+    names: Tuple[str, ...]  # items as written on the page, correctly split
+    ids: Tuple[int, ...]  # canonical ingredient IDs in INCI
+
+    def id_array(self) -> array:
+        return array("I", self.ids)
+
+    def canonical_names(self) -> List[str]:
+        return [INCI.name(ident) for ident in self.ids]
+
+
+@lru_cache(maxsize=8192)
+def parse_ingredients(raw: str) -> InciList:
+    """Tokenize and resolve an ingredient string (memoized on the exact string)."""
+    names = tuple(split_inci(raw))
+    return InciList(names, tuple(INCI.resolve(name) for name in names))
@@ -0,0 +1,614 @@
+"""
+On-disk inverted index over a products file, for boolean and prefix search.
+
+Each data row of the products file is a document (doc id = order of
+appearance). Terms are ``field:value`` strings over ``name``, ``brand``,
+``category``, ``description`` tokens and canonical ``ingredient`` names
+(via ``core.inci``, so ``ingredient:water`` finds ``Aqua``).
+
+Posting lists are sorted doc ids stored as deltas in blocks of 128. Each
+block uses the narrowest of 1/2/4-byte little-endian integers that fits its
+largest delta. Decoding is ``array.frombytes`` plus ``itertools.accumulate``,
+both C loops, and common ingredients compress to about one byte per posting.
+
+The index is a list of immutable segments plus a manifest recording how many
+bytes of the source have been indexed. ``update`` indexes only rows appended
+since the last call, as a new segment, and ``compact`` merges the segments.
+"""
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import accumulate, chain
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from .entities import fold
+from .inci import INCI, fold_name
+from .models import Product
+
+
+FIELDS = ("name", "brand", "category", "description", "ingredient")
+FIELD_ALIASES = {"desc": "description", "ingredients": "ingredient", "inci": "ingredient", "cat": "category"}
+# Fields indexed as one whole value (plus word tokens for category)
+WHOLE_VALUE_FIELDS = {"brand", "ingredient"}
+
+BLOCK_SIZE = 128
+# Posting lists with at least this many blocks carry a skip table
+SKIP_MIN_BLOCKS = 8
+_TOKEN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def encode_postings(doc_ids: Sequence[int]) -> bytes:
+    deltas = [doc_ids[0]] + [right - left for left, right in zip(doc_ids, doc_ids[1:])]
+    blocks = []
+    for start in range(0, len(deltas), BLOCK_SIZE):
+        block = deltas[start:start + BLOCK_SIZE]
+        peak = max(block)
+        code = "B" if peak < 1 << 8 else "H" if peak < 1 << 16 else "I"
+        blocks.append(bytes((ord(code),)) + _packed(code, block))
+    if len(blocks) < SKIP_MIN_BLOCKS:
+        return b"".join(blocks)
+    # Skip table: first doc id and byte position of every block
+    firsts = [doc_ids[start] for start in range(0, len(doc_ids), BLOCK_SIZE)]
+    positions = list(accumulate((len(block) for block in blocks[:-1]), initial=0))
+    return _packed("I", firsts) + _packed("I", positions) + b"".join(blocks)
+
+
+def decode_postings(data: bytes, count: int) -> array:
+    blocks = []
+    position = _skip_table_size(count)
+    remaining = count
+    while remaining:
+        size = min(BLOCK_SIZE, remaining)
+        block, position = _unpack_block(data, position, size)
+        blocks.append(block)
+        remaining -= size
+    return array("I", accumulate(chain.from_iterable(blocks)))
+
+
+def filter_postings(data: bytes, count: int, candidates: Sequence[int]) -> array:
+    """``candidates`` (sorted) that are in the posting list, decoding only the blocks they fall in."""
+    table_size = _skip_table_size(count)
+    block_count = -(-count // BLOCK_SIZE)
+    if not table_size or len(candidates) * 4 >= block_count:
+        return intersect(candidates, decode_postings(data, count))
+    firsts = _unpacked("I", data[:table_size // 2])
+    positions = _unpacked("I", data[table_size // 2:table_size])
+    result = array("I")
+    current, members = -1, frozenset()
+    for doc in candidates:
+        block = bisect_right(firsts, doc) - 1
+        if block < 0:
+            continue
+        if block != current:
+            size = min(BLOCK_SIZE, count - block * BLOCK_SIZE)
+            deltas, _ = _unpack_block(data, table_size + positions[block], size)
+            members = frozenset(accumulate(deltas[1:], initial=firsts[block]))
+            current = block
+        if doc in members:
+            result.append(doc)
+    return result
+
+
+def _skip_table_size(count: int) -> int:
+    block_count = -(-count // BLOCK_SIZE)
+    return 8 * block_count if block_count >= SKIP_MIN_BLOCKS else 0
+
+
+def _packed(code: str, values: Sequence[int]) -> bytes:
+    packed = array(code, values)
+    if _BIG_ENDIAN:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpacked(code: str, data: bytes) -> array:
+    values = array(code)
+    values.frombytes(data)
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def _unpack_block(data: bytes, position: int, size: int) -> Tuple[array, int]:
+    code = chr(data[position])
+    end = position + 1 + size * array(code).itemsize
+    return _unpacked(code, data[position + 1:end]), end
+
+
+def tokens(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(fold(text)) if len(token) > 1]
+
+
+def ingredient_term(name: str) -> str:
+    """Canonical, folded ingredient name (synonyms map to the same term)."""
+    return fold_name(INCI.name(INCI.resolve(name)))
+
+
+def document_terms(product: Product) -> Set[str]:
+    terms: Set[str] = set()
+    terms.update(f"name:{token}" for token in tokens(product.product_name))
+    terms.update(f"description:{token}" for token in tokens(product.description))
+    terms.update(f"category:{token}" for token in tokens(product.category))
+    if product.category:
+        terms.add(f"category:{fold_name(product.category)}")
+    if product.brand_name:
+        terms.add(f"brand:{fold_name(product.brand_name)}")
+    ingredients = product.ingredients if isinstance(product.ingredients, list) else [product.ingredients]
+    terms.update(f"ingredient:{ingredient_term(item)}" for item in ingredients if item)
+    return terms
+
+
+# -- sorted doc id set operations ------------------------------------------------
+
+def intersect(left: Sequence[int], right: Sequence[int]) -> Sequence[int]:
+    if len(left) > len(right):
+        left, right = right, left
+    if not left:
+        return array("I")
+    if len(right) > 8 * len(left):
+        # Skewed sizes: binary-search the small list's ids in the big one
+        result = array("I")
+        low = 0
+        for doc in left:
+            low = bisect_left(right, doc, low)
+            if low == len(right):
+                break
+            if right[low] == doc:
+                result.append(doc)
+        return result
+    return array("I", sorted(set(left).intersection(right)))
+
+
+def union(lists: Sequence[Sequence[int]]) -> Sequence[int]:
+    lists = [postings for postings in lists if postings]
+    if not lists:
+        return array("I")
+    if len(lists) == 1:
+        return lists[0]
+    merged: Set[int] = set()
+    for postings in lists:
+        merged.update(postings)
+    return array("I", sorted(merged))
+
+
+def difference(left: Sequence[int], right: Sequence[int]) -> Sequence[int]:
+    if not left or not right:
+        return left
+    if len(right) > 8 * len(left):
+        result = array("I")
+        for doc in left:
+            index = bisect_left(right, doc)
+            if index == len(right) or right[index] != doc:
+                result.append(doc)
+        return result
+    excluded = set(right)
+    return array("I", (doc for doc in left if doc not in excluded))
+
+
+# -- segments ----------------------------------------------------------------------
+
+class Segment:
+    """One immutable batch: sorted terms (``.terms``) and packed postings (``.post``)."""
+
+    def __init__(self, directory: Path, name: str, first_doc: int) -> None:
+        self.name = name
+        self.first_doc = first_doc
+        self.terms: List[str] = []
+        self.offsets = array("Q")
+        self.counts = array("I")
+        with (directory / f"{name}.terms").open("r", encoding="utf-8") as handle:
+            for line in handle:
+                term, offset, count = line.rstrip("\n").rsplit("\t", 2)
+                self.terms.append(term)
+                self.offsets.append(int(offset))
+                self.counts.append(int(count))
+        self.offsets.append((directory / f"{name}.post").stat().st_size)
+        self._file = (directory / f"{name}.post").open("rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b""
+
+    def postings(self, term: str) -> Sequence[int]:
+        index = bisect_left(self.terms, term)
+        if index == len(self.terms) or self.terms[index] != term:
+            return ()
+        return self._read(index)
+
+    def filter(self, term: str, candidates: Sequence[int]) -> Sequence[int]:
+        index = bisect_left(self.terms, term)
+        if index == len(self.terms) or self.terms[index] != term:
+            return ()
+        return filter_postings(self._data[self.offsets[index]:self.offsets[index + 1]], self.counts[index], candidates)
+
+    def frequency(self, term: str) -> int:
+        index = bisect_left(self.terms, term)
+        return self.counts[index] if index < len(self.terms) and self.terms[index] == term else 0
+
+    def prefixed(self, prefix: str) -> Iterator[Tuple[str, Sequence[int]]]:
+        index = bisect_left(self.terms, prefix)
+        while index < len(self.terms) and self.terms[index].startswith(prefix):
+            yield self.terms[index], self._read(index)
+            index += 1
+
+    def items(self) -> Iterator[Tuple[str, Sequence[int]]]:
+        for index, term in enumerate(self.terms):
+            yield term, self._read(index)
+
+    def _read(self, index: int) -> array:
+        return decode_postings(self._data[self.offsets[index]:self.offsets[index + 1]], self.counts[index])
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+def write_segment(directory: Path, name: str, postings: Iterable[Tuple[str, Sequence[int]]]) -> None:
+    offset = 0
+    with (directory / f"{name}.post").open("wb") as post, (directory / f"{name}.terms").open(
+        "w", encoding="utf-8"
+    ) as terms:
+        for term, doc_ids in postings:
+            blob = encode_postings(doc_ids)
+            post.write(blob)
+            terms.write(f"{term}\t{offset}\t{len(doc_ids)}\n")
+            offset += len(blob)
+
+
+# -- index ---------------------------------------------------------------------------
+
+class ProductIndex:
+    """
+    Inverted index stored in ``directory`` for the products file ``source``.
+
+    Doc ids are global and increase with each segment, so a term's postings
+    across segments concatenate into one sorted list.
+    """
+
+    MANIFEST = "manifest.json"
+    OFFSETS = "docs.offsets"
+
+    def __init__(self, directory: Path, source: Optional[Path] = None, segment_rows: int = 100_000) -> None:
+        self.directory = directory
+        self.segment_rows = segment_rows
+        manifest_path = directory / self.MANIFEST
+        self.manifest = (
+            json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest_path.exists()
+            else {"source": "", "indexed_bytes": 0, "doc_count": 0, "next_segment": 0, "segments": []}
+        )
+        if source is not None:
+            source = source.resolve()
+            if self.manifest["source"] and self.manifest["source"] != str(source):
+                raise ValueError(f"{directory} indexes {self.manifest['source']}, not {source}")
+            self.manifest["source"] = str(source)
+        self.doc_offsets = array("Q")
+        offsets_path = directory / self.OFFSETS
+        if offsets_path.exists():
+            with offsets_path.open("rb") as handle:
+                self.doc_offsets.frombytes(handle.read())
+            # An interrupted update may have appended offsets past the manifest
+            del self.doc_offsets[self.manifest["doc_count"]:]
+        self.segments = [Segment(directory, entry["name"], entry["first_doc"]) for entry in self.manifest["segments"]]
+        self._cache: Dict[str, Sequence[int]] = {}
+
+    @property
+    def source(self) -> Path:
+        return Path(self.manifest["source"])
+
+    @property
+    def doc_count(self) -> int:
+        return self.manifest["doc_count"]
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+
+    # -- building --------------------------------------------------------------
+
+    def update(self) -> int:
+        """Index rows appended to the source since the last update; returns how many."""
+        size = self.source.stat().st_size
+        indexed = self.manifest["indexed_bytes"]
+        if indexed and (size < indexed or self.manifest.get("tail_digest") != self._tail_digest()):
+            print(f"{self.source} was rewritten since it was indexed, rebuilding")
+            self._reset()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        added = 0
+        postings: Dict[str, List[int]] = defaultdict(list)
+        batch = 0
+        with self.source.open("rb") as handle, (self.directory / self.OFFSETS).open("ab") as offsets_file:
+            offsets_file.truncate(self.doc_count * self.doc_offsets.itemsize)
+            handle.seek(self.manifest["indexed_bytes"])
+            position = self.manifest["indexed_bytes"]
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break  # row still being written; pick it up next time
+                line_offset, position = position, position + len(line)
+                if line_offset == 0 and line.startswith(b"barcode|"):
+                    self.manifest["indexed_bytes"] = position
+                    continue
+                try:
+                    product = Product.from_pipe_row(line.decode("utf-8"))
+                except ValueError:
+                    self.manifest["indexed_bytes"] = position
+                    continue
+                doc_id = self.doc_count + batch
+                for term in document_terms(product):
+                    postings[term].append(doc_id)
+                self.doc_offsets.append(line_offset)
+                batch += 1
+                self.manifest["indexed_bytes"] = position
+                if batch >= self.segment_rows:
+                    added += self._flush(postings, batch, offsets_file)
+                    postings, batch = defaultdict(list), 0
+            added += self._flush(postings, batch, offsets_file)
+        return added
+
+    def _flush(self, postings: Dict[str, List[int]], batch: int, offsets_file) -> int:
+        if not batch:
+            self._save_manifest()
+            return 0
+        name = f"seg-{self.manifest['next_segment']:05d}"
+        write_segment(self.directory, name, sorted(postings.items()))
+        offsets_file.write(self.doc_offsets[self.doc_count:].tobytes())
+        offsets_file.flush()
+        self.manifest["next_segment"] += 1
+        self.manifest["segments"].append({"name": name, "first_doc": self.doc_count})
+        self.manifest["doc_count"] += batch
+        self._save_manifest()
+        self.segments.append(Segment(self.directory, name, self.doc_count - batch))
+        self._cache.clear()
+        return batch
+
+    def compact(self) -> None:
+        """Merge all segments into one (k-way merge over their sorted term lists)."""
+        if len(self.segments) <= 1:
+            return
+        name = f"seg-{self.manifest['next_segment']:05d}"
+        write_segment(self.directory, name, self._merged_items())
+        old = self.segments
+        self.manifest["next_segment"] += 1
+        self.manifest["segments"] = [{"name": name, "first_doc": 0}]
+        self._save_manifest()
+        self.segments = [Segment(self.directory, name, 0)]
+        for segment in old:
+            segment.close()
+            for suffix in (".terms", ".post"):
+                (self.directory / f"{segment.name}{suffix}").unlink()
+        self._cache.clear()
+
+    def _merged_items(self) -> Iterator[Tuple[str, array]]:
+        iterators = [segment.items() for segment in self.segments]
+        current_term, parts = None, []
+        # Segments are ordered by doc id, and the merge is stable on segment order
+        for term, doc_ids in heapq.merge(*iterators, key=lambda item: item[0]):
+            if term != current_term and parts:
+                yield current_term, array("I", chain.from_iterable(parts))
+                parts = []
+            current_term = term
+            parts.append(doc_ids)
+        if parts:
+            yield current_term, array("I", chain.from_iterable(parts))
+
+    def _reset(self) -> None:
+        self.close()
+        for entry in self.manifest["segments"]:
+            for suffix in (".terms", ".post"):
+                path = self.directory / f"{entry['name']}{suffix}"
+                if path.exists():
+                    path.unlink()
+        self.manifest.update(indexed_bytes=0, doc_count=0, segments=[])
+        self.segments = []
+        self.doc_offsets = array("Q")
+        self._cache.clear()
+
+    def _tail_digest(self) -> str:
+        """Digest of the last indexed bytes, to tell appends from rewrites (e.g. compact.py)."""
+        end = self.manifest["indexed_bytes"]
+        with self.source.open("rb") as handle:
+            handle.seek(max(end - 4096, 0))
+            return hashlib.blake2b(handle.read(min(end, 4096)), digest_size=16).hexdigest()
+
+    def _save_manifest(self) -> None:
+        self.manifest["tail_digest"] = self._tail_digest()
+        path = self.directory / self.MANIFEST
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.manifest, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    # -- lookups ---------------------------------------------------------------
+
+    def postings(self, term: str) -> Sequence[int]:
+        cached = self._cache.get(term)
+        if cached is None:
+            parts = [segment.postings(term) for segment in self.segments]
+            parts = [part for part in parts if part]
+            cached = parts[0] if len(parts) == 1 else array("I", chain.from_iterable(parts))
+            self._cache[term] = cached
+        return cached
+
+    def frequency(self, term: str) -> int:
+        return sum(segment.frequency(term) for segment in self.segments)
+
+    def filter(self, term: str, candidates: Sequence[int]) -> Sequence[int]:
+        """The subset of sorted ``candidates`` containing ``term``."""
+        cached = self._cache.get(term)
+        if cached is not None:
+            return intersect(candidates, cached)
+        parts = []
+        # Hand every segment only the candidates in its doc id range
+        bounds = [segment.first_doc for segment in self.segments[1:]] + [self.doc_count]
+        start = 0
+        for segment, bound in zip(self.segments, bounds):
+            end = bisect_left(candidates, bound, start)
+            if end > start:
+                parts.append(segment.filter(term, candidates[start:end]))
+            start = end
+        return array("I", chain.from_iterable(parts))
+
+    def prefix(self, prefix: str) -> Sequence[int]:
+        return union([doc_ids for segment in self.segments for _, doc_ids in segment.prefixed(prefix)])
+
+    def terms(self, prefix: str, limit: int = 20) -> List[Tuple[str, int]]:
+        """Indexed terms starting with ``prefix`` and their document frequency."""
+        frequencies: Dict[str, int] = defaultdict(int)
+        for segment in self.segments:
+            for term, doc_ids in segment.prefixed(prefix):
+                frequencies[term] += len(doc_ids)
+        return sorted(frequencies.items(), key=lambda item: -item[1])[:limit]
+
+    def search(self, query: str) -> Sequence[int]:
+        return self._evaluate(parse_query(query))
+
+    def rows(self, doc_ids: Iterable[int]) -> Iterator[str]:
+        """Read the source rows of ``doc_ids`` (seeks, no scan)."""
+        with self.source.open("rb") as handle:
+            for doc_id in doc_ids:
+                handle.seek(self.doc_offsets[doc_id])
+                yield handle.readline().decode("utf-8").rstrip("\n")
+
+    def _evaluate(self, node: tuple) -> Sequence[int]:
+        kind = node[0]
+        if kind == "term":
+            return self._term(node[1], node[2], node[3])
+        if kind == "or":
+            return union([self._evaluate(child) for child in node[1]])
+        if kind == "not":
+            return difference(array("I", range(self.doc_count)), self._evaluate(node[1]))
+        # AND: start from the smallest operand, then narrow it down. Plain terms
+        # are only probed for the remaining candidates (skip tables), NOT
+        # children are subtracted last
+        positives = [child for child in node[1] if child[0] != "not"]
+        negatives = [child[1] for child in node[1] if child[0] == "not"]
+        exact = [(self._exact_term(child), child) for child in positives]
+        terms = sorted((term for term, _ in exact if term), key=self.frequency)
+        evaluated = sorted((self._evaluate(child) for term, child in exact if not term), key=len)
+        if evaluated:
+            result = evaluated.pop(0)
+        elif terms:
+            result = self.postings(terms.pop(0))
+        else:
+            result = array("I", range(self.doc_count))
+        for postings in evaluated:
+            result = intersect(result, postings) if result else result
+        for term in terms:
+            result = self.filter(term, result) if result else result
+        for child in negatives:
+            if not result:
+                break
+            term = self._exact_term(child)
+            result = difference(result, self.filter(term, result) if term else self._evaluate(child))
+        return result
+
+    def _exact_term(self, node: tuple) -> Optional[str]:
+        """The single indexed term ``node`` stands for, if it is that simple."""
+        if node[0] != "term" or node[1] is None or node[3]:
+            return None
+        field, value = node[1], node[2]
+        if field in WHOLE_VALUE_FIELDS or (field == "category" and " " in value.strip()):
+            if field == "ingredient":
+                known = INCI.lookup(value)
+                return f"{field}:{fold_name(INCI.name(known)) if known is not None else fold_name(value)}"
+            return f"{field}:{fold_name(value)}"
+        words = tokens(value)
+        return f"{field}:{words[0]}" if len(words) == 1 else None
+
+    def _term(self, field: Optional[str], value: str, prefix: bool) -> Sequence[int]:
+        if field is None:
+            return union([self._term(name, value, prefix) for name in FIELDS])
+        term = self._exact_term(("term", field, value, prefix))
+        if term:
+            return self.postings(term)
+        if field in WHOLE_VALUE_FIELDS or (field == "category" and " " in value.strip()):
+            return self.prefix(f"{field}:{fold_name(value)}")
+        words = tokens(value)
+        if not words:
+            return array("I")
+        # Several words in one value ("name:vitamin c") must all match
+        last = f"{field}:{words[-1]}"
+        result = self.prefix(last) if prefix else self.postings(last)
+        for word in words[:-1]:
+            result = self.filter(f"{field}:{word}", result) if result else result
+        return result
+
+
+# -- query parsing ---------------------------------------------------------------------
+
+_QUERY_TOKEN = re.compile(r'\(|\)|[\w-]+:"[^"]*"\*?|"[^"]*"\*?|[^\s()]+')
+
+
+def parse_query(query: str) -> tuple:
+    """
+    Parse ``retinol AND NOT ingredient:parfum``, ``brand:"the inkey list" (serum OR toner)``,
+    ``ingredient:niacin*``. Precedence: NOT, then AND (also implicit), then OR.
+    """
+    parts = _QUERY_TOKEN.findall(query)
+    position = 0
+
+    def peek() -> Optional[str]:
+        return parts[position] if position < len(parts) else None
+
+    def take() -> str:
+        nonlocal position
+        position += 1
+        return parts[position - 1]
+
+    def parse_or() -> tuple:
+        children = [parse_and()]
+        while peek() is not None and peek().upper() == "OR":
+            take()
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and() -> tuple:
+        children = [parse_unary()]
+        while peek() is not None and peek() != ")" and peek().upper() != "OR":
+            if peek().upper() == "AND":
+                take()
+            children.append(parse_unary())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_unary() -> tuple:
+        token = peek()
+        if token is None:
+            raise ValueError(f"Unexpected end of query: {query!r}")
+        if token.upper() == "NOT" or token == "-":
+            take()
+            return ("not", parse_unary())
+        if token.startswith("-") and len(token) > 1:
+            parts[position] = token[1:]
+            return ("not", parse_unary())
+        if token == "(":
+            take()
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError(f"Missing ')' in query: {query!r}")
+            take()
+            return node
+        take()
+        return parse_term(token)
+
+    node = parse_or()
+    if position != len(parts):
+        raise ValueError(f"Unexpected {parts[position]!r} in query: {query!r}")
+    return node
+
+
+def parse_term(token: str) -> tuple:
+    field = None
+    if ":" in token and not token.startswith('"'):
+        field, _, token = token.partition(":")
+        field = FIELD_ALIASES.get(field.lower(), field.lower())
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field {field!r}; expected one of {', '.join(FIELDS)}")
+    value = token.rstrip("*").strip('"')
+    prefix = token.endswith("*") or value.endswith("*")  # brand:"the ink*" works too
+    value = value.rstrip("*")
+    return ("term", field, value, prefix)
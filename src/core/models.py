@@ -1,5 +1,6 @@
+from array import array
 from dataclasses import dataclass, field
-from typing import List, Union
+from typing import List, Optional, Union
 import json
 from .cleaning import clean_text, clean_list
 
@@ -14,6 +15,33 @@ class Product:
     brand_name: str = ""
     category: str = ""
     concerns: List[str] = field(default_factory=list)
+    # Filled in by the optional image stage (core.images); not part of the pipe output
+    image_ok: Optional[bool] = None
+    image_size: int = 0
+    image_width: int = 0
+    image_height: int = 0
+    image_hash: str = ""
+    # Canonical INCI ids of ``ingredients`` (core.inci). In-memory only: they are not
+    # written to the pipe output and are only valid in the process that parsed them
+    ingredient_ids: Optional[array] = None
+
+    @classmethod
+    def from_pipe_row(cls, line: str) -> "Product":
+        """Inverse of ``to_pipe_row`` (JSON-array ingredients/concerns are decoded)."""
+        fields = line.rstrip("\n").split("|")
+        if len(fields) != 8:
+            raise ValueError(f"Expected 8 pipe-delimited fields, got {len(fields)}")
+        barcode, product_name, description, ingredients, image, brand_name, category, concerns = fields
+        return cls(
+            barcode=barcode,
+            product_name=product_name,
+            description=description,
+            ingredients=json.loads(ingredients) if ingredients.startswith("[") else ingredients,
+            image=image,
+            brand_name=brand_name,
+            category=category,
+            concerns=json.loads(concerns) if concerns.startswith("[") else [],
+        )
 
     def normalized(self) -> "Product":
         # Handle ingredients as either string or list
@@ -32,6 +60,12 @@ class Product:
             brand_name=clean_text(self.brand_name),
             category=clean_text(self.category),
             concerns=clean_list(self.concerns),
+            image_ok=self.image_ok,
+            image_size=self.image_size,
+            image_width=self.image_width,
+            image_height=self.image_height,
+            image_hash=self.image_hash,
+            ingredient_ids=self.ingredient_ids,
         )
 
     def to_pipe_row(self) -> str:
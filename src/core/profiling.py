@@ -0,0 +1,172 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class _Context:
+    def __init__(self) -> None:
+        self.site = ""
+        self.url = ""
+        self.stages: List[str] = []
+
+
+class Profiler:
+    """
+    Sampling profiler that attributes wall-clock time to site, URL and stage.
+
+    Disabled by default so the ``stage``/``url`` hooks cost almost nothing in
+    normal runs. When enabled, a background thread samples the stacks of the
+    threads currently inside a hook and aggregates them into collapsed stacks
+    (``site;url;stage;frame;...;frame count``) that flamegraph.pl, speedscope
+    and inferno can render directly.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.enabled = False
+        self.samples: Counter = Counter()
+        self.url_stage_seconds: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self.url_total_seconds: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._contexts: Dict[int, _Context] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.enabled:
+            return
+        self.enabled = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _context(self) -> _Context:
+        context = getattr(self._local, "context", None)
+        if context is None:
+            context = self._local.context = _Context()
+            with self._lock:
+                self._contexts[threading.get_ident()] = context
+        return context
+
+    def url(self, url: str, site: str = ""):
+        """Attribute everything inside the block to ``url`` (and ``site``)."""
+        if not self.enabled:
+            return nullcontext()
+        return self._url(url, site)
+
+    @contextmanager
+    def _url(self, url: str, site: str) -> Iterator[None]:
+        context = self._context()
+        previous = (context.site, context.url)
+        context.site, context.url = site or context.site, url
+        try:
+            yield
+        finally:
+            context.site, context.url = previous
+
+    def stage(self, name: str):
+        """Attribute everything inside the block to pipeline stage ``name``."""
+        if not self.enabled:
+            return nullcontext()
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        context = self._context()
+        context.stages.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            context.stages.pop()
+            key = (context.site, context.url or "-")
+            with self._lock:
+                # Recursive re-entry of the same stage would double count
+                if name not in context.stages:
+                    self.url_stage_seconds[key][name] += elapsed
+                # Totals only include top-level stages; nested ones
+                # (parse -> _extract_ingredients) are a breakdown of those.
+                if not context.stages:
+                    self.url_total_seconds[key] += elapsed
+
+    def _sample_loop(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                active = [
+                    (ident, context.site, context.url, list(context.stages))
+                    for ident, context in self._contexts.items()
+                    if ident != own_ident and context.stages
+                ]
+            for ident, site, url, stages in active:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name}@{os.path.basename(code.co_filename)}")
+                    frame = frame.f_back
+                stack.reverse()
+                prefix = [_sanitize(site or "-"), _sanitize(url or "-")] + [_sanitize(s) for s in stages]
+                key = ";".join(prefix + [_sanitize(entry) for entry in stack])
+                with self._lock:
+                    self.samples[key] += 1
+
+    def collapsed_stacks(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def slowest_urls(self, limit: int = 20) -> List[Tuple[str, str, float, Dict[str, float]]]:
+        with self._lock:
+            rows = [
+                (site, url, self.url_total_seconds[(site, url)], dict(stages))
+                for (site, url), stages in self.url_stage_seconds.items()
+            ]
+        rows.sort(key=lambda row: row[2], reverse=True)
+        return rows[:limit]
+
+    def report(self, limit: int = 20) -> str:
+        lines = [f"Top {limit} slowest URLs (seconds per stage):"]
+        for site, url, total, stages in self.slowest_urls(limit):
+            breakdown = ", ".join(
+                f"{name}={seconds:.3f}" for name, seconds in sorted(stages.items(), key=lambda item: -item[1])
+            )
+            lines.append(f"{total:8.3f}s  [{site or '-'}] {url}  ({breakdown})")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: Path, limit: int = 20) -> Tuple[Path, Path]:
+        """Write ``profile.folded`` and ``slowest_urls.txt`` into ``directory``."""
+        directory.mkdir(parents=True, exist_ok=True)
+        folded_path = directory / "profile.folded"
+        report_path = directory / "slowest_urls.txt"
+        folded_path.write_text(self.collapsed_stacks(), encoding="utf-8")
+        report_path.write_text(self.report(limit), encoding="utf-8")
+        return folded_path, report_path
+
+
+def _sanitize(value: str) -> str:
+    # ';' separates frames and the last space separates the sample count
+    return value.replace(";", ",").replace(" ", "_").replace("\n", "")
+
+
+PROFILER = Profiler()
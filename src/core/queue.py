@@ -0,0 +1,258 @@
+import sqlite3
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+
+def shard_for_host(host: str, num_shards: int) -> int:
+    """Stable host -> shard mapping, so one host is always served by one worker."""
+    return zlib.crc32(host.encode("utf-8")) % max(num_shards, 1)
+
+
+@dataclass
+class Task:
+    id: int
+    url: str
+    site: str
+    host: str
+    shard: int
+    attempts: int
+
+
+class WorkQueue(ABC):
+    """Lease-based URL queue shared by scrape workers."""
+
+    @abstractmethod
+    def enqueue(self, urls: Iterable[str], site: str) -> int:
+        """Add URLs for ``site``; returns how many were new."""
+
+    @abstractmethod
+    def lease(
+        self,
+        worker_id: str,
+        shards: Optional[List[int]] = None,
+        limit: int = 1,
+        visibility_timeout: float = 300.0,
+    ) -> List[Task]:
+        """Hand out up to ``limit`` tasks, invisible to others for ``visibility_timeout`` seconds."""
+
+    @abstractmethod
+    def ack(self, task: Task) -> None:
+        """Mark a leased task as done."""
+
+    @abstractmethod
+    def fail(self, task: Task, error: str, permanent: bool = False) -> None:
+        """Return a task for retry, or dead-letter it once permanent or out of attempts."""
+
+    @abstractmethod
+    def defer(self, task: Task, delay: float, error: str) -> None:
+        """Put a task back without using up an attempt and hold its host for ``delay`` seconds."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Task counts by status."""
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    site TEXT NOT NULL,
+    host TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, shard, available_at);
+CREATE TABLE IF NOT EXISTS hosts (host TEXT PRIMARY KEY, next_allowed_at REAL NOT NULL DEFAULT 0);
+"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    SQLite-backed queue for one machine or a handful of workers sharing a file.
+
+    Every URL is assigned to a shard by host at enqueue time, and ``lease``
+    hands out at most one URL per host per ``host_delay`` window, so the
+    politeness delay holds no matter how many workers pull from a shard.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        num_shards: int = 1,
+        max_attempts: int = 5,
+        host_delay: float = 2.5,
+        retry_delay: float = 30.0,
+    ) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        self.host_delay = host_delay
+        self.retry_delay = retry_delay
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=30.0, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # The shard count is fixed by whoever creates the queue
+        self.conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('num_shards', ?)", (str(num_shards),)
+        )
+        self.num_shards = int(
+            self.conn.execute("SELECT value FROM meta WHERE key = 'num_shards'").fetchone()[0]
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def enqueue(self, urls: Iterable[str], site: str) -> int:
+        rows = []
+        for url in urls:
+            host = urlparse(url).netloc.lower()
+            rows.append((url, site, host, shard_for_host(host, self.num_shards)))
+        before = self.conn.total_changes
+        with self._transaction():
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tasks (url, site, host, shard) VALUES (?, ?, ?, ?)", rows
+            )
+        return self.conn.total_changes - before
+
+    def lease(
+        self,
+        worker_id: str,
+        shards: Optional[List[int]] = None,
+        limit: int = 1,
+        visibility_timeout: float = 300.0,
+    ) -> List[Task]:
+        now = time.time()
+        shard_filter = ""
+        params: List = []
+        if shards is not None:
+            shard_filter = f"AND t.shard IN ({','.join('?' * len(shards))})"
+            params.extend(shards)
+        with self._transaction():
+            # Leases that expired without ack/fail used up an attempt already
+            self.conn.execute(
+                "UPDATE tasks SET status = 'dead', last_error = 'lease expired too often' "
+                "WHERE status = 'leased' AND lease_until <= ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            candidates = self.conn.execute(
+                f"""
+                SELECT t.id, t.url, t.site, t.host, t.shard, t.attempts
+                FROM tasks t LEFT JOIN hosts h ON h.host = t.host
+                WHERE ((t.status = 'pending' AND t.available_at <= ?)
+                       OR (t.status = 'leased' AND t.lease_until <= ?))
+                  AND COALESCE(h.next_allowed_at, 0) <= ?
+                  {shard_filter}
+                ORDER BY t.available_at, t.id
+                LIMIT ?
+                """,
+                [now, now, now] + params + [limit * 50],
+            ).fetchall()
+            tasks: List[Task] = []
+            seen_hosts = set()
+            for row in candidates:
+                task = Task(*row)
+                if task.host in seen_hosts:
+                    continue
+                seen_hosts.add(task.host)
+                task.attempts += 1
+                tasks.append(task)
+                if len(tasks) >= limit:
+                    break
+            for task in tasks:
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'leased', attempts = ?, lease_owner = ?, lease_until = ? "
+                    "WHERE id = ?",
+                    (task.attempts, worker_id, now + visibility_timeout, task.id),
+                )
+                self.conn.execute(
+                    "INSERT INTO hosts (host, next_allowed_at) VALUES (?, ?) "
+                    "ON CONFLICT(host) DO UPDATE SET next_allowed_at = excluded.next_allowed_at",
+                    (task.host, now + self.host_delay),
+                )
+        return tasks
+
+    def ack(self, task: Task) -> None:
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE tasks SET status = 'done', lease_owner = NULL, lease_until = NULL WHERE id = ?",
+                (task.id,),
+            )
+
+    def fail(self, task: Task, error: str, permanent: bool = False) -> None:
+        if permanent or task.attempts >= self.max_attempts:
+            status, available_at = "dead", 0.0
+        else:
+            # Exponential backoff between attempts
+            status, available_at = "pending", time.time() + self.retry_delay * 2 ** (task.attempts - 1)
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, available_at = ?, last_error = ?, "
+                "lease_owner = NULL, lease_until = NULL WHERE id = ?",
+                (status, available_at, error[:500], task.id),
+            )
+
+    def defer(self, task: Task, delay: float, error: str) -> None:
+        until = time.time() + delay
+        with self._transaction():
+            self.conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = MAX(attempts - 1, 0), available_at = ?, "
+                "last_error = ?, lease_owner = NULL, lease_until = NULL WHERE id = ?",
+                (until, error[:500], task.id),
+            )
+            # Park the host for every worker, not just this task
+            self.conn.execute(
+                "INSERT INTO hosts (host, next_allowed_at) VALUES (?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET next_allowed_at = MAX(next_allowed_at, excluded.next_allowed_at)",
+                (task.host, until),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        counts = {"pending": 0, "leased": 0, "done": 0, "dead": 0}
+        for status, count in self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def dead_letters(self) -> List[Dict[str, str]]:
+        rows = self.conn.execute(
+            "SELECT url, site, attempts, last_error FROM tasks WHERE status = 'dead' ORDER BY id"
+        )
+        return [
+            {"url": url, "site": site, "attempts": attempts, "error": error or ""}
+            for url, site, attempts, error in rows
+        ]
+
+    def has_unfinished(self, shards: Optional[List[int]] = None) -> bool:
+        query = "SELECT 1 FROM tasks WHERE status IN ('pending', 'leased')"
+        params: List = []
+        if shards is not None:
+            query += f" AND shard IN ({','.join('?' * len(shards))})"
+            params.extend(shards)
+        return self.conn.execute(query + " LIMIT 1", params).fetchone() is not None
+
+    def _transaction(self):
+        return Transaction(self.conn)
+
+
+class Transaction:
+    """BEGIN IMMEDIATE so concurrent workers serialize on the write lock."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
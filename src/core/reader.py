@@ -0,0 +1,322 @@
+"""
+Random access to pipe-delimited products files without loading them.
+
+``ProductFile`` memory-maps the data file and keeps two compact indexes in a
+``<file>.rows`` sidecar:
+
+* row start offsets (``array('Q')``), so row *i* is one slice of the map;
+* an open-addressing hash table from a 64-bit barcode hash to row number
+  (``array('Q')`` keys, ``array('I')`` rows). Hits are verified against the
+  mapped row, so hash collisions cannot return a wrong product; a barcode
+  that appears several times maps to its latest row.
+
+Products files are append-only, so a stale sidecar is extended with the rows
+written since it was saved rather than rebuilt (a digest of the last indexed
+bytes detects files that were rewritten instead). Only newline-terminated rows
+are indexed; a row still being written shows up on the next open. One-shot
+tools reading a finished file pass ``final=True``, which also indexes a last
+row without a trailing newline (in memory only, never in the sidecar).
+"""
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, TypeVar
+from .metrics import METRICS
+from .models import Product
+
+
+T = TypeVar("T")
+
+_MAGIC = b"KSROWS01"
+_HEADER = struct.Struct("<8sQQQ16s")  # magic, indexed bytes, rows, table capacity, tail digest
+_TAIL = 4096
+_EMPTY = 0
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+def barcode_key(barcode: bytes) -> int:
+    key = int.from_bytes(hashlib.blake2b(barcode, digest_size=8).digest(), "little")
+    return key or 1  # 0 marks an empty slot
+
+
+class ProductFile:
+    """
+    Memory-mapped products file: ``len(f)``, ``f[i]``, ``f.get(barcode)``,
+    ``f.view(start, stop)`` and ``f.chunks(n)`` for parallel consumers.
+
+    Rows are data rows (the header line is not counted). ``view`` returns a
+    zero-copy ``memoryview``; release views before ``close``.
+    """
+
+    def __init__(
+        self, path: Path, index_path: Optional[Path] = None, persist: bool = True, final: bool = False
+    ) -> None:
+        self.path = path
+        self.index_path = index_path or path.with_name(path.name + ".rows")
+        self.persist = persist
+        self.header = b""
+        self._file = path.open("rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.offsets = array("Q")
+        self._keys = array("Q")
+        self._slots = array("I")
+        self._indexed = 0
+        self._open_tail = False  # last row has no newline (final=True only)
+        if not self._load():
+            self.offsets, self._indexed = array("Q"), 0
+            self._allocate(1024)
+        stale = self._indexed < len(self._map)
+        self._scan()
+        if stale and persist:
+            self.save()
+        if final:
+            self._scan_tail()
+
+    def __enter__(self) -> "ProductFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, row: int) -> Product:
+        return Product.from_pipe_row(self.line(row).decode("utf-8"))
+
+    def __iter__(self) -> Iterator[Product]:
+        return self.rows()
+
+    # -- access ------------------------------------------------------------------
+
+    def line(self, row: int) -> bytes:
+        """Raw row ``row`` (negative counts from the end), without the newline."""
+        if row < 0:
+            row += len(self.offsets)
+        return self._map[self.offsets[row]:self._stop(row)]
+
+    def lines(self, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+        stop = len(self.offsets) if stop is None else min(stop, len(self.offsets))
+        for row in range(start, stop):
+            yield self._map[self.offsets[row]:self._stop(row)]
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Product]:
+        for line in self.lines(start, stop):
+            yield Product.from_pipe_row(line.decode("utf-8"))
+
+    def view(self, start: int, stop: int) -> memoryview:
+        """Zero-copy bytes of rows ``[start, stop)``, newlines included (an open last row has none)."""
+        stop = min(stop, len(self.offsets))
+        if start >= stop:
+            return memoryview(b"")
+        return memoryview(self._map)[self.offsets[start]:self._end(stop - 1)]
+
+    def row_of(self, barcode: str) -> Optional[int]:
+        if not barcode:
+            return None
+        encoded = barcode.encode("utf-8")
+        mask = len(self._keys) - 1
+        key = barcode_key(encoded)
+        slot = self._slot(key, mask)
+        while self._keys[slot] != _EMPTY:
+            if self._keys[slot] == key and self._barcode(self._slots[slot]) == encoded:
+                return self._slots[slot]
+            slot = (slot + 1) & mask
+        return None
+
+    def get(self, barcode: str) -> Optional[Product]:
+        row = self.row_of(barcode)
+        return None if row is None else self[row]
+
+    def chunks(self, count: int) -> List[Tuple[int, int]]:
+        """Split the rows into ``count`` row ranges of about equal byte size."""
+        rows = len(self.offsets)
+        if not rows:
+            return []
+        first, end = self.offsets[0], self._end(rows - 1)
+        bounds = [0]
+        for part in range(1, count):
+            boundary = bisect_left(self.offsets, first + (end - first) * part // count, bounds[-1])
+            if boundary > bounds[-1]:
+                bounds.append(boundary)
+        bounds.append(rows)
+        return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+    # -- indexing ----------------------------------------------------------------
+
+    def _end(self, row: int) -> int:
+        return self.offsets[row + 1] if row + 1 < len(self.offsets) else self._indexed
+
+    def _stop(self, row: int) -> int:
+        """End of row ``row`` without its newline."""
+        if self._open_tail and row == len(self.offsets) - 1:
+            return self._indexed
+        return self._end(row) - 1
+
+    def _barcode(self, row: int) -> bytes:
+        start = self.offsets[row]
+        end = self._map.find(b"|", start, self._end(row))
+        return self._map[start:end] if end != -1 else b""
+
+    @staticmethod
+    def _slot(key: int, mask: int) -> int:
+        return ((key * _MIX) & _MASK64) >> 32 & mask
+
+    def _scan(self) -> None:
+        data = self._map
+        position = self._indexed
+        if position == 0:
+            newline = data.find(b"\n")
+            if newline != -1 and data[:8] == b"barcode|":
+                self.header = data[:newline]
+                position = self._indexed = newline + 1
+        elif data[:8] == b"barcode|":
+            self.header = data[:data.find(b"\n")]
+        while True:
+            newline = data.find(b"\n", position)
+            if newline == -1:
+                break
+            if newline > position:  # skip blank lines
+                self.offsets.append(position)
+                self._indexed = newline + 1
+                self._insert(len(self.offsets) - 1)
+            position = newline + 1
+
+    def _scan_tail(self) -> None:
+        """Index the bytes after the last newline as a final row; runs after ``save``."""
+        data = self._map
+        position = self._indexed
+        if position == 0 and data[:8] == b"barcode|":
+            self.header = data[:].rstrip(b"\r")  # header without a newline, no rows
+            self._indexed = len(data)
+            return
+        if not data[position:].strip():
+            return
+        self.offsets.append(position)
+        self._indexed = len(data)
+        self._open_tail = True
+        self._insert(len(self.offsets) - 1)
+
+    def _insert(self, row: int) -> None:
+        if 2 * len(self.offsets) > len(self._keys):
+            self._allocate(2 * len(self._keys))
+            return  # _allocate re-inserted every row, this one included
+        barcode = self._barcode(row)
+        if not barcode:
+            return
+        mask = len(self._keys) - 1
+        key = barcode_key(barcode)
+        slot = self._slot(key, mask)
+        while self._keys[slot] != _EMPTY:
+            if self._keys[slot] == key and self._barcode(self._slots[slot]) == barcode:
+                break  # a later row with the same barcode wins
+            slot = (slot + 1) & mask
+        self._keys[slot] = key
+        self._slots[slot] = row
+
+    def _allocate(self, capacity: int) -> None:
+        self._keys = array("Q", bytes(8 * capacity))
+        self._slots = array("I", bytes(4 * capacity))
+        rows = len(self.offsets)
+        for row in range(rows):
+            self._insert(row)
+
+    def _load(self) -> bool:
+        try:
+            with self.index_path.open("rb") as handle:
+                magic, indexed, rows, capacity, tail = _HEADER.unpack(handle.read(_HEADER.size))
+                if magic != _MAGIC or indexed > len(self._map):
+                    return False
+                if tail != self._tail_digest(indexed):
+                    return False  # the data file was rewritten (e.g. by compact.py)
+                self.offsets.fromfile(handle, rows)
+                self._keys.fromfile(handle, capacity)
+                self._slots.fromfile(handle, capacity)
+        except (OSError, EOFError, struct.error):
+            return False
+        self._indexed = indexed
+        return True
+
+    def _tail_digest(self, indexed: int) -> bytes:
+        return hashlib.blake2b(self._map[max(indexed - _TAIL, 0):indexed], digest_size=16).digest()
+
+    def save(self) -> None:
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with tmp_path.open("wb") as handle:
+                handle.write(
+                    _HEADER.pack(
+                        _MAGIC, self._indexed, len(self.offsets), len(self._keys), self._tail_digest(self._indexed)
+                    )
+                )
+                self.offsets.tofile(handle)
+                self._keys.tofile(handle)
+                self._slots.tofile(handle)
+            os.replace(tmp_path, self.index_path)
+        except OSError as exc:
+            # A read-only location only costs the next open a rescan
+            METRICS.inc("row_index_save_errors_total")
+            print(f"Could not save row index {self.index_path}: {exc}")
+
+
+# One reader per process, reused across the chunks of one map_chunks call
+_reader: Optional[ProductFile] = None
+_reader_key: Optional[Tuple[str, bool, int]] = None  # path, final, mapped size
+
+
+def _run_chunk(job: Tuple[str, bool, int, int, int, Callable[[ProductFile, int, int], T]]) -> T:
+    global _reader, _reader_key
+    path, final, size, start, stop, func = job
+    if _reader is None or _reader_key != (path, final, size):
+        _close_reader()
+        _reader = ProductFile(Path(path), persist=False, final=final)
+        _reader_key = (path, final, size)
+    return func(_reader, start, stop)
+
+
+def _close_reader() -> None:
+    global _reader, _reader_key
+    if _reader is not None:
+        _reader.close()
+    _reader = _reader_key = None
+
+
+def map_chunks(
+    path: Path,
+    func: Callable[[ProductFile, int, int], T],
+    workers: Optional[int] = None,
+    chunks_per_worker: int = 4,
+    final: bool = False,
+) -> Iterator[T]:
+    """
+    Run ``func(reader, start, stop)`` over line-aligned row ranges in worker
+    processes; results come back in file order. ``func`` must be picklable
+    (a module-level function). Each process maps the file itself, so rows are
+    never pickled across. ``final`` is passed on to ``ProductFile``.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProductFile(path, final=final) as reader:  # builds/refreshes the sidecar once
+        ranges = reader.chunks(workers * chunks_per_worker)
+        size = len(reader._map)
+    jobs = [(str(path), final, size, start, stop, func) for start, stop in ranges]
+    if workers == 1:
+        try:
+            yield from map(_run_chunk, jobs)
+        finally:
+            _close_reader()  # runs in this process: do not keep the map open after the call
+        return
+    # Worker readers are released when the pool terminates its processes
+    with Pool(workers) as pool:
+        yield from pool.imap(_run_chunk, jobs)
@@ -0,0 +1,266 @@
+"""
+Bound how long a run can spend on hosts that are failing.
+
+* ``CircuitBreaker`` trips after ``failure_threshold`` consecutive failures
+  (timeouts, connection errors, 5xx, 429) and rejects requests to that host
+  until a cooldown passes. It then lets a single half-open probe through:
+  success closes the breaker, failure re-opens it with a doubled cooldown.
+* ``RunBudget`` is a wall-clock budget for the whole run. ``HttpClient``
+  never lets a request deadline extend past it.
+* ``UrlFeed`` / ``scrape_resilient`` skip URLs of open hosts, replay them
+  after the main list and hand back whatever is left for a later run. Other
+  fetch errors are recorded per URL in ``UrlFeed.failed`` and the run moves on.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, TypeVar
+from urllib.parse import urlparse
+import requests
+from .metrics import METRICS
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+T = TypeVar("T")
+
+
+class HostUnavailable(requests.RequestException):
+    """Raised instead of (or right after) a request to a host whose breaker is open."""
+
+    def __init__(self, host: str, retry_in: float, reason: str = "", **kwargs) -> None:
+        detail = f": {reason}" if reason else ""
+        super().__init__(f"{host} unavailable for {retry_in:.0f}s (circuit open{detail})", **kwargs)
+        self.host = host
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(requests.RequestException):
+    """The per-request deadline (or the run budget) ran out before the request succeeded."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+        max_cooldown: float = 600.0,
+    ) -> None:
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.retry_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a request could be sent now (does not claim the half-open probe)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() >= self.retry_at
+            return not self._probing
+
+    def allow(self) -> bool:
+        """Claim permission to send one request; only one probe passes while half-open."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() < self.retry_at:
+                    return False
+                self.state = HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            return max(self.retry_at - time.monotonic(), 0.0)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"Circuit for {self.host} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probing = False
+
+    def record_failure(self, reason: str = "") -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # Failed probe: back off harder before the next one
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.state == OPEN or self.failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.retry_at = time.monotonic() + self.cooldown
+            self._probing = False
+        print(f"Circuit for {self.host} open for {self.cooldown:.0f}s after {self.failures} failures ({reason})")
+        METRICS.inc("circuit_opened_total", host=self.host)
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+
+class CircuitBreakers:
+    """Process-wide per-host breakers, shared by every ``HttpClient``."""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, max_cooldown: float = 600.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold: int, cooldown: float, max_cooldown: Optional[float] = None) -> None:
+        """Set the thresholds used for breakers created from now on."""
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        if max_cooldown is not None:
+            self.max_cooldown = max_cooldown
+
+    def get(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(
+                    host, self.failure_threshold, self.cooldown, self.max_cooldown
+                )
+            return breaker
+
+    def open_hosts(self) -> List[str]:
+        with self._lock:
+            return sorted(host for host, breaker in self._breakers.items() if breaker.state != CLOSED)
+
+
+class RunBudget:
+    """Wall-clock budget for a whole run; unlimited until ``start`` is called."""
+
+    def __init__(self) -> None:
+        self.deadline: Optional[float] = None
+
+    def start(self, seconds: float) -> None:
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+BREAKERS = CircuitBreakers()
+RUN_BUDGET = RunBudget()
+
+
+def _host(url: str) -> str:
+    return urlparse(url).netloc
+
+
+class UrlFeed:
+    """
+    URL iterator that puts URLs of open-circuit hosts aside and replays them
+    once the main list is done (waiting for the breaker's half-open window if
+    the run budget allows). Stops when the run budget expires.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        breakers: CircuitBreakers = BREAKERS,
+        budget: RunBudget = RUN_BUDGET,
+        max_deferrals: int = 3,
+    ) -> None:
+        self.pending: Deque[str] = deque(urls)
+        self.deferred: Deque[str] = deque()
+        self.breakers = breakers
+        self.budget = budget
+        self.max_deferrals = max_deferrals
+        self.deferrals: Dict[str, int] = {}
+        self.gave_up: List[str] = []
+        self.failed: Dict[str, str] = {}  # URL -> error, for fetch errors other than deferrals
+        self.current: Optional[str] = None
+
+    def __iter__(self) -> Iterator[str]:
+        while not self.budget.expired:
+            url = self._next_url()
+            if url is None:
+                break
+            self.current = url
+            yield url
+        if self.pending or self.deferred:
+            print(f"Run budget spent with {len(self.pending) + len(self.deferred)} URLs left for a later run")
+
+    def _next_url(self) -> Optional[str]:
+        while self.pending:
+            url = self.pending.popleft()
+            if self.breakers.get(_host(url)).available():
+                return url
+            self.deferred.append(url)
+        while self.deferred:
+            for _ in range(len(self.deferred)):
+                url = self.deferred.popleft()
+                if self.breakers.get(_host(url)).available():
+                    return url
+                self.deferred.append(url)
+            # Every deferred host is still open: wait for the earliest half-open window
+            wait = min(self.breakers.get(_host(url)).retry_in() for url in self.deferred)
+            remaining = self.budget.remaining()
+            if remaining is not None and wait >= remaining:
+                return None
+            time.sleep(max(wait, 0.1))
+        return None
+
+    def defer(self, url: str) -> None:
+        count = self.deferrals[url] = self.deferrals.get(url, 0) + 1
+        METRICS.inc("urls_deferred_total", host=_host(url))
+        if count > self.max_deferrals:
+            self.gave_up.append(url)
+        else:
+            self.deferred.append(url)
+
+    def fail(self, url: str, error: str) -> None:
+        self.failed[url] = error
+        METRICS.inc("urls_failed_total", host=_host(url))
+
+    def leftover(self) -> List[str]:
+        """URLs that were not scraped: never reached, still deferred, or given up on."""
+        return list(self.pending) + list(self.deferred) + self.gave_up
+
+
+def scrape_resilient(scrape: Callable[[Iterable[str]], Iterable[T]], feed: UrlFeed) -> Iterator[T]:
+    """
+    Run ``scrape`` (e.g. ``scraper.scrape_products``) over ``feed``, deferring
+    the current URL whenever its host is unavailable or its deadline runs out
+    and restarting the scraper on the rest of the feed. Any other request
+    error fails only the current URL (see ``UrlFeed.fail``).
+    """
+    while True:
+        try:
+            yield from scrape(feed)
+            return
+        except (HostUnavailable, DeadlineExceeded) as exc:
+            print(f"Deferring {feed.current}: {exc}")
+            feed.defer(feed.current)
+        except requests.RequestException as exc:
+            print(f"Failed {feed.current}: {exc}")
+            feed.fail(feed.current, f"{type(exc).__name__}: {exc}")
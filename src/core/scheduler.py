@@ -0,0 +1,163 @@
+"""
+Freshness-driven recrawl scheduling.
+
+``RecrawlScheduler`` keeps one row of history per URL in SQLite: when it was
+last scraped, how often its content changed, and its last error. Each URL has
+its own recrawl interval. The interval halves when a scrape finds changed
+content and grows by ``1.5x`` when it does not, within
+``[min_interval, max_interval]``. A failure pushes the next attempt out
+exponentially (``error_backoff * 2**(errors - 1)``).
+
+``select(budget)`` returns at most ``budget`` URLs that are due. Never-scraped
+URLs come first, then the rest in order of
+``overdue ratio * estimated change rate * (4 if hot)``. Hosts are interleaved
+round-robin, so one host's politeness delay overlaps with requests to the others.
+"""
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+from .queue import Transaction
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    hot INTEGER NOT NULL DEFAULT 0,
+    scrapes INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT,
+    last_scraped REAL,
+    interval REAL NOT NULL,
+    next_due REAL NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS urls_due ON urls (next_due);
+"""
+
+HOT_BOOST = 4.0
+
+
+class RecrawlScheduler:
+    """Per-URL crawl history and budgeted, host-interleaved URL selection."""
+
+    def __init__(
+        self,
+        path: Path,
+        min_interval: float = 6 * 3600,
+        max_interval: float = 30 * 86400,
+        error_backoff: float = 3600,
+    ) -> None:
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.error_backoff = error_backoff
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=30.0, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def add(self, urls: Iterable[str], hot: bool = False) -> int:
+        """Track ``urls`` (new ones are due immediately); returns how many were new."""
+        rows = [(url, urlparse(url).netloc.lower(), int(hot), self.min_interval) for url in urls]
+        before = self.conn.total_changes
+        with Transaction(self.conn):
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, host, hot, interval) VALUES (?, ?, ?, ?)", rows
+            )
+            added = self.conn.total_changes - before
+            if hot:
+                self.conn.executemany("UPDATE urls SET hot = 1 WHERE url = ?", [(row[0],) for row in rows])
+        return added
+
+    def select(self, budget: Optional[int] = None, now: Optional[float] = None) -> List[str]:
+        """Up to ``budget`` due URLs, best first, with hosts interleaved."""
+        now = time.time() if now is None else now
+        rows = self.conn.execute(
+            """
+            SELECT url, host FROM urls
+            WHERE next_due <= :now
+            ORDER BY
+                last_scraped IS NOT NULL,
+                ((:now - COALESCE(last_scraped, :now)) / interval)
+                    * ((changes + 1.0) / (scrapes + 2.0))
+                    * (CASE WHEN hot THEN :boost ELSE 1.0 END) DESC,
+                hot DESC,
+                url
+            LIMIT :limit
+            """,
+            {"now": now, "boost": HOT_BOOST, "limit": -1 if budget is None else budget},
+        ).fetchall()
+        return interleave_hosts(rows)
+
+    def record_success(self, url: str, content_hash: str, now: Optional[float] = None) -> Optional[bool]:
+        """Record a scrape of ``url``; returns whether its content changed (None on the first scrape)."""
+        now = time.time() if now is None else now
+        with Transaction(self.conn):
+            row = self.conn.execute(
+                "SELECT content_hash, interval, scrapes FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO urls (url, host, interval) VALUES (?, ?, ?)",
+                    (url, urlparse(url).netloc.lower(), self.min_interval),
+                )
+                previous, interval, scrapes = None, self.min_interval, 0
+            else:
+                previous, interval, scrapes = row
+            changed = scrapes > 0 and content_hash != previous
+            if scrapes:
+                interval = interval / 2 if changed else interval * 1.5
+            interval = min(max(interval, self.min_interval), self.max_interval)
+            self.conn.execute(
+                "UPDATE urls SET scrapes = scrapes + 1, changes = changes + ?, content_hash = ?, "
+                "last_scraped = ?, interval = ?, next_due = ?, errors = 0, last_error = NULL WHERE url = ?",
+                (int(changed), content_hash, now, interval, now + interval, url),
+            )
+        return changed if scrapes else None
+
+    def record_failure(self, url: str, error: str, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with Transaction(self.conn):
+            row = self.conn.execute("SELECT errors FROM urls WHERE url = ?", (url,)).fetchone()
+            errors = (row[0] if row else 0) + 1
+            delay = min(self.error_backoff * 2 ** min(errors - 1, 20), self.max_interval)
+            self.conn.execute(
+                "INSERT OR IGNORE INTO urls (url, host, interval) VALUES (?, ?, ?)",
+                (url, urlparse(url).netloc.lower(), self.min_interval),
+            )
+            self.conn.execute(
+                "UPDATE urls SET errors = ?, last_error = ?, next_due = ? WHERE url = ?",
+                (errors, error[:500], now + delay, url),
+            )
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, int]:
+        now = time.time() if now is None else now
+        total, due, never, failing = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(next_due <= ?), 0), COALESCE(SUM(last_scraped IS NULL), 0), "
+            "COALESCE(SUM(errors > 0), 0) FROM urls",
+            (now,),
+        ).fetchone()
+        return {"urls": total, "due": due, "never_scraped": never, "failing": failing}
+
+
+def interleave_hosts(rows: Iterable[tuple]) -> List[str]:
+    """Round-robin over hosts, keeping each host's URLs in their given order."""
+    by_host: "OrderedDict[str, Deque[str]]" = OrderedDict()
+    for url, host in rows:
+        by_host.setdefault(host, deque()).append(url)
+    ordered: List[str] = []
+    while by_host:
+        for host in list(by_host):
+            queue = by_host[host]
+            ordered.append(queue.popleft())
+            if not queue:
+                del by_host[host]
+    return ordered
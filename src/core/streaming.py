@@ -0,0 +1,135 @@
+import codecs
+import json
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Tuple
+from .client import HttpClient
+from .metrics import METRICS
+
+
+_HEADER_CHARSET = re.compile(r"charset=[\"']?([\w-]+)", re.IGNORECASE)
+_META_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?([\w-]+)", re.IGNORECASE)
+
+
+def sniff_encoding(content_type: str, head: bytes) -> str:
+    """
+    Encoding of a streamed HTML body: the ``Content-Type`` charset, else a
+    ``<meta charset>`` in the first chunk, else UTF-8.
+
+    ``requests`` reports ISO-8859-1 for any ``text/*`` response without a
+    charset, which would garble UTF-8 pages, so its guess is not used.
+    """
+    match = _HEADER_CHARSET.search(content_type or "") or _META_CHARSET.search(head[:4096])
+    if match:
+        name = match.group(1) if isinstance(match.group(1), str) else match.group(1).decode("ascii")
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+@dataclass
+class HeadMetadata:
+    url: str
+    meta: Dict[str, str] = field(default_factory=dict)  # property/name -> content (first wins)
+    ld_json: List[dict] = field(default_factory=list)
+    title: str = ""
+    bytes_read: int = 0
+    complete: bool = False  # True once </head> (or <body>) was reached
+
+    def get(self, *names: str) -> str:
+        for name in names:
+            value = self.meta.get(name)
+            if value:
+                return value
+        return ""
+
+
+class HeadMetadataParser(HTMLParser):
+    """
+    Event-based parser that keeps only ``<meta>``, ``<title>`` and JSON-LD
+    ``<script>`` content from the document head and flags when the head ends.
+    """
+
+    def __init__(self, metadata: HeadMetadata) -> None:
+        super().__init__(convert_charrefs=True)
+        self.metadata = metadata
+        self.done = False
+        self._in_ld_json = False
+        self._in_title = False
+        self._buffer: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "meta":
+            attributes = dict(attrs)
+            name = attributes.get("property") or attributes.get("name") or attributes.get("itemprop")
+            content = attributes.get("content")
+            if name and content:
+                self.metadata.meta.setdefault(name.strip(), content.strip())
+        elif tag == "script":
+            script_type = (dict(attrs).get("type") or "").lower()
+            if script_type == "application/ld+json":
+                self._in_ld_json = True
+                self._buffer = []
+        elif tag == "title":
+            self._in_title = True
+            self._buffer = []
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "script" and self._in_ld_json:
+            self._in_ld_json = False
+            try:
+                value = json.loads("".join(self._buffer))
+            except ValueError:
+                return
+            items = value if isinstance(value, list) else [value]
+            self.metadata.ld_json.extend(item for item in items if isinstance(item, dict))
+        elif tag == "title" and self._in_title:
+            self._in_title = False
+            self.metadata.title = "".join(self._buffer).strip()
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data: str) -> None:
+        if self._in_ld_json or self._in_title:
+            self._buffer.append(data)
+
+
+def fetch_head_metadata(
+    client: HttpClient,
+    url: str,
+    required: Iterable[str] = ("og:title", "og:description", "og:image"),
+    chunk_size: int = 16 * 1024,
+    max_bytes: int = 2 * 1024 * 1024,
+) -> HeadMetadata:
+    """
+    Stream ``url`` and stop reading as soon as ``</head>`` is seen or every
+    ``required`` meta field has been found.
+
+    Closing the response early means the connection is not returned to the
+    keep-alive pool, which is far cheaper than downloading a 500KB+ body.
+    """
+    required = tuple(required)
+    metadata = HeadMetadata(url=url)
+    parser = HeadMetadataParser(metadata)
+    with client.stream(url) as response:
+        decoder = None
+        for chunk in client.iter_chunks(response, chunk_size):
+            if decoder is None:
+                encoding = sniff_encoding(response.headers.get("Content-Type", ""), chunk)
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            metadata.bytes_read += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if parser.done:
+                metadata.complete = True
+                break
+            if required and all(name in metadata.meta for name in required):
+                break
+            if metadata.bytes_read >= max_bytes:
+                break
+    METRICS.inc("head_stream_bytes_total", metadata.bytes_read)
+    return metadata
@@ -0,0 +1,144 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:  # optional: only needed for HTTP/2
+    import httpx
+except ImportError:  # pragma: no cover - depends on the environment
+    httpx = None
+
+try:  # httpx imports fine without it, but Client(http2=True) needs it
+    import h2
+except ImportError:  # pragma: no cover - depends on the environment
+    h2 = None
+
+# Retried transparently on both transports; 429 is handled by HttpClient
+RETRY_STATUSES = (500, 502, 503, 504)
+RETRY_METHODS = ("GET", "POST", "HEAD")
+
+
+@dataclass
+class TransportConfig:
+    """Connection pool, timeout and protocol settings shared by every HttpClient."""
+
+    pool_connections: int = 10  # number of per-host pools kept alive
+    pool_maxsize: int = 10  # connections per host pool
+    host_pool_sizes: Dict[str, int] = field(default_factory=dict)  # host -> pool size override
+    connect_timeout: float = 5.0
+    read_timeout: float = 20.0
+    retries: int = 5
+    backoff_factor: float = 1.0
+    max_backoff: float = 60.0  # cap on any single retry sleep (429 or 5xx)
+    request_deadline: float = 120.0  # total seconds one fetch may spend, retries included
+    http2: bool = False
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+    def key(self) -> tuple:
+        return (
+            self.pool_connections,
+            self.pool_maxsize,
+            tuple(sorted(self.host_pool_sizes.items())),
+            self.retries,
+            self.backoff_factor,
+            self.max_backoff,
+            self.http2,
+        )
+
+
+_lock = threading.Lock()
+_sessions: Dict[tuple, requests.Session] = {}
+_http2_clients: Dict[tuple, "httpx.Client"] = {}
+
+
+def _build_retry(config: TransportConfig) -> Retry:
+    return Retry(
+        total=config.retries,
+        backoff_factor=config.backoff_factor,
+        status_forcelist=list(RETRY_STATUSES),
+        allowed_methods=list(RETRY_METHODS),
+        backoff_max=config.max_backoff,
+        # An uncapped Retry-After on a 503 would sleep past any deadline
+        respect_retry_after_header=False,
+    )
+
+
+def retry_backoff(config: TransportConfig, retry: int) -> float:
+    """Sleep before 5xx retry number ``retry`` (1-based), matching urllib3's ``Retry`` schedule."""
+    if retry <= 1:
+        return 0.0
+    return min(config.backoff_factor * 2 ** (retry - 1), config.max_backoff)
+
+
+def shared_session(config: Optional[TransportConfig] = None) -> requests.Session:
+    """
+    Return the process-wide ``requests.Session`` for ``config``.
+
+    Every scraper built with an equivalent config reuses the same keep-alive
+    pools, so TLS handshakes to a host are paid once per process rather than
+    once per client.
+    """
+    config = config or TransportConfig()
+    key = config.key()
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            retry = _build_retry(config)
+            adapter = HTTPAdapter(
+                pool_connections=config.pool_connections,
+                pool_maxsize=config.pool_maxsize,
+                max_retries=retry,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            # requests picks the longest matching prefix, so host mounts win
+            for host, size in config.host_pool_sizes.items():
+                host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=retry)
+                session.mount(f"https://{host}/", host_adapter)
+                session.mount(f"http://{host}/", host_adapter)
+            _sessions[key] = session
+        return session
+
+
+def http2_available() -> bool:
+    return httpx is not None and h2 is not None
+
+
+def shared_http2_client(config: TransportConfig) -> "httpx.Client":
+    """Return the process-wide HTTP/2 client (requires ``httpx[http2]``)."""
+    if not http2_available():
+        raise RuntimeError("HTTP/2 requires the optional dependency: pip install 'httpx[http2]'")
+    key = config.key()
+    with _lock:
+        client = _http2_clients.get(key)
+        if client is None:
+            # With HTTP/2 one connection per host multiplexes all streams
+            max_connections = max([config.pool_maxsize] + list(config.host_pool_sizes.values()))
+            client = httpx.Client(
+                http2=True,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=max_connections * config.pool_connections,
+                    max_keepalive_connections=config.pool_connections,
+                ),
+                timeout=httpx.Timeout(config.read_timeout, connect=config.connect_timeout),
+                transport=httpx.HTTPTransport(http2=True, retries=config.retries),
+            )
+            _http2_clients[key] = client
+        return client
+
+
+def close_all() -> None:
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        for client in _http2_clients.values():
+            client.close()
+        _sessions.clear()
+        _http2_clients.clear()
@@ -1,4 +1,5 @@
 from typing import List, Tuple
+from .metrics import METRICS
 from .models import Product
 
 
@@ -62,6 +63,9 @@ class ProductValidator:
                 errors.append(
                     ValidationError("image", "Invalid URL format (must start with http)")
                 )
+            # Only set when the image stage ran (core.images)
+            if product.image_ok is False:
+                errors.append(ValidationError("image", "Image URL is unreachable or not an image"))
         
         # Check barcode format (should be numeric if present)
         if product.barcode:
@@ -99,6 +103,8 @@ class ProductValidator:
                 warnings.append(ValidationError(field, "Recommended field is empty"))
         
         is_valid = len(errors) == 0
+        for error in errors:
+            METRICS.inc("validation_failures_total", field=error.field)
         all_issues = errors + warnings
         
         return is_valid, all_issues
@@ -1,32 +1,159 @@
+import hashlib
+import os
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, Set
+from typing import Iterable, Iterator, Optional, Set, TextIO, Tuple
+from .metrics import METRICS
 from .models import Product
+from .profiling import PROFILER
+
+try:  # POSIX only; elsewhere concurrent writers are not serialized
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
 
 
 HEADER = "barcode|product_name|description|ingredients|image|brand_name|category|concerns"
 
 
-def write_products(path: Path, products: Iterable[Product]) -> None:
+def read_products(path: Path) -> Iterator[Tuple[int, Product]]:
+    """Yield ``(line number, Product)`` for each data row of a products file; malformed rows are skipped."""
+    with path.open("r", encoding="utf-8") as file:
+        for row, line in enumerate(file, 1):
+            if row == 1 and line.startswith("barcode|"):
+                continue
+            if not line.strip():
+                continue
+            try:
+                yield row, Product.from_pipe_row(line)
+            except ValueError as exc:
+                METRICS.inc("rows_malformed_total")
+                print(f"Skipping {path}:{row}: {exc}")
+
+
+def row_digest(row: str) -> bytes:
+    return hashlib.blake2b(row.encode("utf-8"), digest_size=16).digest()
+
+
+def write_products(path: Path, products: Iterable[Product]) -> int:
+    """Append new, non-empty ``products`` to ``path``; returns how many rows were written."""
+    return ProductAppender(path).append(products)
+
+
+@contextmanager
+def open_locked(path: Path) -> Iterator[TextIO]:
+    """
+    Open ``path`` for appending under an exclusive ``flock``.
+
+    Compaction replaces the file with ``os.replace``; a writer that was
+    waiting on the old file notices the new inode and reopens, so its rows
+    are never appended to an unlinked file.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Read existing products to avoid duplicates
-    existing_products: Set[str] = set()
-    if path.exists():
-        with path.open("r", encoding="utf-8") as file:
-            lines = file.readlines()
-            if len(lines) > 1:  # Skip header
-                existing_products = set(line.strip() for line in lines[1:] if line.strip())
-    
-    # Write header if file doesn't exist, otherwise append
-    mode = "w" if not path.exists() else "a"
-    with path.open(mode, encoding="utf-8") as file:
-        if mode == "w":
+    while True:
+        file = path.open("a", encoding="utf-8")
+        if fcntl is None:
+            break
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            if os.stat(path).st_ino == os.fstat(file.fileno()).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        file.close()  # closing releases the lock
+    try:
+        yield file
+        file.flush()
+    finally:
+        file.close()
+
+
+class ProductAppender:
+    """
+    Repeated batch appends to one products file (long-running writers).
+
+    Duplicates are detected against a 16-byte digest of every row in the
+    file. The digests are kept between batches, and only the rows other
+    writers appended since the last batch are read (the whole file again
+    after compaction replaced it). The lock is held from that catch-up read
+    to the last append, so concurrent writers neither interleave lines nor
+    miss each other's rows.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._digests: Set[bytes] = set()
+        self._inode: Optional[int] = None
+        self._offset = 0
+
+    def append(self, products: Iterable[Product]) -> int:
+        written = 0
+        with PROFILER.stage("write"), METRICS.timer("write_seconds"), open_locked(self.path) as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                self._digests, self._offset = set(), 0
+            if stat.st_size == 0:
+                file.write(f"{HEADER}\n")
+            elif stat.st_size > self._offset:
+                self._catch_up()
+            for product_row in _product_rows(products, self._digests):
+                file.write(f"{product_row}\n")
+                written += 1
+            file.flush()
+            self._inode, self._offset = stat.st_ino, os.fstat(file.fileno()).st_size
+        return written
+
+    def _catch_up(self) -> None:
+        with self.path.open("rb") as existing:
+            existing.seek(self._offset)
+            for line in existing:
+                row = line.decode("utf-8").strip()
+                if row:
+                    self._digests.add(row_digest(row))
+
+
+def write_shard(directory: Path, writer_id: str, products: Iterable[Product]) -> Optional[Path]:
+    """
+    Write ``products`` as a new immutable shard ``products.<time_ns>.<writer_id>.txt``.
+
+    The shard is written to a temp file, fsynced and renamed into place, so
+    readers and ``compact.py`` only ever see complete shards. Returns the
+    shard path, or None when nothing was left to write.
+    """
+    with PROFILER.stage("write"), METRICS.timer("write_seconds"):
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"products.{time.time_ns():020d}.{writer_id}.txt"
+        tmp_path = path.with_name(path.name + ".tmp")
+        written = 0
+        with tmp_path.open("w", encoding="utf-8") as file:
             file.write(f"{HEADER}\n")
-        
-        for product in products:
+            for product_row in _product_rows(products, set()):
+                file.write(f"{product_row}\n")
+                written += 1
+            file.flush()
+            os.fsync(file.fileno())
+        if not written:
+            tmp_path.unlink()
+            return None
+        os.replace(tmp_path, path)
+        return path
+
+
+def _product_rows(products: Iterable[Product], existing_products: Set[bytes]) -> Iterator[str]:
+    for product in products:
+        start = time.perf_counter()
+        with PROFILER.stage("normalize"):
             product_row = product.to_pipe_row()
-            if product_row not in existing_products:
-                   # Skip empty products (404 errors, failed extractions)
-                   if not product.product_name or not product.brand_name or not product.image:
-                       continue
-                   file.write(f"{product_row}\n")
+        METRICS.observe("normalize_seconds", time.perf_counter() - start)
+        digest = row_digest(product_row)
+        if digest not in existing_products:
+            # Skip empty products (404 errors, failed extractions)
+            if not product.product_name or not product.brand_name or not product.image:
+                METRICS.inc("products_skipped_total", reason="empty")
+                continue
+            existing_products.add(digest)
+            METRICS.inc("products_written_total")
+            yield product_row
+        else:
+            METRICS.inc("products_skipped_total", reason="duplicate")
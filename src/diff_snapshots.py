@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from core.diff import SnapshotDiff
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Diff two products snapshots into a JSONL change feed (added/removed/changed)"
+    )
+    parser.add_argument("old", type=Path, help="Previous snapshot (pipe-delimited products file)")
+    parser.add_argument("new", type=Path, help="Current snapshot")
+    parser.add_argument("--output", type=Path, help="Change feed file (default: stdout)")
+    parser.add_argument(
+        "--mode",
+        choices=["auto", "hash", "merge"],
+        default="auto",
+        help="hash: in-memory key join; merge: external sort-merge; auto: hash while --memory-rows allows",
+    )
+    parser.add_argument(
+        "--memory-rows",
+        type=int,
+        default=2_000_000,
+        help="Rows (both snapshots together) held in memory before switching to sort-merge (default: 2000000)",
+    )
+    parser.add_argument("--tmp-dir", type=Path, help="Directory for sorted runs (default: system temp)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    for path in (args.old, args.new):
+        if not path.exists():
+            raise SystemExit(f"Snapshot not found: {path}")
+    start = time.perf_counter()
+    differ = SnapshotDiff(args.memory_rows, tmp_dir=args.tmp_dir)
+    events = differ.diff(args.old, args.new, args.mode)
+    if args.output:
+        # Written to a temp file first so consumers never read a partial feed
+        tmp_path = args.output.with_name(args.output.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            for event in events:
+                handle.write(json.dumps(event, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, args.output)
+    else:
+        for event in events:
+            sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+    counts = differ.counts
+    print(
+        f"{counts['added']} added, {counts['removed']} removed, {counts['changed']} changed, "
+        f"{counts['unchanged']} unchanged ({time.perf_counter() - start:.1f}s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
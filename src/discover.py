@@ -0,0 +1,73 @@
+import argparse
+import time
+from pathlib import Path
+
+from core.client import HttpClient
+from core.discovery import ListingCrawler, load_urls
+from main import export_metrics
+from sites.base import SiteScraper
+from sites.registry import SCRAPERS
+
+
+# Only scrapers that implement listing parsing can discover URLs
+DISCOVERABLE = sorted(
+    slug for slug, scraper in SCRAPERS.items() if scraper.parse_listing is not SiteScraper.parse_listing
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Discover product URLs by walking brand/category listing pages and their pagination"
+    )
+    parser.add_argument("site", choices=DISCOVERABLE, help="Site slug (sites with listing discovery only)")
+    parser.add_argument("seeds", type=Path, help="Text file with one brand/category listing URL per line")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("urls.txt"),
+        help="URL list to append new products to; products already in it are skipped",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Listing pages fetched concurrently (also the browser sessions started)"
+    )
+    parser.add_argument("--max-pages", type=int, default=1000, help="Listing pages fetched per run")
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=1,
+        help="Levels of brand/category links followed from the seeds (pagination is always followed)",
+    )
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds each worker waits between pages")
+    parser.add_argument("--metrics-file", type=Path, help="Write Prometheus text-format metrics to this file")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    scraper = SCRAPERS[args.site](HttpClient())
+    scraper.set_workers(args.workers)
+    crawler = ListingCrawler(
+        fetch=scraper.fetch_html,
+        parse=scraper.parse_listing,
+        output=args.output,
+        product_id=scraper.product_id,
+        workers=args.workers,
+        max_pages=args.max_pages,
+        max_depth=args.max_depth,
+        delay=args.delay,
+    )
+    start = time.perf_counter()
+    try:
+        added = crawler.run(load_urls(args.seeds))
+    finally:
+        scraper.close()
+        export_metrics(args.metrics_file, None)
+    print(
+        f"Discovered {added} new products ({len(crawler.seen_products)} known) from "
+        f"{crawler.pages_fetched} listing pages ({crawler.pages_failed} failed) in "
+        f"{time.perf_counter() - start:.1f}s; URLs in {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,25 @@
 import argparse
+import os
 from pathlib import Path
-from typing import List, Type
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+from core.adaptive import EXTRACTOR_STATS
+from core.archive import ARCHIVE
 from core.client import HttpClient
-from core.writer import write_products
-from sites.base import SiteScraper
-from sites.notino import NotinoScraper
-from sites.sephora import SephoraScraper
-from sites.sisley import SisleyScraper
-from sites.korres import KorresScraper
-from sites.adaherbs import AdaherbsScraper
-from sites.rossmann import RossmannScraper
-from sites.caudalie import CaudalieScraper
-from sites.altanatura import AltanaturaScraper
-from sites.dermedic import DermedicScraper
-from sites.inkeylist import InkeyListScraper
-from sites.apivita import ApivitaScraper
-from sites.goodjuju import GoodJujuScraper
-from sites.yesstyle import YesStyleScraper
-from sites.theordinary import TheOrdinaryScraper
-from sites.versed import VersedScraper
-
-
-SCRAPERS: dict[str, Type[SiteScraper]] = {
-    "notino": NotinoScraper,
-    "sephora": SephoraScraper,
-    "sisley": SisleyScraper,
-    "korres": KorresScraper,
-    "adaherbs": AdaherbsScraper,
-    "rossmann": RossmannScraper,
-    "caudalie": CaudalieScraper,
-    "altanatura": AltanaturaScraper,
-    "dermedic": DermedicScraper,
-    "inkeylist": InkeyListScraper,
-    "apivita": ApivitaScraper,
-    "goodjuju": GoodJujuScraper,
-    "yesstyle": YesStyleScraper,
-    "theordinary": TheOrdinaryScraper,
-    "versed": VersedScraper,
-}
-
-
-def load_urls(file_path: Path) -> List[str]:
-    with file_path.open("r", encoding="utf-8") as handle:
-        return [line.strip() for line in handle if line.strip()]
+from core.inci import INCI
+from core.index import ProductIndex
+from core.concerns import CONCERNS
+from core.discovery import load_urls
+from core.images import BlobStore, ImagePipeline
+from core.transport import TransportConfig
+from core.metrics import METRICS
+from core.profiling import PROFILER
+from core.models import Product
+from core.resilience import BREAKERS, RUN_BUDGET, UrlFeed, scrape_resilient
+from core.scheduler import RecrawlScheduler
+from core.validation import ProductValidator
+from core.writer import row_digest, write_products, write_shard
+from sites.registry import SCRAPERS
 
 
 def parse_args() -> argparse.Namespace:
@@ -56,18 +32,314 @@ def parse_args() -> argparse.Namespace:
         default=Path("products.txt"),
         help="Output file (pipe-delimited)",
     )
+    parser.add_argument(
+        "--shard-dir",
+        type=Path,
+        metavar="DIR",
+        help="Write this run's products as a new atomic shard in DIR instead of appending to --output "
+        "(merge shards with compact.py)",
+    )
+    parser.add_argument("--connect-timeout", type=float, default=5.0, help="TCP/TLS connect timeout in seconds")
+    parser.add_argument("--read-timeout", type=float, default=20.0, help="Read timeout in seconds")
+    parser.add_argument(
+        "--request-deadline",
+        type=float,
+        default=120.0,
+        help="Total seconds one URL may spend on retries and backoff (default: 120)",
+    )
+    parser.add_argument("--max-backoff", type=float, default=60.0, help="Cap on any single retry sleep in seconds")
+    parser.add_argument(
+        "--run-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Stop starting new URLs after this many seconds; unfinished URLs go to --deferred-file",
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=5,
+        help="Consecutive failures (timeouts, 5xx, 429) that open a host's circuit breaker (default: 5)",
+    )
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=30.0,
+        help="Seconds an open breaker waits before a half-open probe; doubles per failed probe (default: 30)",
+    )
+    parser.add_argument(
+        "--deferred-file",
+        type=Path,
+        help="Write URLs left unscraped (open breakers, spent budget) here for a later run",
+    )
+    parser.add_argument(
+        "--schedule-db",
+        type=Path,
+        metavar="PATH",
+        help="Keep per-URL crawl history here and scrape only due URLs, most likely changed first",
+    )
+    parser.add_argument(
+        "--request-budget",
+        type=int,
+        help="Scrape at most this many URLs in this run (with --schedule-db: the top-priority due ones)",
+    )
+    parser.add_argument(
+        "--hot-urls",
+        type=Path,
+        metavar="FILE",
+        help="URLs to prioritize in the schedule (one per line, e.g. bestsellers)",
+    )
+    parser.add_argument("--pool-size", type=int, default=10, help="Keep-alive connections per host")
+    parser.add_argument(
+        "--host-pool-size",
+        action="append",
+        default=[],
+        metavar="HOST=N",
+        help="Per-host pool size override (repeatable)",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Multiplex requests over HTTP/2 (requires httpx[http2])",
+    )
+    parser.add_argument(
+        "--images",
+        choices=["off", "head", "download"],
+        default="off",
+        help="Verify product images with HEAD requests or download them into --image-store",
+    )
+    parser.add_argument(
+        "--image-store",
+        type=Path,
+        default=Path("images"),
+        help="Content-addressed image directory for --images download (default: images/)",
+    )
+    parser.add_argument("--image-workers", type=int, default=8, help="Concurrent image requests")
+    parser.add_argument(
+        "--image-manifest",
+        type=Path,
+        help="JSONL sidecar for image status, size, dimensions and hash per product "
+        "(default: <image-store>/index.jsonl)",
+    )
+    parser.add_argument(
+        "--tag-concerns",
+        action="store_true",
+        help="Fill empty concerns from the name, description and ingredients (see tag_concerns.py for backfills)",
+    )
+    parser.add_argument(
+        "--archive",
+        type=Path,
+        metavar="PATH",
+        help="Append every fetched page to this WARC-style archive (e.g. archive/notino.warc.gz) for reparse.py",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        help="Write Prometheus text-format metrics to this file (e.g. for node_exporter's textfile collector)",
+    )
+    parser.add_argument(
+        "--summary-file",
+        type=Path,
+        help="Write a JSON run summary (counters and latency histograms) to this file",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="DIR",
+        help="Sample-profile the run and write collapsed stacks plus a slowest-URL report to DIR",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=20,
+        help="Number of URLs in the slowest-URL report (default: 20)",
+    )
+    parser.add_argument(
+        "--extractor-stats",
+        type=Path,
+        metavar="PATH",
+        help="Load/save per-site extractor hit rates here so fallback ordering carries over between runs",
+    )
+    parser.add_argument(
+        "--inci-dictionary",
+        type=Path,
+        metavar="PATH",
+        help="Load/save the canonical ingredient dictionary so INCI ids stay stable between runs",
+    )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        metavar="DIR",
+        help="Keep a search index of the output file in DIR, updated with the rows this run appends",
+    )
+    parser.add_argument(
+        "--extractor-report",
+        action="store_true",
+        help="Print extractor hit rates and never-hitting fallbacks after the run",
+    )
     return parser.parse_args()
 
 
+def build_transport_config(args: argparse.Namespace) -> TransportConfig:
+    host_pool_sizes = {}
+    for entry in args.host_pool_size:
+        host, _, size = entry.partition("=")
+        if not host or not size.isdigit():
+            raise SystemExit(f"Invalid --host-pool-size value: {entry!r} (expected HOST=N)")
+        host_pool_sizes[host] = int(size)
+    return TransportConfig(
+        pool_maxsize=args.pool_size,
+        host_pool_sizes=host_pool_sizes,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        max_backoff=args.max_backoff,
+        request_deadline=args.request_deadline,
+        http2=args.http2,
+    )
+
+
+def export_profile(profile_dir: Optional[Path], top: int) -> None:
+    if not profile_dir:
+        return
+    PROFILER.stop()
+    folded_path, report_path = PROFILER.write(profile_dir, top)
+    print(f"Wrote flamegraph stacks to {folded_path} and slowest URLs to {report_path}")
+
+
+def export_metrics(metrics_file: Optional[Path], summary_file: Optional[Path]) -> None:
+    if metrics_file:
+        METRICS.write_prometheus(metrics_file)
+        print(f"Wrote metrics to {metrics_file}")
+    if summary_file:
+        METRICS.write_summary(summary_file)
+        print(f"Wrote run summary to {summary_file}")
+
+
+def export_deferred(feed: UrlFeed, deferred_file: Optional[Path]) -> None:
+    leftover = feed.leftover()
+    if not leftover:
+        return
+    open_hosts = BREAKERS.open_hosts()
+    if open_hosts:
+        print(f"Hosts with open circuit breakers: {', '.join(open_hosts)}")
+    if deferred_file:
+        deferred_file.parent.mkdir(parents=True, exist_ok=True)
+        deferred_file.write_text("".join(f"{url}\n" for url in leftover), encoding="utf-8")
+        print(f"Deferred {len(leftover)} URLs to {deferred_file}")
+    else:
+        print(f"{len(leftover)} URLs were not scraped (use --deferred-file to keep them)")
+
+
+def export_extractor_stats(stats_file: Optional[Path], report: bool) -> None:
+    if stats_file:
+        EXTRACTOR_STATS.save(stats_file)
+    if report:
+        print(EXTRACTOR_STATS.report(), end="")
+        for key, name, attempts in EXTRACTOR_STATS.dead_fallbacks():
+            print(f"Dead fallback: {key} {name} (0 hits in {attempts} attempts)")
+
+
+def update_index(index_dir: Path, output: Path) -> None:
+    index = ProductIndex(index_dir, source=output)
+    try:
+        added = index.update()
+    finally:
+        index.close()
+    print(f"Indexed {added} new rows in {index_dir} ({index.doc_count} total)")
+
+
+def schedule_urls(args: argparse.Namespace, urls: List[str]) -> Tuple[List[str], Optional[RecrawlScheduler]]:
+    if not args.schedule_db:
+        return urls[:args.request_budget] if args.request_budget else urls, None
+    scheduler = RecrawlScheduler(args.schedule_db)
+    added = scheduler.add(urls)
+    if args.hot_urls:
+        scheduler.add(load_urls(args.hot_urls), hot=True)
+    selected = scheduler.select(args.request_budget)
+    stats = scheduler.stats()
+    print(
+        f"Schedule: {len(selected)} of {stats['due']} due URLs selected ({stats['urls']} tracked, "
+        f"{added} new, {stats['failing']} failing)"
+    )
+    return selected, scheduler
+
+
+def record_outcomes(scraped: Iterable[Product], feed: UrlFeed, scheduler: RecrawlScheduler) -> Iterator[Product]:
+    # Scrapers are generators, so feed.current is still the URL a product came from
+    for product in scraped:
+        if product.product_name:
+            changed = scheduler.record_success(feed.current, row_digest(product.to_pipe_row()).hex())
+            outcome = "first" if changed is None else "changed" if changed else "unchanged"
+            METRICS.inc("recrawl_results_total", outcome=outcome)
+        else:
+            scheduler.record_failure(feed.current, "empty product")
+            METRICS.inc("recrawl_results_total", outcome="empty")
+        yield product
+
+
 def main() -> None:
     args = parse_args()
-    urls = load_urls(args.url_file)
-    client = HttpClient()
+    BREAKERS.configure(args.breaker_threshold, args.breaker_cooldown)
+    if args.run_budget:
+        RUN_BUDGET.start(args.run_budget)
+    urls, scheduler = schedule_urls(args, load_urls(args.url_file))
+    feed = UrlFeed(urls)
+    client = HttpClient(config=build_transport_config(args))
     scraper_class = SCRAPERS[args.site]
     scraper = scraper_class(client)
-    products = list(scraper.scrape_products(urls))
-    write_products(args.output, products)
-    print(f"Saved {len(products)} products to {args.output}")
+    if args.archive:
+        ARCHIVE.open(args.archive)
+    if args.extractor_stats:
+        EXTRACTOR_STATS.load(args.extractor_stats)
+    if args.inci_dictionary and args.inci_dictionary.exists():
+        INCI.load(args.inci_dictionary)
+    if args.profile:
+        PROFILER.start()
+    image_pipeline = None
+    if args.images != "off":
+        image_pipeline = ImagePipeline(
+            client,
+            mode=args.images,
+            store=BlobStore(args.image_store) if args.images == "download" else None,
+            workers=args.image_workers,
+            manifest=args.image_manifest or args.image_store / "index.jsonl",
+        )
+    try:
+        scraped = scrape_resilient(scraper.scrape_products, feed)
+        if scheduler:
+            scraped = record_outcomes(scraped, feed, scheduler)
+        if image_pipeline:
+            scraped = image_pipeline.process(scraped)
+        if args.tag_concerns:
+            scraped = CONCERNS.tag_stream(scraped)
+        products = list(scraped)
+        stats = ProductValidator.validate_batch(products)
+        print(f"Valid: {stats['valid']}/{stats['total']} products")
+        if args.shard_dir:
+            shard = write_shard(args.shard_dir, f"{args.site}-{os.getpid()}", products)
+            print(f"Saved {len(products)} products to {shard or 'no shard (nothing new)'}")
+        else:
+            write_products(args.output, products)
+            print(f"Saved {len(products)} products to {args.output}")
+        if args.index and not args.shard_dir:
+            update_index(args.index, args.output)
+    finally:
+        # Not from scrape_products: scrape_resilient restarts it after every deferral
+        scraper.close()
+        if image_pipeline:
+            image_pipeline.close()
+        ARCHIVE.close()
+        export_deferred(feed, args.deferred_file)
+        if scheduler:
+            for url in feed.gave_up:
+                scheduler.record_failure(url, "host unavailable")
+            for url, error in feed.failed.items():
+                scheduler.record_failure(url, error)
+            scheduler.close()
+        export_profile(args.profile, args.profile_top)
+        export_metrics(args.metrics_file, args.summary_file)
+        export_extractor_stats(args.extractor_stats, args.extractor_report)
+        if args.inci_dictionary:
+            INCI.save(args.inci_dictionary)
 
 
 if __name__ == "__main__":
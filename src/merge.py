@@ -0,0 +1,112 @@
+import argparse
+import json
+import time
+from array import array
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from core.entities import EntityResolver, GoldenRecords, SQLiteBarcodeIndex
+from core.models import Product
+from core.writer import read_products, write_products
+
+
+def parse_source(value: str) -> Tuple[str, Path]:
+    """``notino=products_notino.txt`` or a bare path (source named after the file)."""
+    source, sep, path = value.partition("=")
+    if not sep:
+        return Path(value).stem, Path(value)
+    return source, Path(path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Merge products from several sites into golden records")
+    parser.add_argument(
+        "inputs",
+        type=parse_source,
+        nargs="+",
+        metavar="[SOURCE=]PATH",
+        help="Pipe-delimited product files, optionally prefixed with a source name",
+    )
+    parser.add_argument("--output", type=Path, default=Path("golden.jsonl"), help="Golden records (JSON lines)")
+    parser.add_argument(
+        "--pipe-output",
+        type=Path,
+        help="Also write golden records in the standard pipe-delimited products format",
+    )
+    parser.add_argument(
+        "--prefer",
+        default="",
+        help="Comma-separated source priority for field values (default: input order)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.7,
+        help="Name similarity (trigram Jaccard) needed for a match without barcode (default: 0.7)",
+    )
+    parser.add_argument(
+        "--memory-rows",
+        type=int,
+        default=200_000,
+        help="Rows held in memory before spilling a sorted run while building golden records (default: 200000)",
+    )
+    parser.add_argument("--tmp-dir", type=Path, help="Directory for sorted runs (default: system temp)")
+    parser.add_argument(
+        "--index-db",
+        type=Path,
+        help="Keep the barcode index in this SQLite file instead of memory",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    inputs: List[Tuple[str, Path]] = args.inputs
+    for _, path in inputs:
+        if not path.exists():
+            raise SystemExit(f"Input file not found: {path}")
+    prefer = [source for source in args.prefer.split(",") if source] or [source for source, _ in inputs]
+    barcode_index = SQLiteBarcodeIndex(args.index_db) if args.index_db else None
+    resolver = EntityResolver(barcode_index, threshold=args.threshold)
+
+    # Pass 1: resolve entities, remembering only one cluster id per row
+    start = time.perf_counter()
+    assignments = array("q")
+    for _, path in inputs:
+        for _, product in read_products(path):
+            assignments.append(resolver.add(product))
+    resolver.close()
+    print(
+        f"Resolved {len(assignments)} rows in {time.perf_counter() - start:.1f}s "
+        f"({resolver.barcode_matches} barcode matches, {resolver.name_matches} name matches)"
+    )
+
+    # Pass 2: stream the rows again; golden records are built from an external sort by entity
+    golden = GoldenRecords(prefer, args.memory_rows, args.tmp_dir)
+
+    def members() -> Iterator[Tuple[int, str, int, Product]]:
+        position = 0
+        for source, path in inputs:
+            for row, product in read_products(path):
+                yield resolver.find(assignments[position]), source, row, product
+                position += 1
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    entities = 0
+    with args.output.open("w", encoding="utf-8") as handle:
+        for record in golden.build(members()):
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            entities += 1
+    print(f"Wrote {entities} entities to {args.output}")
+    if args.pipe_output:
+        write_products(args.pipe_output, (GoldenRecords.to_product(record) for record in read_golden(args.output)))
+        print(f"Wrote golden records to {args.pipe_output}")
+
+
+def read_golden(path: Path) -> Iterator[dict]:
+    with path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            yield json.loads(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+from core.index import ProductIndex
+from core.inci import INCI
+from core.models import Product
+from core.writer import HEADER
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build and query a search index over a products file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Create the index or add rows appended since the last build")
+    build.add_argument("source", type=Path, help="Pipe-delimited products file")
+    build.add_argument("index", type=Path, help="Index directory")
+    build.add_argument(
+        "--segment-rows", type=int, default=100_000, help="Rows per index segment (bounds build memory)"
+    )
+    build.add_argument("--compact", action="store_true", help="Merge all segments into one afterwards")
+
+    search = commands.add_parser(
+        "search",
+        help="Run a query, e.g. 'ingredient:niacinamide AND NOT ingredient:parfum' or 'brand:\"the inkey*\"'",
+    )
+    search.add_argument("index", type=Path, help="Index directory")
+    search.add_argument("query", help="Boolean query: AND/OR/NOT, parentheses, field:value, value* prefixes")
+    search.add_argument("--limit", type=int, default=20, help="Rows to print (default: 20, 0 for all)")
+    search.add_argument("--format", choices=("table", "pipe", "json"), default="table", help="Output format")
+    search.add_argument("--count", action="store_true", help="Only print the number of matches")
+    search.add_argument(
+        "--no-update", action="store_true", help="Skip indexing rows appended to the source since the last build"
+    )
+
+    terms = commands.add_parser("terms", help="List indexed terms starting with a prefix, e.g. ingredient:niacin")
+    terms.add_argument("index", type=Path, help="Index directory")
+    terms.add_argument("prefix", help="field:prefix")
+    terms.add_argument("--limit", type=int, default=20, help="Terms to print")
+
+    for command in (build, search, terms):
+        command.add_argument(
+            "--inci-dictionary",
+            type=Path,
+            metavar="PATH",
+            help="Ingredient dictionary saved by main.py, so synonyms resolve like in the scrape",
+        )
+    return parser.parse_args()
+
+
+def print_rows(index: ProductIndex, doc_ids, output_format: str) -> None:
+    for line in index.rows(doc_ids):
+        if output_format == "pipe":
+            print(line)
+            continue
+        product = Product.from_pipe_row(line)
+        if output_format == "json":
+            print(json.dumps({name: getattr(product, name) for name in HEADER.split("|")}, ensure_ascii=False))
+        else:
+            print(f"{product.barcode:<14} {product.brand_name[:24]:<24} {product.product_name[:60]}")
+
+
+def main() -> None:
+    args = parse_args()
+    if args.inci_dictionary and args.inci_dictionary.exists():
+        INCI.load(args.inci_dictionary)
+
+    if args.command == "build":
+        if not args.source.exists():
+            raise SystemExit(f"Products file not found: {args.source}")
+        start = time.perf_counter()
+        index = ProductIndex(args.index, source=args.source, segment_rows=args.segment_rows)
+        added = index.update()
+        if args.compact:
+            index.compact()
+        print(
+            f"Indexed {added} new rows in {time.perf_counter() - start:.1f}s "
+            f"({index.doc_count} total, {len(index.segments)} segments)"
+        )
+        index.close()
+        return
+
+    if not (args.index / ProductIndex.MANIFEST).exists():
+        raise SystemExit(f"No index in {args.index} (run: query.py build PRODUCTS {args.index})")
+    index = ProductIndex(args.index)
+    try:
+        if args.command == "terms":
+            for term, frequency in index.terms(args.prefix, args.limit):
+                print(f"{frequency:>8}  {term}")
+            return
+        if not args.no_update and index.source.exists():
+            added = index.update()
+            if added:
+                print(f"Indexed {added} new rows")
+        start = time.perf_counter()
+        try:
+            matches = index.search(args.query)
+        except ValueError as exc:
+            raise SystemExit(str(exc))
+        elapsed = (time.perf_counter() - start) * 1000
+        if not args.count:
+            print_rows(index, matches[:args.limit] if args.limit else matches, args.format)
+        print(f"{len(matches)} matches in {elapsed:.2f} ms")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import os
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.archive import IndexEntry, load_index, read_at
+from core.client import HttpClient
+from core.models import Product
+from core.validation import ProductValidator
+from core.writer import write_products
+from sites.base import SiteScraper
+from sites.registry import SCRAPERS
+
+
+# (archive path, offset, length) of one record
+Job = Tuple[str, int, int]
+
+_scraper: Optional[SiteScraper] = None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Re-run a site's parser over archived pages (no network traffic)"
+    )
+    parser.add_argument("site", choices=SCRAPERS.keys(), help="Site slug whose _parse_product to run")
+    parser.add_argument("archives", type=Path, nargs="+", help="Page archives written with --archive")
+    parser.add_argument("--output", type=Path, default=Path("products.txt"), help="Output file (pipe-delimited)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parser processes")
+    parser.add_argument("--chunk-size", type=int, default=100, help="Records handed to a process at a time")
+    parser.add_argument(
+        "--all-versions",
+        action="store_true",
+        help="Parse every archived copy of a URL instead of only the newest",
+    )
+    parser.add_argument(
+        "--include-errors",
+        action="store_true",
+        help="Also parse error responses and challenge pages",
+    )
+    return parser.parse_args()
+
+
+def select_jobs(archives: List[Path], all_versions: bool, include_errors: bool) -> List[Job]:
+    """Records to parse; later archives and later records win for a repeated URL."""
+    latest: Dict[str, Job] = {}
+    jobs: List[Job] = []
+    skipped = 0
+    for path in archives:
+        entries: List[IndexEntry] = load_index(path)
+        for entry in entries:
+            if not include_errors and (entry.status >= 400 or entry.challenged):
+                skipped += 1
+                continue
+            job = (str(path), entry.offset, entry.length)
+            if all_versions:
+                jobs.append(job)
+            else:
+                latest.pop(entry.url, None)  # keep first-seen order of the newest copy
+                latest[entry.url] = job
+    if skipped:
+        print(f"Skipping {skipped} error/challenge records (use --include-errors to parse them)")
+    return jobs if all_versions else list(latest.values())
+
+
+def _init_worker(site: str) -> None:
+    global _scraper
+    _scraper = SCRAPERS[site](HttpClient())
+
+
+def _parse_chunk(jobs: List[Job]) -> Tuple[List[Product], int]:
+    products: List[Product] = []
+    failures = 0
+    handles = {}
+    try:
+        for path, offset, length in jobs:
+            handle = handles.get(path)
+            if handle is None:
+                handle = handles[path] = open(path, "rb")
+            page = read_at(handle, offset, length)
+            try:
+                product = _scraper._parse_product(page.text, page.url)
+            except Exception as exc:
+                failures += 1
+                print(f"  failed {page.url}: {type(exc).__name__}: {exc}")
+                continue
+            # INCI ids interned in this process would not match the parent's dictionary
+            product.ingredient_ids = None
+            products.append(product)
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return products, failures
+
+
+def main() -> None:
+    args = parse_args()
+    if not hasattr(SCRAPERS[args.site], "_parse_product"):
+        raise SystemExit(f"{args.site} has no _parse_product to re-run")
+    jobs = select_jobs(args.archives, args.all_versions, args.include_errors)
+    chunks = [jobs[i:i + args.chunk_size] for i in range(0, len(jobs), args.chunk_size)]
+    print(f"Re-parsing {len(jobs)} archived pages with {args.workers} processes")
+    products: List[Product] = []
+    failures = 0
+    pool = Pool(args.workers, initializer=_init_worker, initargs=(args.site,)) if args.workers > 1 else None
+    try:
+        if pool is None:
+            _init_worker(args.site)
+            results = map(_parse_chunk, chunks)
+        else:
+            results = pool.imap(_parse_chunk, chunks)
+        for chunk_products, chunk_failures in results:
+            products.extend(chunk_products)
+            failures += chunk_failures
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    stats = ProductValidator.validate_batch(products)
+    print(f"Valid: {stats['valid']}/{stats['total']} products ({failures} parse failures)")
+    write_products(args.output, products)
+    print(f"Saved {len(products)} products to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
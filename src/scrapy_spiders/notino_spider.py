@@ -1,6 +1,7 @@
 import scrapy
 from typing import Iterator, Dict, Any
 from scrapy.http import Response
+from core.inci import parse_ingredients
 
 
 class NotinoSpider(scrapy.Spider):
@@ -75,7 +76,7 @@ class NotinoSpider(scrapy.Spider):
         
         if ingredients_section:
             ingredients_text = " ".join(ingredients_section).strip()
-            ingredients = [i.strip() for i in ingredients_text.split(",") if i.strip()]
+            ingredients = list(parse_ingredients(ingredients_text).names)
         
         yield {
             "barcode": barcode.strip(),
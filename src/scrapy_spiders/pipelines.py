@@ -0,0 +1,41 @@
+from pathlib import Path
+from typing import List
+from core.models import Product
+from core.writer import ProductAppender
+
+
+class ProductWriterPipeline:
+    """Write spider items through the project's normalizer and writer in batches."""
+
+    def __init__(self, output: Path, batch_size: int) -> None:
+        self.output = output
+        self.batch_size = batch_size
+        self.buffer: List[Product] = []
+        self.written = 0
+        # Keeps row digests between batches, so a flush does not re-read the whole output
+        self.appender = ProductAppender(output)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            output=Path(settings.get("PRODUCTS_OUTPUT", "products.txt")),
+            batch_size=settings.getint("PRODUCTS_BATCH_SIZE", 100),
+        )
+
+    def process_item(self, item, spider=None):
+        product = item if isinstance(item, Product) else Product(**item)
+        self.buffer.append(product)
+        if len(self.buffer) >= self.batch_size:
+            self._flush()
+        return item
+
+    def close_spider(self, spider=None) -> None:
+        self._flush()
+        print(f"Saved {self.written} products to {self.output}")
+
+    def _flush(self) -> None:
+        if not self.buffer:
+            return
+        self.written += self.appender.append(self.buffer)
+        self.buffer = []
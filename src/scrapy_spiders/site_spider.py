@@ -0,0 +1,81 @@
+import scrapy
+from pathlib import Path
+from typing import Iterator
+from scrapy.http import Response
+from core.archive import ARCHIVE
+from core.client import HttpClient
+from core.metrics import METRICS
+from core.discovery import load_urls
+from core.models import Product
+from main import SCRAPERS
+
+
+class SiteSpider(scrapy.Spider):
+    """
+    Generic spider that delegates parsing to a registered ``SiteScraper``.
+
+    Scrapy only does the downloading (AutoThrottle, per-domain concurrency);
+    fields come from the scraper's own ``_parse_product`` and items are
+    written by ``ProductWriterPipeline``, so there is a single parser per site.
+    Meant for the plain-HTTP sites - Cloudflare-protected ones (Notino) still
+    need the browser path.
+
+    Usage (from ``src/``):
+        scrapy runspider scrapy_spiders/site_spider.py -a site=inkeylist -a urls=../urls.txt \
+            -s PRODUCTS_OUTPUT=../products.txt
+
+    Add ``-a archive=../archive/inkeylist.warc.gz`` to keep the raw pages for
+    ``reparse.py``.
+    """
+
+    name = "site"
+    custom_settings = {
+        "USER_AGENT": (
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/121.0.0.0 Safari/537.36"
+        ),
+        "ROBOTSTXT_OBEY": False,
+        "COOKIES_ENABLED": True,
+        "CONCURRENT_REQUESTS": 32,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 4,
+        "DOWNLOAD_DELAY": 0.5,
+        "AUTOTHROTTLE_ENABLED": True,
+        "AUTOTHROTTLE_START_DELAY": 1.0,
+        "AUTOTHROTTLE_MAX_DELAY": 30.0,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 2.0,
+        "RETRY_ENABLED": True,
+        "RETRY_TIMES": 5,
+        "RETRY_HTTP_CODES": [429, 500, 502, 503, 504],
+        "DEFAULT_REQUEST_HEADERS": {
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9,de;q=0.8",
+        },
+        "ITEM_PIPELINES": {"scrapy_spiders.pipelines.ProductWriterPipeline": 300},
+    }
+
+    def __init__(self, site: str = None, urls: str = None, archive: str = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if site not in SCRAPERS:
+            raise ValueError(f"Unknown site {site!r}; choose one of: {', '.join(SCRAPERS)}")
+        self.site = site
+        self.scraper = SCRAPERS[site](HttpClient())
+        if not hasattr(self.scraper, "_parse_product"):
+            raise ValueError(f"{type(self.scraper).__name__} has no _parse_product to delegate to")
+        self.start_urls = load_urls(Path(urls)) if urls else []
+        if archive:
+            ARCHIVE.open(Path(archive))
+
+    def closed(self, reason: str) -> None:
+        ARCHIVE.close()
+
+    def parse(self, response: Response) -> Iterator[Product]:
+        if ARCHIVE.enabled:
+            headers = {
+                key.decode("latin-1"): b", ".join(values).decode("latin-1")
+                for key, values in response.headers.items()
+            }
+            ARCHIVE.record(response.url, response.status, headers, response.body, tier="scrapy")
+        with METRICS.timer("parse_seconds", site=self.site):
+            product = self.scraper._parse_product(response.text, response.url)
+        yield product
@@ -1,12 +1,7 @@
-from typing import Iterable
-from core.models import Product
-from core.client import HttpClient
-from .base import SiteScraper
+from .spec import SpecScraper
 
 
-class AdaherbsScraper(SiteScraper):
-    def __init__(self, client: HttpClient) -> None:
-        super().__init__(client)
+class AdaherbsScraper(SpecScraper):
+    """Driven by ``specs/adaherbs.json``."""
 
-    def scrape_products(self, urls: Iterable[str]) -> Iterable[Product]:
-        raise NotImplementedError("Implement Adaherbs scraper based on network analysis or HTML parsing.")
+    spec_name = "adaherbs"
@@ -1,12 +1,49 @@
 from abc import ABC, abstractmethod
-from typing import Iterable
+from typing import Iterable, Optional
 from core.models import Product
 from core.client import HttpClient
+from core.discovery import Listing
+from core.fetcher import TieredFetcher
 
 
 class SiteScraper(ABC):
+    # Escalate to a headless browser when plain HTTP returns a challenge page
+    browser_fallback = True
+
     def __init__(self, client: HttpClient) -> None:
         self.client = client
+        self._fetcher: Optional[TieredFetcher] = None
+
+    @property
+    def fetcher(self) -> TieredFetcher:
+        if self._fetcher is None:
+            self._fetcher = TieredFetcher(self.client, allow_browser=self.browser_fallback)
+        return self._fetcher
+
+    @fetcher.setter
+    def fetcher(self, fetcher: TieredFetcher) -> None:
+        self._fetcher = fetcher
+
+    def set_workers(self, workers: int) -> None:
+        """Size shared resources for ``workers`` threads using the scraper at once (one browser each)."""
+        self.fetcher.browser_pool.size = max(workers, 1)
+
+    def close(self) -> None:
+        """Release the fetcher (browser sessions); callers close once, after their last scrape."""
+        if self._fetcher is not None:
+            self._fetcher.close()
+
+    def fetch_html(self, url: str) -> str:
+        """Fetch ``url`` through the tiered fetcher (HTTP first, browser if challenged)."""
+        return self.fetcher.fetch(url).html
+
+    def parse_listing(self, url: str, html: str) -> Listing:
+        """Product URLs and follow-up pages on a brand/category listing page (see discover.py)."""
+        raise NotImplementedError(f"{type(self).__name__} has no listing discovery")
+
+    def product_id(self, url: str) -> Optional[str]:
+        """Stable product identity of ``url``; discovery dedupes on it."""
+        return url or None
 
     @abstractmethod
     def scrape_products(self, urls: Iterable[str]) -> Iterable[Product]:
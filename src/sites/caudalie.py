@@ -1,12 +1,7 @@
-from typing import Iterable
-from core.models import Product
-from core.client import HttpClient
-from .base import SiteScraper
+from .spec import SpecScraper
 
 
-class CaudalieScraper(SiteScraper):
-    def __init__(self, client: HttpClient) -> None:
-        super().__init__(client)
+class CaudalieScraper(SpecScraper):
+    """Driven by ``specs/caudalie.json``."""
 
-    def scrape_products(self, urls: Iterable[str]) -> Iterable[Product]:
-        raise NotImplementedError("Implement Caudalie scraper based on network analysis or HTML parsing.")
+    spec_name = "caudalie"
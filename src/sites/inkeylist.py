@@ -1,10 +1,13 @@
-import json
 import re
 import time
 from typing import Iterable, List
 from bs4 import BeautifulSoup
 from core.models import Product
 from core.client import HttpClient
+from core.embedded import find_assignment
+from core.inci import parse_ingredients
+from core.metrics import METRICS
+from core.profiling import PROFILER
 from .base import SiteScraper
 
 
@@ -14,16 +17,21 @@ class InkeyListScraper(SiteScraper):
 
     def scrape_products(self, urls: Iterable[str]) -> Iterable[Product]:
         for url in urls:
-            response = self.client.fetch(url)
-            html = response.text
-            yield self._parse_product(html, url)
+            with PROFILER.url(url, site="inkeylist"):
+                with PROFILER.stage("fetch"):
+                    html = self.fetch_html(url)
+                with PROFILER.stage("parse"), METRICS.timer("parse_seconds", site="inkeylist"):
+                    product = self._parse_product(html, url)
+            yield product
             time.sleep(2.5)  # politeness delay to reduce 429s
 
     def _parse_product(self, html: str, url: str) -> Product:
-        soup = BeautifulSoup(html, "lxml")
+        with PROFILER.stage("soup"):
+            soup = BeautifulSoup(html, "lxml")
         
         # Extract product data from JSON-LD script
-        product_data = self._extract_product_json(soup)
+        with PROFILER.stage("_extract_product_json"):
+            product_data = self._extract_product_json(html)
         
         # Get data from the JSON if available
         if product_data:
@@ -60,13 +68,15 @@ class InkeyListScraper(SiteScraper):
                 image_url = "https://uk.theinkeylist.com" + image_url
                 
             # Try to extract ingredients from the page (JSON description or HTML fallback)
-            ingredients = self._extract_ingredients(soup, html, url)
+            with PROFILER.stage("_extract_ingredients"):
+                ingredients = parse_ingredients(self._extract_ingredients(soup, html, url))
             
             return Product(
                 barcode=barcode,
                 product_name=product_name,
                 description=description,
-                ingredients=ingredients,
+                ingredients=list(ingredients.names),
+                ingredient_ids=ingredients.id_array(),
                 image=image_url,
                 brand_name=brand_name or "The INKEY List",
                 category=category,
@@ -85,68 +95,29 @@ class InkeyListScraper(SiteScraper):
             concerns=[],
         )
 
-    def _extract_product_json(self, soup: BeautifulSoup) -> dict:
+    def _extract_product_json(self, html: str) -> dict:
         """Extract product data from window.SwymProductInfo.product JSON"""
-        for script in soup.find_all("script"):
-            text = script.string or ""
-            # Look for the product JSON data in window.SwymProductInfo.product
-            if "window.SwymProductInfo.product" in text:
-                try:
-                    # Extract the JSON object after the assignment
-                    start_marker = "window.SwymProductInfo.product = "
-                    start_idx = text.find(start_marker)
-                    if start_idx == -1:
-                        continue
-                    
-                    start_idx += len(start_marker)
-                    
-                    # Find the end of the JSON object
-                    brace_count = 0
-                    end_idx = start_idx
-                    in_json = False
-                    
-                    for i in range(start_idx, len(text)):
-                        char = text[i]
-                        if char == '{':
-                            brace_count += 1
-                            in_json = True
-                        elif char == '}':
-                            brace_count -= 1
-                            if in_json and brace_count == 0:
-                                end_idx = i + 1
-                                break
-                    
-                    json_text = text[start_idx:end_idx]
-                    
-                    try:
-                        product_data = json.loads(json_text)
-                        
-                        # Extract barcode from variants if not at top level
-                        if not product_data.get("barcode") and product_data.get("variants"):
-                            variants = product_data.get("variants", [])
-                            if variants and isinstance(variants, list) and len(variants) > 0:
-                                product_data["barcode"] = variants[0].get("barcode", "")
-                        
-                        # Extract brand
-                        if not product_data.get("brand"):
-                            product_data["brand"] = product_data.get("vendor", "")
-                        
-                        # Extract featured image
-                        if not product_data.get("featured_image") and product_data.get("images"):
-                            images = product_data.get("images", [])
-                            if images:
-                                product_data["featured_image"] = images[0]
-                        elif product_data.get("featured_image"):
-                            pass  # Already has featured_image
-                        
-                        return product_data
-                    except json.JSONDecodeError as e:
-                        print(f"JSON decode error: {e}")
-                        continue
-                except Exception as e:
-                    print(f"Error extracting JSON: {e}")
-                    continue
-        return {}
+        product_data = find_assignment(html, "window.SwymProductInfo.product")
+        if not isinstance(product_data, dict):
+            return {}
+
+        # Extract barcode from variants if not at top level
+        if not product_data.get("barcode") and product_data.get("variants"):
+            variants = product_data.get("variants", [])
+            if variants and isinstance(variants, list) and isinstance(variants[0], dict):
+                product_data["barcode"] = variants[0].get("barcode", "")
+
+        # Extract brand
+        if not product_data.get("brand"):
+            product_data["brand"] = product_data.get("vendor", "")
+
+        # Extract featured image
+        if not product_data.get("featured_image") and product_data.get("images"):
+            images = product_data.get("images", [])
+            if images:
+                product_data["featured_image"] = images[0]
+
+        return product_data
 
     def _extract_ingredients(self, soup: BeautifulSoup, html_str: str, url: str) -> str:
         """Extract full ingredients list (INCI) from product page HTML."""
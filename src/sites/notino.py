@@ -1,70 +1,114 @@
-import json
+import re
 import time
 from html import unescape
 from typing import Iterable, List, Optional
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from urllib.parse import parse_qsl, urljoin, urlparse
 from bs4 import BeautifulSoup
+from core.adaptive import EXTRACTOR_STATS
+from core.browser import DRIVER_CACHE_DIR, BrowserPool
+from core.clearance import ClearanceStore
+from core.client import HttpClient
+from core.discovery import Listing, links
+from core.embedded import find_first_key, iter_ld_json, script_span
+from core.fetcher import BROWSER_TIER, SoftBlock, TieredFetcher
+from core.inci import InciList, parse_ingredients
+from core.metrics import METRICS
+from core.profiling import PROFILER
 from core.models import Product
 from .base import SiteScraper
 
 
+# Product pages end in /p-<id>/ (e.g. /the-ordinary/niacinamide-10-zinc-1-serum/p-16130224/)
+PRODUCT_ID = re.compile(r"/p-(\d+)(?=/|$|[?#])")
+# Product paths in hrefs and in the listing's JSON state
+PRODUCT_LINK = re.compile(r"""["'](?:https?://[^/"'\s]+)?(/[^"'\s<>]*?/p-\d+/?)[^"'\s<>]*["']""")
+# Internal brand/category pages: one or two lowercase slug segments
+LISTING_LINK = re.compile(r"""href=["'](?:https?://[^/"'\s]*notino\.[a-z.]+)?(/[a-z0-9-]+/(?:[a-z0-9-]+/)?)["']""")
+NEXT_LINK = re.compile(r"""<(?:link|a)\b[^>]*\brel=["']next["'][^>]*>""", re.IGNORECASE)
+HREF = re.compile(r"""\bhref=["']([^"']+)["']""")
+PAGE_PARAMS = ("page", "p", "seite")
+NON_LISTING_SLUGS = {
+    "warenkorb", "cart", "login", "registrierung", "kundenkonto", "my-account", "wunschliste", "wishlist",
+    "blog", "hilfe", "help", "kontakt", "contact", "geschenkgutschein", "gift-card", "stores", "sitemap",
+}
+# Notino answers blocked clients with a generic homepage or its 404 page
+# ("... nichts beschädigt") instead of the product
+SOFT_BLOCK = SoftBlock(markers=("nichts beschädigt",), titles=("Parfum & Kosmetik online shop",))
+
+
 class NotinoScraper(SiteScraper):
-    """Selenium-based scraper for Notino (bypasses Cloudflare protection)."""
+    """
+    Notino scraper behind Cloudflare.
 
-    def scrape_products(self, urls: Iterable[str]) -> Iterable[Product]:
-        chrome_options = Options()
-        # Try without headless - more likely to bypass Cloudflare
-        # chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
-        chrome_options.add_argument(
-            "user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+    Pages go through the tiered fetcher: plain HTTP first, escalating to a
+    pooled Chrome session when a challenge or the "nichts beschädigt" soft
+    404 comes back. The tier that worked is remembered per host, and the
+    browser's clearance cookies are reused over plain HTTP until they expire.
+    """
+
+    def __init__(self, client: HttpClient) -> None:
+        super().__init__(client)
+        # Non-headless Chrome passes the Cloudflare challenge more reliably
+        self.fetcher = TieredFetcher(
+            client,
+            browser_pool=BrowserPool(
+                headless=False,
+                content_selector="h1[data-testid='pd-title'], h1",
+                lean=True,
+                baseline_every=50,
+                soft_block=SOFT_BLOCK,
+            ),
+            clearances=ClearanceStore(DRIVER_CACHE_DIR / "clearances.json"),
+            soft_block=SOFT_BLOCK,
         )
-        
-        service = Service(ChromeDriverManager().install())
 
+    def scrape_products(self, urls: Iterable[str]) -> Iterable[Product]:
         for url in urls:
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            try:
-                driver.get(url)
-                # Wait longer for Cloudflare challenge to complete
-                print(f"Waiting for Cloudflare challenge to complete for {url}...")
-                time.sleep(10)
-                # If we got redirected to generic/404 page, retry once
-                if "Parfum & Kosmetik online shop" in driver.title or "nichts beschädigt" in driver.page_source:
-                    print("Detected generic/404 page, retrying once...")
-                    time.sleep(5)
-                    driver.get(url)
-                    time.sleep(8)
-                
-                # Wait for product content to appear (checking for specific element)
-                try:
-                    WebDriverWait(driver, 20).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "h1[data-testid='pd-title'], h1"))
-                    )
-                    print("Product page loaded successfully")
-                except:
-                    print(f"Warning: Timeout waiting for content on {url}")
-                    print(f"Page title: {driver.title}")
-                
-                html = driver.page_source
-                yield self._parse_product(html, url)
-                time.sleep(2)  # Rate limiting
-            finally:
-                driver.quit()
+            with PROFILER.url(url, site="notino"):
+                with PROFILER.stage("fetch"):
+                    result = self.fetcher.fetch(url)
+                if result.challenge:
+                    print(f"Warning: {url} still looks blocked ({result.challenge})")
+                with PROFILER.stage("parse"), METRICS.timer("parse_seconds", site="notino"):
+                    product = self._parse_product(result.html, url)
+            yield product
+            # Browser page loads are already slow; keep plain HTTP polite
+            time.sleep(2 if result.tier == BROWSER_TIER else 1)
+
+    def product_id(self, url: str) -> Optional[str]:
+        match = PRODUCT_ID.search(urlparse(url).path)
+        return match.group(1) if match else None
+
+    def parse_listing(self, url: str, html: str) -> Listing:
+        """Products (keyed by Notino product ID), pagination and brand/category links on a listing page."""
+        listing = Listing()
+        for path in links(html, PRODUCT_LINK):
+            product_id = self.product_id(path)
+            if product_id and product_id not in listing.products:
+                # Canonical form: drop query/tracking suffixes after /p-<id>/
+                canonical = path[:PRODUCT_ID.search(path).end()] + "/"
+                listing.products[product_id] = urljoin(url, canonical)
+        base = urlparse(url)
+        for tag in NEXT_LINK.findall(html):
+            href = HREF.search(tag)
+            if href:
+                listing.pages.append(urljoin(url, unescape(href.group(1))))
+        for href in HREF.findall(html):
+            target = urlparse(urljoin(url, unescape(href)))
+            if (
+                target.netloc == base.netloc
+                and target.path == base.path
+                and any(key in PAGE_PARAMS for key, _ in parse_qsl(target.query))
+            ):
+                listing.pages.append(target.geturl())
+        for path in LISTING_LINK.findall(html):
+            if path.strip("/").split("/")[0] not in NON_LISTING_SLUGS and path != base.path:
+                listing.listings.append(urljoin(url, path))
+        return listing
 
     def _parse_product(self, html: str, url: str) -> Product:
-        soup = BeautifulSoup(html, "lxml")
+        with PROFILER.stage("soup"):
+            soup = BeautifulSoup(html, "lxml")
 
         # Check if page is a 404 error page
         error_heading = soup.select_one("h1")
@@ -72,48 +116,55 @@ class NotinoScraper(SiteScraper):
             print(f"⚠️  Warning: Product page is 404 error page for {url}")
             return Product()  # Return empty product
 
-        json_entries = self._extract_json_ld(soup)
+        json_entries = self._extract_json_ld(html)
         product_ld = self._find_ld(json_entries, {"Product"})
         breadcrumbs_ld = self._find_ld(json_entries, {"BreadcrumbList"})
 
-        barcode = (
-            self._safe_get(product_ld, ["gtin13", "gtin", "sku"]) or
-            self._extract_apollo_ean(soup) or
-            self._pick_meta(soup, ["gtin13", "product:retailer_item_id"]) or
-            ""
-        )
+        # Fallback chains run through EXTRACTOR_STATS, which learns the usual
+        # winner per field and tries it first once it is known to agree with
+        # the extractors declared ahead of it (see core.adaptive)
+        barcode = self._chain("barcode", [
+            ("ld:gtin13", lambda: self._clean_string(self._safe_get(product_ld, ["gtin13"]))),
+            ("ld:gtin", lambda: self._clean_string(self._safe_get(product_ld, ["gtin"]))),
+            ("ld:sku", lambda: self._clean_string(self._safe_get(product_ld, ["sku"]))),
+            ("apollo:eanCode", lambda: self._extract_apollo_ean(html)),
+            ("meta:gtin13", lambda: self._pick_meta(soup, ["gtin13", "product:retailer_item_id"])),
+        ])
 
-        product_name = (
-            self._clean_string(self._safe_get(product_ld, ["name"]))
-            or self._pick_meta(soup, ["og:title", "twitter:title"]) 
-            or self._text(soup.select_one("h1[data-testid*='title']"))
-            or self._text(soup.select_one("h1"))
-            or self._text(soup.select_one("[data-testid='product-name']"))
-        )
+        product_name = self._chain("product_name", [
+            ("ld:name", lambda: self._clean_string(self._safe_get(product_ld, ["name"]))),
+            ("meta:og:title", lambda: self._pick_meta(soup, ["og:title", "twitter:title"])),
+            ("css:h1[data-testid*=title]", lambda: self._text(soup.select_one("h1[data-testid*='title']"))),
+            ("css:h1", lambda: self._text(soup.select_one("h1"))),
+            ("css:[data-testid=product-name]", lambda: self._text(soup.select_one("[data-testid='product-name']"))),
+        ])
 
-        description = (
-            self._clean_string(self._safe_get(product_ld, ["description"]))
-            or self._pick_meta(soup, ["og:description", "description"]) 
-            or self._text(soup.select_one("[itemprop='description']"))
-            or self._text(soup.select_one("[data-testid='product-description']"))
-        )
+        description = self._chain("description", [
+            ("ld:description", lambda: self._clean_string(self._safe_get(product_ld, ["description"]))),
+            ("meta:og:description", lambda: self._pick_meta(soup, ["og:description", "description"])),
+            ("css:[itemprop=description]", lambda: self._text(soup.select_one("[itemprop='description']"))),
+            (
+                "css:[data-testid=product-description]",
+                lambda: self._text(soup.select_one("[data-testid='product-description']")),
+            ),
+        ])
 
-        image = (
-            self._pick_image_from_ld(product_ld)
-            or self._pick_meta(soup, ["og:image", "twitter:image"])
-            or self._get_src(soup.select_one("[itemprop='image']"))
-            or self._get_src(soup.select_one("[data-testid*='image']"))
-            or self._get_src(soup.select_one("[data-testid='product-image']"))
-        )
+        image = self._chain("image", [
+            ("ld:image", lambda: self._pick_image_from_ld(product_ld)),
+            ("meta:og:image", lambda: self._pick_meta(soup, ["og:image", "twitter:image"])),
+            ("css:[itemprop=image]", lambda: self._get_src(soup.select_one("[itemprop='image']"))),
+            ("css:[data-testid*=image]", lambda: self._get_src(soup.select_one("[data-testid*='image']"))),
+            ("css:[data-testid=product-image]", lambda: self._get_src(soup.select_one("[data-testid='product-image']"))),
+        ])
 
-        brand_name = (
-            self._clean_string(self._safe_get(product_ld, ["brand", "name"]))
-            or self._clean_string(self._safe_get(product_ld, ["brand"]))
-            or self._text(soup.select_one("[itemprop='brand']"))
-            or self._text(soup.select_one("[data-testid='brand-name']"))
-            or self._text(soup.select_one(".pd-brand"))
-            or self._extract_brand_from_breadcrumb(soup)
-        )
+        brand_name = self._chain("brand_name", [
+            ("ld:brand.name", lambda: self._clean_string(self._safe_get(product_ld, ["brand", "name"]))),
+            ("ld:brand", lambda: self._ld_brand_string(product_ld)),
+            ("css:[itemprop=brand]", lambda: self._text(soup.select_one("[itemprop='brand']"))),
+            ("css:[data-testid=brand-name]", lambda: self._text(soup.select_one("[data-testid='brand-name']"))),
+            ("css:.pd-brand", lambda: self._text(soup.select_one(".pd-brand"))),
+            ("breadcrumb", lambda: self._extract_brand_from_breadcrumb(soup)),
+        ])
 
         category = (
             self._breadcrumb_category(breadcrumbs_ld)
@@ -124,34 +175,30 @@ class NotinoScraper(SiteScraper):
             breadcrumbs = soup.select("nav[aria-label*='read'] a, .breadcrumb a")
             category = self._text(breadcrumbs[-1]) if breadcrumbs else ""
 
-        ingredients = self._extract_ingredients(soup)
+        with PROFILER.stage("_extract_ingredients"):
+            ingredients = self._extract_ingredients(soup)
 
         return Product(
             barcode=barcode,
             product_name=product_name,
             description=description,
-            ingredients=ingredients,
+            ingredients=list(ingredients.names),
+            ingredient_ids=ingredients.id_array(),
             image=image or "",
             brand_name=brand_name,
             category=category or "",
             concerns=[],
         )
 
-    def _extract_json_ld(self, soup: BeautifulSoup) -> List[dict]:
-        entries: List[dict] = []
-        for tag in soup.find_all("script", type="application/ld+json"):
-            content = tag.string or tag.get_text()
-            if not content:
-                continue
-            try:
-                parsed = json.loads(content)
-            except Exception:
-                continue
-            if isinstance(parsed, list):
-                entries.extend([item for item in parsed if isinstance(item, dict)])
-            elif isinstance(parsed, dict):
-                entries.append(parsed)
-        return entries
+    def _extract_json_ld(self, html: str) -> List[dict]:
+        return list(iter_ld_json(html))
+
+    def _chain(self, field: str, candidates) -> str:
+        return EXTRACTOR_STATS.run_chain("notino", field, candidates)
+
+    def _ld_brand_string(self, product_ld: Optional[dict]) -> str:
+        brand = self._safe_get(product_ld, ["brand"])
+        return self._clean_string(brand) if isinstance(brand, str) else ""
 
     def _find_ld(self, entries: List[dict], target_types: set) -> Optional[dict]:
         for entry in entries:
@@ -194,24 +241,13 @@ class NotinoScraper(SiteScraper):
                 return name
         return ""
 
-    def _extract_apollo_ean(self, soup: BeautifulSoup) -> str:
-        script = soup.find("script", id="__APOLLO_STATE__")
-        if not script:
-            return ""
-        content = script.string or script.get_text()
-        if not content:
+    def _extract_apollo_ean(self, html: str) -> str:
+        # Scan only the state blob for the key instead of decoding all of it
+        span = script_span(html, "__APOLLO_STATE__")
+        if not span:
             return ""
-        try:
-            state = json.loads(content)
-        except Exception:
-            return ""
-        if isinstance(state, dict):
-            for value in state.values():
-                if isinstance(value, dict):
-                    ean = value.get("eanCode") or value.get("gtin13")
-                    if ean:
-                        return str(ean)
-        return ""
+        ean = find_first_key(html, ("eanCode", "gtin13"), *span)
+        return str(ean) if isinstance(ean, (str, int)) else ""
 
     def _safe_get(self, data: Optional[dict], keys: List[str]):
         if not isinstance(data, dict):
@@ -247,7 +283,7 @@ class NotinoScraper(SiteScraper):
             return self._text(breadcrumbs[1])
         return ""
 
-    def _extract_ingredients(self, soup: BeautifulSoup) -> List[str]:
+    def _extract_ingredients(self, soup: BeautifulSoup) -> InciList:
         # Try multiple patterns for ingredients section
         heading = None
         for tag in soup.find_all(["h2", "h3", "h4", "strong", "span"]):
@@ -257,13 +293,12 @@ class NotinoScraper(SiteScraper):
                 break
         
         if not heading:
-            return []
+            return parse_ingredients("")
         
         # Look for ingredients in next siblings
         container = heading.find_next(["p", "div", "ul", "ol", "span"])
         if not container:
-            return []
+            return parse_ingredients("")
         
-        text = container.get_text(" ", strip=True)
-        parts = [part.strip() for part in text.split(",") if part.strip()]
-        return parts
+        # Paren-aware split: "CI 77891 (Titanium Dioxide, Mica)" is one ingredient
+        return parse_ingredients(container.get_text(" ", strip=True))
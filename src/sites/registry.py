@@ -0,0 +1,76 @@
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Dict, Iterator, List, Mapping, Type
+from .base import SiteScraper
+
+
+# Site slug -> "module:Class". Modules are only imported when a site is
+# selected, so e.g. Selenium is never loaded for the plain-HTTP sites.
+SCRAPER_PATHS: Dict[str, str] = {
+    "notino": "sites.notino:NotinoScraper",
+    "sephora": "sites.sephora:SephoraScraper",
+    "sisley": "sites.sisley:SisleyScraper",
+    "korres": "sites.korres:KorresScraper",
+    "adaherbs": "sites.adaherbs:AdaherbsScraper",
+    "rossmann": "sites.rossmann:RossmannScraper",
+    "caudalie": "sites.caudalie:CaudalieScraper",
+    "altanatura": "sites.altanatura:AltanaturaScraper",
+    "dermedic": "sites.dermedic:DermedicScraper",
+    "inkeylist": "sites.inkeylist:InkeyListScraper",
+    "apivita": "sites.apivita:ApivitaScraper",
+    "goodjuju": "sites.goodjuju:GoodJujuScraper",
+    "yesstyle": "sites.yesstyle:YesStyleScraper",
+    "theordinary": "sites.theordinary:TheOrdinaryScraper",
+    "versed": "sites.versed:VersedScraper",
+}
+
+# Third-party packages can register extra sites under this entry point group
+ENTRY_POINT_GROUP = "kungulscraper.sites"
+
+
+def _plugin_paths() -> Dict[str, str]:
+    try:
+        return {entry.name: entry.value for entry in entry_points(group=ENTRY_POINT_GROUP)}
+    except Exception:
+        return {}
+
+
+class ScraperRegistry(Mapping):
+    """Read-only ``slug -> SiteScraper class`` mapping that imports on lookup."""
+
+    def __init__(self, paths: Dict[str, str]) -> None:
+        self._paths = dict(paths)
+        self._plugins_loaded = False
+        self._cache: Dict[str, Type[SiteScraper]] = {}
+
+    def _all_paths(self) -> Dict[str, str]:
+        if not self._plugins_loaded:
+            for name, path in _plugin_paths().items():
+                self._paths.setdefault(name, path)
+            self._plugins_loaded = True
+        return self._paths
+
+    def __getitem__(self, name: str) -> Type[SiteScraper]:
+        scraper_class = self._cache.get(name)
+        if scraper_class is None:
+            path = self._all_paths()[name]
+            module_name, _, class_name = path.partition(":")
+            scraper_class = getattr(import_module(module_name), class_name)
+            self._cache[name] = scraper_class
+        return scraper_class
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._all_paths())
+
+    def __len__(self) -> int:
+        return len(self._all_paths())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._all_paths()
+
+
+SCRAPERS = ScraperRegistry(SCRAPER_PATHS)
+
+
+def available_sites() -> List[str]:
+    return list(SCRAPERS)
@@ -0,0 +1,387 @@
+import json
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urljoin
+import soupsieve
+from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+from core.adaptive import EXTRACTOR_STATS
+from core.client import HttpClient
+from core.embedded import find_assignment, find_first_key, iter_ld_json, script_span
+from core.inci import parse_ingredients
+from core.metrics import METRICS
+from core.models import Product
+from core.profiling import PROFILER
+from core.streaming import HeadMetadata, fetch_head_metadata
+from .base import SiteScraper
+
+
+SPEC_DIR = Path(__file__).parent / "specs"
+
+PRODUCT_FIELDS = ("barcode", "product_name", "description", "ingredients", "image", "brand_name", "category")
+
+# Extractor kinds that only need <head> content
+HEAD_KINDS = ("ld", "meta")
+
+
+class SpecError(ValueError):
+    pass
+
+
+class Document:
+    """Lazily parsed views of one page, shared by every extractor of a spec."""
+
+    def __init__(self, html: str = "", url: str = "", head: Optional[HeadMetadata] = None) -> None:
+        self.html = html
+        self.url = url
+        self.head = head
+        self._soup: Optional[BeautifulSoup] = None
+        self._tree = None
+        self._ld: Optional[List[dict]] = None
+        self._meta: Optional[Dict[str, str]] = None
+        self._assignments: Dict[str, Any] = {}
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            with PROFILER.stage("soup"):
+                self._soup = BeautifulSoup(self.html, "lxml")
+        return self._soup
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = lxml_html.fromstring(self.html or "<html/>")
+        return self._tree
+
+    @property
+    def ld(self) -> List[dict]:
+        if self._ld is None:
+            self._ld = self.head.ld_json if self.head else list(iter_ld_json(self.html))
+        return self._ld
+
+    @property
+    def meta(self) -> Dict[str, str]:
+        if self._meta is None:
+            if self.head:
+                self._meta = self.head.meta
+            else:
+                self._meta = {}
+                for node in self.soup.find_all("meta"):
+                    name = node.get("property") or node.get("name") or node.get("itemprop")
+                    content = node.get("content")
+                    if name and content:
+                        self._meta.setdefault(name.strip(), content.strip())
+        return self._meta
+
+    def assignment(self, name: str) -> Any:
+        if name not in self._assignments:
+            self._assignments[name] = find_assignment(self.html, name)
+        return self._assignments[name]
+
+
+def _walk(value: Any, path: List[str]) -> Any:
+    for key in path:
+        if isinstance(value, list):
+            if key.lstrip("-").isdigit():
+                index = int(key)
+                value = value[index] if -len(value) <= index < len(value) else None
+                continue
+            value = value[0] if value else None
+        if isinstance(value, dict):
+            value = value.get(key)
+        else:
+            return None
+    return value
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        for item in value:
+            text = _as_text(item)
+            if text:
+                return text
+        return ""
+    if isinstance(value, dict):
+        # e.g. {"@type": "Brand", "name": ...} or {"@type": "ImageObject", "url": ...}
+        return _as_text(value.get("name") or value.get("item") or value.get("url") or value.get("contentUrl"))
+    return str(value).strip()
+
+
+class Extractor:
+    """One compiled ``kind:argument`` source from a spec."""
+
+    kind = ""
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+
+    def extract(self, doc: Document) -> str:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.source}>"
+
+
+class LdExtractor(Extractor):
+    kind = "ld"
+
+    def __init__(self, source: str, argument: str) -> None:
+        super().__init__(source)
+        type_name, _, path = argument.partition(".")
+        self.type_name = type_name
+        self.path = path.split(".") if path else []
+
+    def extract(self, doc: Document) -> str:
+        for entry in doc.ld:
+            types = entry.get("@type")
+            types = types if isinstance(types, list) else [types]
+            if self.type_name in types:
+                text = _as_text(_walk(entry, self.path))
+                if text:
+                    return text
+        return ""
+
+
+class MetaExtractor(Extractor):
+    kind = "meta"
+
+    def __init__(self, source: str, argument: str) -> None:
+        super().__init__(source)
+        self.name = argument
+
+    def extract(self, doc: Document) -> str:
+        return doc.meta.get(self.name, "")
+
+
+class CssExtractor(Extractor):
+    kind = "css"
+
+    def __init__(self, source: str, argument: str) -> None:
+        super().__init__(source)
+        selector, _, attribute = argument.rpartition("@") if "@" in argument else (argument, "", "")
+        self.selector = soupsieve.compile(selector)
+        self.attribute = attribute
+
+    def extract(self, doc: Document) -> str:
+        node = self.selector.select_one(doc.soup)
+        if node is None:
+            return ""
+        if self.attribute:
+            return (node.get(self.attribute) or "").strip()
+        return node.get_text(" ", strip=True)
+
+
+class XPathExtractor(Extractor):
+    kind = "xpath"
+
+    def __init__(self, source: str, argument: str) -> None:
+        super().__init__(source)
+        try:
+            self.xpath = etree.XPath(argument)
+        except etree.XPathSyntaxError as exc:
+            raise SpecError(f"Invalid XPath in {source!r}: {exc}") from exc
+
+    def extract(self, doc: Document) -> str:
+        result = self.xpath(doc.tree)
+        if isinstance(result, list):
+            for item in result:
+                text = item.text_content() if hasattr(item, "text_content") else str(item)
+                text = " ".join(text.split())
+                if text:
+                    return text
+            return ""
+        return str(result).strip()
+
+
+class StateExtractor(Extractor):
+    """``state:<script id>:<key>`` - first value of ``key`` inside that script's JSON."""
+
+    kind = "state"
+
+    def __init__(self, source: str, argument: str) -> None:
+        super().__init__(source)
+        self.script_id, _, keys = argument.partition(":")
+        if not keys:
+            raise SpecError(f"{source!r} needs state:<script id>:<key>")
+        self.keys = tuple(keys.split("|"))
+
+    def extract(self, doc: Document) -> str:
+        span = script_span(doc.html, self.script_id)
+        if not span:
+            return ""
+        return _as_text(find_first_key(doc.html, self.keys, *span))
+
+
+class AssignExtractor(Extractor):
+    """``assign:<window.X>:<dotted.path>`` - path inside a ``window.X = {...}`` assignment."""
+
+    kind = "assign"
+
+    def __init__(self, source: str, argument: str) -> None:
+        super().__init__(source)
+        self.name, _, path = argument.rpartition(":")
+        if not self.name:
+            raise SpecError(f"{source!r} needs assign:<name>:<path>")
+        self.path = path.split(".")
+
+    def extract(self, doc: Document) -> str:
+        return _as_text(_walk(doc.assignment(self.name), self.path))
+
+
+class SectionExtractor(Extractor):
+    """``section:<word>|<word>`` - text of the block following a heading containing one of the words (whole words)."""
+
+    kind = "section"
+    HEADINGS = soupsieve.compile("h2, h3, h4, strong, span, dt, button")
+
+    def __init__(self, source: str, argument: str) -> None:
+        super().__init__(source)
+        self.words = tuple(word.lower() for word in argument.split("|") if word)
+        # Whole words only: "inci" must not hit "principles" or "zinc"
+        self.pattern = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, self.words)) + r")(?!\w)")
+
+    def extract(self, doc: Document) -> str:
+        for tag in self.HEADINGS.select(doc.soup):
+            text = tag.get_text(strip=True).lower()
+            if len(text) < 40 and self.pattern.search(text):
+                container = tag.find_next(["p", "div", "ul", "ol", "span", "dd"])
+                if container:
+                    return container.get_text(" ", strip=True)
+        return ""
+
+
+EXTRACTOR_KINDS: Dict[str, Callable[[str, str], Extractor]] = {
+    cls.kind: cls
+    for cls in (LdExtractor, MetaExtractor, CssExtractor, XPathExtractor, StateExtractor, AssignExtractor, SectionExtractor)
+}
+
+
+def compile_extractor(source: str) -> Extractor:
+    kind, _, argument = source.partition(":")
+    factory = EXTRACTOR_KINDS.get(kind)
+    if factory is None or not argument:
+        raise SpecError(f"Unknown extractor {source!r}; expected one of {sorted(EXTRACTOR_KINDS)}")
+    return factory(source, argument)
+
+
+class CompiledSpec:
+    def __init__(self, name: str, raw: dict) -> None:
+        self.name = name
+        self.base_url = raw.get("base_url", "")
+        self.delay = float(raw.get("delay", 2.0))
+        # Usual winner first among fallbacks that agree (core.adaptive)
+        self.adaptive = bool(raw.get("adaptive", True))
+        self.defaults: Dict[str, str] = raw.get("defaults", {})
+        self.list_fields = set(raw.get("list_fields", ["ingredients"]))
+        self.fields: Dict[str, List[Extractor]] = {}
+        for field_name, sources in raw.get("fields", {}).items():
+            if field_name not in PRODUCT_FIELDS:
+                raise SpecError(f"{name}: unknown field {field_name!r}")
+            self.fields[field_name] = [compile_extractor(source) for source in sources]
+        # Only stream <head> when every extractor can be served from it
+        self.head_only = bool(raw.get("head_only"))
+        if self.head_only:
+            body = sorted(
+                extractor.source
+                for extractors in self.fields.values()
+                for extractor in extractors
+                if extractor.kind not in HEAD_KINDS
+            )
+            if body:
+                raise SpecError(f"{name}: head_only spec uses extractors that need the body: {body}")
+        # The head stream stops once each field's first choice is present. A field
+        # led by ld: needs the whole head, since JSON-LD may follow the meta tags.
+        firsts = [extractors[0] for extractors in self.fields.values() if extractors]
+        self.head_fields = (
+            tuple(extractor.name for extractor in firsts)
+            if all(isinstance(extractor, MetaExtractor) for extractor in firsts)
+            else ()
+        )
+
+
+def _merge_specs(base: dict, override: dict) -> dict:
+    merged = {**base, **{key: value for key, value in override.items() if key not in ("fields", "defaults")}}
+    merged["fields"] = {**base.get("fields", {}), **override.get("fields", {})}
+    merged["defaults"] = {**base.get("defaults", {}), **override.get("defaults", {})}
+    return merged
+
+
+def _read_spec(name: str) -> dict:
+    path = SPEC_DIR / f"{name}.json"
+    if not path.exists():
+        raise SpecError(f"No site spec at {path}")
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    parent = raw.pop("extends", None)
+    return _merge_specs(_read_spec(parent), raw) if parent else raw
+
+
+@lru_cache(maxsize=None)
+def load_spec(name: str) -> CompiledSpec:
+    """Load ``specs/<name>.json`` (following ``extends``) and compile its extractors once."""
+    return CompiledSpec(name, _read_spec(name))
+
+
+class SpecScraper(SiteScraper):
+    """
+    Runtime for declarative site specs.
+
+    Each field lists extractors in priority order (``ld:``, ``meta:``,
+    ``css:``, ``xpath:``, ``state:``, ``assign:``, ``section:``); the first
+    non-empty result wins. Subclasses only set ``spec_name``.
+    """
+
+    spec_name = ""
+
+    def __init__(self, client: HttpClient) -> None:
+        super().__init__(client)
+        self.spec = load_spec(self.spec_name)
+
+    def scrape_products(self, urls: Iterable[str]) -> Iterable[Product]:
+        for url in urls:
+            with PROFILER.url(url, site=self.spec.name):
+                with PROFILER.stage("fetch"):
+                    if self.spec.head_only:
+                        doc = Document(url=url, head=fetch_head_metadata(self.client, url, self.spec.head_fields))
+                    else:
+                        doc = Document(self.fetch_html(url), url)
+                with PROFILER.stage("parse"), METRICS.timer("parse_seconds", site=self.spec.name):
+                    product = self._parse_document(doc)
+            yield product
+            time.sleep(self.spec.delay)
+
+    def _parse_product(self, html: str, url: str) -> Product:
+        return self._parse_document(Document(html, url))
+
+    def _parse_document(self, doc: Document) -> Product:
+        values: Dict[str, Any] = {}
+        for field_name in PRODUCT_FIELDS:
+            value = self._extract_field(doc, field_name) or self.spec.defaults.get(field_name, "")
+            if field_name == "ingredients" and field_name in self.spec.list_fields:
+                parsed = parse_ingredients(value)
+                value = list(parsed.names)
+                values["ingredient_ids"] = parsed.id_array()
+            elif field_name in self.spec.list_fields:
+                value = [part.strip() for part in value.split(",") if part.strip()] if value else []
+            values[field_name] = value
+        if values["image"] and not values["image"].startswith("http"):
+            values["image"] = urljoin(self.spec.base_url or doc.url, values["image"])
+        return Product(concerns=[], **values)
+
+    def _extract_field(self, doc: Document, field_name: str) -> str:
+        extractors = self.spec.fields.get(field_name, ())
+        if not self.spec.adaptive:
+            for extractor in extractors:
+                value = extractor.extract(doc)
+                if value:
+                    return value
+            return ""
+        candidates = [
+            (extractor.source, lambda extractor=extractor: extractor.extract(doc)) for extractor in extractors
+        ]
+        return EXTRACTOR_STATS.run_chain(self.spec.name, field_name, candidates)
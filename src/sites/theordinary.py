@@ -1,12 +1,7 @@
-from typing import Iterable
-from core.models import Product
-from core.client import HttpClient
-from .base import SiteScraper
+from .spec import SpecScraper
 
 
-class TheOrdinaryScraper(SiteScraper):
-    def __init__(self, client: HttpClient) -> None:
-        super().__init__(client)
+class TheOrdinaryScraper(SpecScraper):
+    """Driven by ``specs/theordinary.json``."""
 
-    def scrape_products(self, urls: Iterable[str]) -> Iterable[Product]:
-        raise NotImplementedError("Implement The Ordinary scraper based on network analysis or HTML parsing.")
+    spec_name = "theordinary"
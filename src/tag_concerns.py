@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import Tuple
+
+from core.concerns import CONCERNS
+from core.models import Product
+from core.reader import ProductFile, map_chunks
+from core.writer import HEADER, open_locked
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backfill product concerns in an existing products file")
+    parser.add_argument("input", type=Path, help="Pipe-delimited products file")
+    parser.add_argument("--output", type=Path, help="Tagged products file (default: rewrite the input in place)")
+    parser.add_argument("--overwrite", action="store_true", help="Re-tag products that already have concerns")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    return parser.parse_args()
+
+
+def tag_chunk(reader: ProductFile, start: int, stop: int, overwrite: bool = False) -> Tuple[str, Counter]:
+    """Rows ``[start, stop)`` with concerns filled in, and concern counts for the chunk."""
+    rows = []
+    counts: Counter = Counter()
+    for line in reader.lines(start, stop):
+        row = line.decode("utf-8")
+        try:
+            product = Product.from_pipe_row(row)
+        except ValueError:
+            counts["malformed"] += 1
+            rows.append(row)
+            continue
+        if product.concerns and not overwrite:
+            counts["kept"] += 1
+            rows.append(row)
+            continue
+        concerns = CONCERNS.tag(product)
+        counts.update(concerns)
+        counts["tagged" if concerns else "untagged"] += 1
+        # Only the concerns field changes; the rest of the row is copied verbatim
+        field = json.dumps(concerns, ensure_ascii=False) if concerns else ""
+        rows.append(f"{row.rpartition('|')[0]}|{field}")
+    return "".join(f"{row}\n" for row in rows), counts
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.input.exists():
+        raise SystemExit(f"Input file not found: {args.input}")
+    output = args.output or args.input
+    start = time.perf_counter()
+    totals: Counter = Counter()
+    # Holding the output lock keeps appenders out until the tagged file replaces it
+    with open_locked(output):
+        tmp_path = output.with_name(output.name + ".tag.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            handle.write(f"{HEADER}\n")
+            chunks = map_chunks(
+                args.input, partial(tag_chunk, overwrite=args.overwrite), args.workers, final=True
+            )
+            for rows, counts in chunks:
+                handle.write(rows)
+                totals.update(counts)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, output)
+    status = {key: totals.pop(key, 0) for key in ("tagged", "untagged", "kept", "malformed")}
+    print(
+        f"Tagged {status['tagged']} products ({status['untagged']} without a concern signal, "
+        f"{status['kept']} already tagged, {status['malformed']} malformed rows) "
+        f"into {output} in {time.perf_counter() - start:.1f}s"
+    )
+    for concern, count in totals.most_common():
+        print(f"  {concern}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+
+from core.archive import ARCHIVE
+from core.client import HttpClient
+from core.discovery import load_urls
+from core.models import Product
+from core.queue import SQLiteWorkQueue, Task
+from core.resilience import HostUnavailable
+from core.writer import write_shard
+from sites.base import SiteScraper
+from sites.registry import SCRAPERS
+
+
+# Client errors that will not go away on retry
+PERMANENT_STATUS_CODES = {400, 401, 403, 404, 410}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Distributed scrape worker backed by a shared work queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = subparsers.add_parser("enqueue", help="Add URLs to the queue")
+    enqueue.add_argument("queue", type=Path, help="SQLite queue file")
+    enqueue.add_argument("site", choices=SCRAPERS.keys(), help="Site slug the URLs belong to")
+    enqueue.add_argument("url_file", type=Path, help="Text file with one product URL per line")
+    enqueue.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Number of host shards (fixed when the queue is created)",
+    )
+
+    run = subparsers.add_parser("run", help="Lease URLs from the queue and scrape them")
+    run.add_argument("queue", type=Path, help="SQLite queue file")
+    run.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("shards"),
+        help="Directory for output shards (merge them with compact.py)",
+    )
+    run.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}", help="Unique worker name")
+    run.add_argument(
+        "--shard",
+        type=int,
+        action="append",
+        help="Only lease URLs from this shard (repeatable; default: all shards)",
+    )
+    run.add_argument("--batch-size", type=int, default=10, help="URLs leased per round trip")
+    run.add_argument("--visibility-timeout", type=float, default=300.0, help="Lease duration in seconds")
+    run.add_argument("--host-delay", type=float, default=2.5, help="Minimum seconds between requests to a host")
+    run.add_argument("--max-attempts", type=int, default=5, help="Attempts before a URL is dead-lettered")
+    run.add_argument(
+        "--archive-dir",
+        type=Path,
+        help="Archive fetched pages to DIR/pages.<worker-id>.warc.gz for reparse.py",
+    )
+    run.add_argument("--forever", action="store_true", help="Keep polling when the queue is drained")
+
+    stats = subparsers.add_parser("stats", help="Show queue counts and dead letters")
+    stats.add_argument("queue", type=Path, help="SQLite queue file")
+    stats.add_argument("--dead", action="store_true", help="List dead-lettered URLs as JSON lines")
+    return parser.parse_args()
+
+
+def is_permanent(error: Exception) -> bool:
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in PERMANENT_STATUS_CODES
+    return isinstance(error, NotImplementedError)
+
+
+def scrape_task(scraper: SiteScraper, task: Task) -> Product:
+    # next() instead of iterating so the scraper's own politeness sleep is
+    # skipped; the queue enforces the per-host delay across workers instead.
+    return next(iter(scraper.scrape_products([task.url])))
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    queue = SQLiteWorkQueue(args.queue, max_attempts=args.max_attempts, host_delay=args.host_delay)
+    client = HttpClient()
+    scrapers: Dict[str, SiteScraper] = {}
+    processed = 0
+    print(f"Worker {args.worker_id} writing shards to {args.output_dir}")
+    if args.archive_dir:
+        ARCHIVE.open(args.archive_dir / f"pages.{args.worker_id}.warc.gz")
+    try:
+        while True:
+            tasks = queue.lease(args.worker_id, args.shard, args.batch_size, args.visibility_timeout)
+            if not tasks:
+                if not args.forever and not queue.has_unfinished(args.shard):
+                    break
+                time.sleep(min(args.host_delay, 1.0))
+                continue
+            done: List[Task] = []
+            products: List[Product] = []
+            for task in tasks:
+                scraper = scrapers.get(task.site)
+                if scraper is None:
+                    scraper = scrapers[task.site] = SCRAPERS[task.site](client)
+                try:
+                    product = scrape_task(scraper, task)
+                except HostUnavailable as exc:
+                    # Circuit open: park the host in the queue instead of burning attempts
+                    queue.defer(task, exc.retry_in, str(exc))
+                    print(f"  deferred {task.url} for {exc.retry_in:.0f}s: {exc}")
+                    continue
+                except Exception as exc:
+                    queue.fail(task, f"{type(exc).__name__}: {exc}", permanent=is_permanent(exc))
+                    print(f"  failed {task.url} (attempt {task.attempts}): {exc}")
+                    continue
+                if not product.product_name:
+                    # Missing or delisted product: refetching returns the same page
+                    queue.fail(task, "empty product: no name extracted", permanent=True)
+                    continue
+                products.append(product)
+                done.append(task)
+            if products:
+                # One atomic shard per batch: other workers and compaction never see partial rows
+                write_shard(args.output_dir, args.worker_id, products)
+                processed += len(products)
+                print(f"  [{args.worker_id}] {processed} products written")
+            # Ack only once the output is on disk; a crash before this point
+            # lets the lease expire and another worker redo the URLs.
+            for task in done:
+                queue.ack(task)
+    finally:
+        for scraper in scrapers.values():
+            scraper.close()
+        queue.close()
+        ARCHIVE.close()
+    print(f"Worker {args.worker_id} done: {processed} products")
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "enqueue":
+        queue = SQLiteWorkQueue(args.queue, num_shards=args.shards)
+        added = queue.enqueue(load_urls(args.url_file), args.site)
+        print(f"Enqueued {added} new URLs ({queue.num_shards} shards)")
+        queue.close()
+    elif args.command == "run":
+        run_worker(args)
+    elif args.command == "stats":
+        queue = SQLiteWorkQueue(args.queue)
+        print(json.dumps(queue.stats()))
+        if args.dead:
+            for entry in queue.dead_letters():
+                print(json.dumps(entry, ensure_ascii=False))
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 import json
+import os
+import sys
 from bs4 import BeautifulSoup
-import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from core.client import HttpClient
 
 url = 'https://uk.theinkeylist.com/products/1-percent-retinol-serum'
-html = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}).text
+html = HttpClient().fetch(url).text
 soup = BeautifulSoup(html, 'lxml')
 
 # Extract handle
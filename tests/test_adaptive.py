@@ -0,0 +1,56 @@
+from core.adaptive import ExtractorStats
+
+
+def test_declared_priority_wins_after_exploration():
+    stats = ExtractorStats(warmup=2, explore_every=1000)
+    results = []
+    for page in range(50):
+        # ld:name hits 90% of the time, og:title always
+        ld_name = "LD name" if page % 10 else ""
+        candidates = [("ld:name", lambda value=ld_name: value), ("og:title", lambda: "OG title")]
+        results.append(stats.run_chain("site", "product_name", candidates))
+    assert all(result == ("LD name" if page % 10 else "OG title") for page, result in enumerate(results))
+
+
+def test_dead_fallback_is_skipped():
+    stats = ExtractorStats(warmup=2, explore_every=1000)
+    calls = []
+
+    def dead():
+        calls.append(1)
+        return ""
+
+    for _ in range(10):
+        assert stats.run_chain("site", "brand", [("dead", dead), ("live", lambda: "x")]) == "x"
+    assert len(calls) == 2  # warm-up only
+
+
+def test_agreeing_usual_winner_runs_first():
+    stats = ExtractorStats(warmup=10, explore_every=1000, agree_min=3)
+    calls = []
+
+    def sparse(page):
+        calls.append(page)
+        return "Brand" if page % 2 else ""
+
+    for page in range(30):
+        candidates = [("ld:brand", lambda page=page: sparse(page)), ("meta:brand", lambda: "Brand")]
+        assert stats.run_chain("site", "brand", candidates) == "Brand"
+    # After warm-up the always-hitting, always-agreeing fallback answers without the sparse one
+    assert max(calls) == 9
+
+
+def test_disagreeing_fallback_keeps_its_place():
+    stats = ExtractorStats(warmup=10, explore_every=1000, agree_min=3)
+    for page in range(30):
+        ld_name = "LD name" if page % 2 else ""
+        candidates = [("ld:name", lambda value=ld_name: value), ("og:title", lambda: "OG title | Shop")]
+        assert stats.run_chain("site", "name", candidates) == (ld_name or "OG title | Shop")
+
+
+def test_agreement_is_persisted(tmp_path):
+    stats = ExtractorStats(tmp_path / "stats.json", warmup=2)
+    stats.run_chain("site", "brand", [("a", lambda: "x"), ("b", lambda: "x"), ("c", lambda: "y")])
+    stats.save()
+    agreement = ExtractorStats(tmp_path / "stats.json").agreement
+    assert agreement == {"site/brand": {"a\tb": [1, 0], "a\tc": [1, 1], "b\tc": [1, 1]}}
@@ -0,0 +1,65 @@
+from core.archive import PageArchive, index_path, iter_archive, load_index, read_at, utf8_headers
+
+
+PAGES = [
+    ("https://a.example/p/1", 200, {"Content-Type": "text/html; charset=utf-8"}, "<h1>Sérum</h1>".encode(), None),
+    ("https://a.example/p/2", 403, {"Content-Type": "text/html"}, b"<title>Just a moment...</title>", "challenge"),
+    (
+        "https://a.example/p/3",
+        200,
+        {"Content-Type": "text/html; charset=iso-8859-1"},
+        "<h1>Crème</h1>".encode("latin-1"),
+        None,
+    ),
+]
+
+
+def write_archive(path):
+    archive = PageArchive()
+    archive.open(path)
+    for url, status, headers, body, challenge in PAGES:
+        archive.record(url, status, headers, body, tier="http", challenge=challenge)
+    archive.close()
+
+
+def test_index_round_trip(tmp_path):
+    path = tmp_path / "pages.warc.gz"
+    write_archive(path)
+    entries = load_index(path)
+    assert [(entry.url, entry.status, entry.challenged) for entry in entries] == [
+        (url, status, bool(challenge)) for url, status, _, _, challenge in PAGES
+    ]
+    assert entries == [entry for entry, _ in iter_archive(path)]
+    with path.open("rb") as handle:
+        pages = [read_at(handle, entry.offset, entry.length) for entry in reversed(entries)]
+    assert [page.body for page in reversed(pages)] == [body for _, _, _, body, _ in PAGES]
+    texts = [page.text for page in reversed(pages)]
+    assert texts == ["<h1>Sérum</h1>", "<title>Just a moment...</title>", "<h1>Crème</h1>"]
+    assert pages[1].challenge == "challenge" and pages[1].tier == "http"
+
+
+def test_missing_or_stale_index_is_rebuilt(tmp_path):
+    path = tmp_path / "pages.warc.gz"
+    write_archive(path)
+    expected = load_index(path)
+    index_path(path).unlink()
+    assert load_index(path) == expected
+    assert index_path(path).exists()
+    # Drop the last index line: the sidecar no longer ends where the archive does
+    lines = index_path(path).read_text(encoding="utf-8").splitlines(keepends=True)
+    index_path(path).write_text("".join(lines[:-1]), encoding="utf-8")
+    assert load_index(path) == expected
+
+
+def test_reopened_archive_appends(tmp_path):
+    path = tmp_path / "pages.warc.gz"
+    write_archive(path)
+    write_archive(path)
+    entries = load_index(path)
+    assert len(entries) == 2 * len(PAGES)
+    assert entries == [entry for entry, _ in iter_archive(path)]
+
+
+def test_utf8_headers_replaces_the_charset():
+    headers = utf8_headers({"content-type": "text/html; charset=ISO-8859-1", "ETag": "x"})
+    assert headers == {"ETag": "x", "Content-Type": "text/html; charset=utf-8"}
@@ -0,0 +1,37 @@
+import json
+
+from core.browser import BrowserPool
+
+
+def _event(method, request_id, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": {"requestId": request_id, **params}}})}
+
+
+class FakeDriver:
+    """Serves one batch of performance-log entries per ``get_log`` call."""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+
+    def get_log(self, kind):
+        return self.batches.pop(0) if self.batches else []
+
+
+def test_stragglers_from_earlier_load_are_ignored():
+    driver = FakeDriver([
+        _event("Network.loadingFinished", "old", encodedDataLength=5000),
+        _event("Network.requestWillBeSent", "doc"),
+        _event("Network.loadingFinished", "doc", encodedDataLength=100),
+    ])
+    stats = BrowserPool()._collect_stats(driver)
+    assert (stats.requests, stats.bytes_transferred) == (1, 100)
+
+
+def test_settle_drains_late_events():
+    driver = FakeDriver(
+        [_event("Network.requestWillBeSent", "doc"), _event("Network.loadingFinished", "doc", encodedDataLength=100)],
+        [_event("Network.requestWillBeSent", "img"), _event("Network.loadingFinished", "img", encodedDataLength=900)],
+    )
+    stats = BrowserPool()._collect_stats(driver, settle=0.01)
+    assert (stats.requests, stats.bytes_transferred) == (2, 1000)
+    assert driver.batches == []
@@ -0,0 +1,47 @@
+import pytest
+
+from core.clearance import ClearanceStore
+from core.client import HttpClient
+from core.transport import TransportConfig, http2_available
+
+
+def _harvest(store, host):
+    cookies = [
+        {"name": "cf_clearance", "value": "token", "domain": "." + host.split(".", 1)[1], "path": "/"},
+        {"name": "__cf_bm", "value": "bm", "domain": host, "path": "/"},
+    ]
+    return store.harvest(host, cookies, "Browser UA")
+
+
+def _names(jar, domain_suffix):
+    return {cookie.name for cookie in jar if cookie.domain.lstrip(".").endswith(domain_suffix)}
+
+
+def test_apply_and_invalidate_session_jar():
+    client = HttpClient()
+    store = ClearanceStore()
+    host = "www.clearance-test.example"
+    store.apply(client, _harvest(store, host))
+    client.session.cookies.set("other", "1", domain="unrelated.example", path="/")
+    assert _names(client.session.cookies, "clearance-test.example") == {"cf_clearance", "__cf_bm"}
+    assert client.host_headers[host]["User-Agent"] == "Browser UA"
+
+    store.invalidate(host, client)
+    assert store.get(host) is None
+    assert _names(client.session.cookies, "clearance-test.example") == set()
+    assert _names(client.session.cookies, "unrelated.example") == {"other"}
+    assert host not in client.host_headers
+    client.session.cookies.clear("unrelated.example")
+
+
+@pytest.mark.skipif(not http2_available(), reason="httpx[http2] not installed")
+def test_apply_reaches_http2_client():
+    client = HttpClient(config=TransportConfig(http2=True))
+    store = ClearanceStore()
+    host = "www.clearance-h2.example"
+    store.apply(client, _harvest(store, host))
+    assert _names(client.http2.cookies.jar, "clearance-h2.example") == {"cf_clearance", "__cf_bm"}
+
+    store.invalidate(host, client)
+    assert _names(client.http2.cookies.jar, "clearance-h2.example") == set()
+    assert _names(client.session.cookies, "clearance-h2.example") == set()
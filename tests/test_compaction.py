@@ -0,0 +1,57 @@
+import random
+
+from core.compaction import Compactor, product_key
+from core.models import Product
+from core.writer import HEADER, write_shard
+
+
+def _row(barcode, name, version):
+    return f"{barcode}|{name}|v{version}|[]|img|Brand|cat|"
+
+
+def test_compact_keeps_newest_row_per_key(tmp_path):
+    rng = random.Random(7)
+    expected = {}
+    shards = []
+    for shard in range(4):
+        path = tmp_path / f"shard-{shard}.txt"
+        rows = []
+        for version in range(60):
+            barcode = str(1000 + rng.randrange(40))
+            row = _row(barcode, f"p{barcode}", f"{shard}.{version}")
+            rows.append(row)
+            expected[barcode] = row  # later shards, and later rows within a shard, win
+        path.write_text(HEADER + "\n" + "\n".join(rows) + "\n", encoding="utf-8")
+        shards.append(path)
+    output = tmp_path / "products.txt"
+    output.write_text("", encoding="utf-8")
+
+    compactor = Compactor(memory_rows=7, fan_in=2, tmp_dir=tmp_path)
+    count = compactor.compact(shards, output)
+
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == HEADER
+    assert count == len(expected) == len(lines) - 1
+    assert lines[1:] == [expected[barcode] for barcode in sorted(expected)]
+    assert compactor.runs_written > compactor.fan_in  # runs were spilled and merged in passes
+
+
+def test_sort_keyed_last_wins(tmp_path):
+    rows = [(f"k{number % 5}", f"row{number}") for number in range(23)]
+    result = list(Compactor(memory_rows=2, fan_in=3).sort_keyed(rows, tmp_path))
+    assert result == [(f"k{key}", f"row{max(n for n in range(23) if n % 5 == key)}") for key in range(5)]
+
+
+def test_product_key():
+    assert product_key(" 1234 567|Serum|d|[]|img|Brand|cat|") == "1234567"
+    assert product_key("|Night  Serum|d|[]|img|The Brand|cat|") == "~the brand|night serum"
+    assert product_key("1234|too|few") is None
+
+
+def test_write_shard_is_atomic_and_skips_empty_batches(tmp_path):
+    products = [Product(barcode="1", product_name="Serum", brand_name="Brand", image="https://x/a.jpg")]
+    shard = write_shard(tmp_path, "w1", products)
+    assert shard.name.startswith("products.") and shard.name.endswith(".w1.txt")
+    assert shard.read_text(encoding="utf-8").splitlines()[0] == HEADER
+    assert write_shard(tmp_path, "w1", [Product(barcode="2")]) is None
+    assert sorted(path.name for path in tmp_path.iterdir()) == [shard.name]  # no temp files left
@@ -0,0 +1,43 @@
+import pytest
+
+from core.concerns import CONCERNS
+from core.models import Product
+
+
+@pytest.mark.parametrize(
+    "product",
+    [
+        Product(product_name="Shine Spray", description="Adds shine and gloss to dull hair"),
+        Product(product_name="Eau de Parfum", description="A dull, smoky accord with a warm glow"),
+        Product(product_name="Sensitive Toothpaste", description="For sensitive teeth"),
+        Product(product_name="Glow Highlighter", description="Radiant shimmer"),
+        Product(product_name="Lifting Mascara"),
+        Product(product_name="Brightening Shampoo", description="For blonde hair"),
+    ],
+)
+def test_ambiguous_words_outside_skin_care_are_not_tagged(product):
+    assert CONCERNS.tag(product) == []
+
+
+@pytest.mark.parametrize(
+    "product, concern",
+    [
+        (Product(product_name="Soothing Cream", description="For sensitive skin"), "sensitivity"),
+        (Product(product_name="Vitamin C Serum", description="Revives dull skin"), "dullness"),
+        (Product(product_name="Mattifying Fluid", description="Shine control for oily skin"), "oiliness"),
+        (Product(product_name="Blemish Gel", ingredients=["Aqua", "Salicylic Acid"]), "acne"),
+        (Product(product_name="Toner", ingredients="Aqua, Sodium Hyaluronate, Urea"), "hydration"),
+    ],
+)
+def test_skin_care_signals_are_tagged(product, concern):
+    assert concern in CONCERNS.tag(product)
+
+
+def test_plural_and_case_insensitive():
+    assert CONCERNS.tag(Product(description="Reduces the look of WRINKLES and fine lines")) == ["anti-ageing"]
+
+
+def test_tag_stream_keeps_existing_concerns():
+    products = [Product(product_name="Acne Gel", concerns=["custom"]), Product(product_name="Acne Gel")]
+    tagged = list(CONCERNS.tag_stream(products, batch_size=1))
+    assert [product.concerns for product in tagged] == [["custom"], ["acne"]]
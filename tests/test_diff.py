@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from core.diff import SnapshotDiff, changed_fields, record
+from core.writer import HEADER
+
+
+def _snapshot(path, rng, keys, terminated=True):
+    rows = []
+    for _ in range(120):
+        key = rng.choice(keys)
+        rows.append(f"{key}|Name {key}|desc {rng.randrange(3)}|[\"Aqua\"]|img|Brand|cat|")
+    rows.append("malformed|row")
+    rows.append(f"|No Barcode|desc {rng.randrange(2)}|[]|img|Brand|cat|")
+    path.write_text(HEADER + "\n" + "\n".join(rows) + ("\n" if terminated else ""), encoding="utf-8")
+
+
+def _normalized(events):
+    return sorted((event["op"], event["key"], repr(event.get("changes")), repr(event["record"])) for event in events)
+
+
+@pytest.mark.parametrize("terminated", [True, False])
+def test_hash_join_equals_merge_join(tmp_path, terminated):
+    rng = random.Random(3)
+    old, new = tmp_path / "old.txt", tmp_path / "new.txt"
+    _snapshot(old, rng, [str(number) for number in range(0, 60)], terminated)
+    _snapshot(new, rng, [str(number) for number in range(30, 90)], terminated)
+
+    hashed = SnapshotDiff()
+    merged = SnapshotDiff(memory_rows=10, fan_in=2, tmp_dir=tmp_path)
+    hash_events = list(hashed.diff(old, new, mode="hash"))
+    merge_events = list(merged.diff(old, new, mode="merge"))
+
+    assert _normalized(hash_events) == _normalized(merge_events)
+    assert hashed.counts == merged.counts
+    assert all(hashed.counts[op] for op in ("added", "removed", "changed"))
+    # Merge mode emits in key order
+    assert [event["key"] for event in merge_events] == sorted(event["key"] for event in merge_events)
+
+
+def test_changed_fields_decodes_json_arrays():
+    old = '1|Serum|desc|["Aqua", "Glycerin"]|img|Brand|cat|'
+    new = '1|Serum|new desc|["Aqua"]|img|Brand|cat|'
+    assert record(new)["ingredients"] == ["Aqua"]
+    assert changed_fields(old, new) == {
+        "description": ["desc", "new desc"],
+        "ingredients": [["Aqua", "Glycerin"], ["Aqua"]],
+    }
+
+
+@pytest.mark.parametrize("mode", ["hash", "merge"])
+def test_last_row_per_key_is_current(tmp_path, mode):
+    old, new = tmp_path / "old.txt", tmp_path / "new.txt"
+    old.write_text(f"{HEADER}\n1|Serum|a|[]|img|Brand|cat|\n1|Serum|b|[]|img|Brand|cat|\n", encoding="utf-8")
+    new.write_text(f"{HEADER}\n1|Serum|b|[]|img|Brand|cat|\n", encoding="utf-8")
+    differ = SnapshotDiff(tmp_dir=tmp_path)
+    assert list(differ.diff(old, new, mode=mode)) == []
+    assert differ.counts["unchanged"] == 1
@@ -0,0 +1,81 @@
+import pytest
+
+from core.entities import EntityResolver, UnionFind, gtin_check_digit, normalize_gtin, parse_size
+from core.models import Product
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("4006381333931", "4006381333931"),  # EAN-13
+        ("400-638 133 393-1", "4006381333931"),
+        ("036000291452", "0036000291452"),  # UPC-A
+        ("96385074", "0000096385074"),  # EAN-8
+        ("00036000291452", "0036000291452"),  # GTIN-14, consumer unit
+        ("10036000291452", None),  # GTIN-14, case of several units
+        ("4006381333932", None),  # bad check digit
+        ("0000000000000", None),
+        ("12345", None),
+        ("", None),
+    ],
+)
+def test_normalize_gtin(raw, expected):
+    assert normalize_gtin(raw) == expected
+
+
+def test_gtin_check_digit():
+    assert gtin_check_digit("400638133393") == 1
+    assert gtin_check_digit("03600029145") == 2
+
+
+def test_parse_size():
+    assert parse_size("Cleanser 236 ml") == "236ml"
+    assert parse_size("Toner 0,2 l") == "200ml"
+    assert parse_size("Serum") == ""
+
+
+def test_union_find_keeps_the_oldest_root():
+    clusters = UnionFind()
+    ids = [clusters.add() for _ in range(5)]
+    assert clusters.union(ids[3], ids[1]) == 1
+    assert clusters.union(ids[4], ids[3]) == 1
+    assert clusters.union(ids[2], ids[0]) == 0
+    assert [clusters.find(item) for item in ids] == [0, 1, 0, 1, 1]
+    assert clusters.union(ids[4], ids[2]) == 0
+    assert {clusters.find(item) for item in ids} == {0}
+
+
+def product(name, barcode="", brand="The Ordinary"):
+    return Product(barcode=barcode, product_name=name, brand_name=brand)
+
+
+def test_resolver_matches_barcodes_across_formats():
+    resolver = EntityResolver()
+    first = resolver.add(product("Niacinamide 10% + Zinc 1%", "036000291452"))
+    assert resolver.add(product("Something else entirely", "0036000291452")) == first
+    assert resolver.barcode_matches == 1
+
+
+def test_resolver_matches_names_but_not_other_pack_sizes():
+    resolver = EntityResolver()
+    first = resolver.add(product("Niacinamide 10% + Zinc 1% Serum 30 ml"))
+    assert resolver.add(product("The Ordinary Niacinamide 10% + Zinc 1% Serum 30ml")) == first
+    assert resolver.add(product("Niacinamide 10% + Zinc 1% Serum 60 ml")) != first
+    assert resolver.add(product("Niacinamide 10% + Zinc 1% Serum 30 ml", brand="Other Brand")) != first
+
+
+def test_resolver_never_joins_conflicting_barcodes():
+    resolver = EntityResolver()
+    first = resolver.add(product("Niacinamide 10% + Zinc 1% Serum", "4006381333931"))
+    assert resolver.add(product("Niacinamide 10% + Zinc 1% Serum", "036000291452")) != first
+
+
+def test_barcode_hit_unions_an_earlier_name_only_cluster():
+    resolver = EntityResolver()
+    named = resolver.add(product("Hyaluronic Acid 2% + B5 Serum"))
+    coded = resolver.add(product("HA 2% B5", "4006381333931"))
+    assert coded != named
+    joined = resolver.add(product("Hyaluronic Acid 2% + B5 Serum", "4006381333931"))
+    assert joined == named
+    assert resolver.find(coded) == resolver.find(named) == named
+    assert resolver.cluster_gtin[named] == "4006381333931"
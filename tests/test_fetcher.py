@@ -0,0 +1,38 @@
+from core.fetcher import SoftBlock, detect_challenge
+
+
+NORMAL_PAGE = """<!DOCTYPE html><html><head><title>The Ordinary Niacinamide 10% + Zinc 1% | notino.de</title>
+<script src="/cdn-cgi/challenge-platform/scripts/jsd/main.js"></script></head>
+<body><h1 data-testid="pd-title">Niacinamide 10% + Zinc 1%</h1></body></html>"""
+
+INTERSTITIAL = """<!DOCTYPE html><html><head><title>Just a moment...</title></head><body>
+<form id="challenge-form" action="/?__cf_chl_f_tk=abc" method="POST"></form>
+<script>window._cf_chl_opt={cvId: '3'};</script>
+<script src="/cdn-cgi/challenge-platform/h/g/orchestrate/chl_page/v1"></script></body></html>"""
+
+
+def test_jsd_script_on_normal_page_is_not_a_challenge():
+    assert detect_challenge(200, NORMAL_PAGE) is None
+    assert detect_challenge(200, NORMAL_PAGE, "The Ordinary Niacinamide 10% + Zinc 1% | notino.de") is None
+
+
+def test_interstitial_is_a_challenge():
+    assert detect_challenge(403, INTERSTITIAL) is not None
+
+
+def test_challenge_form_without_other_markers():
+    html = '<form id="challenge-form"></form><script src="/cdn-cgi/challenge-platform/h/b/orchestrate/x"></script>'
+    assert detect_challenge(200, html) == "challenge form"
+
+
+def test_browser_title():
+    assert detect_challenge(200, "<html><body></body></html>", "Just a moment...") is not None
+
+
+def test_soft_block_only_applies_when_passed():
+    html = "<html><body><h1>Hier ist leider nichts beschädigt</h1></body></html>"
+    soft_block = SoftBlock(markers=("nichts beschädigt",), titles=("Parfum & Kosmetik online shop",))
+    assert detect_challenge(200, html) is None
+    assert detect_challenge(200, "<html></html>", "Parfum & Kosmetik online shop") is None
+    assert detect_challenge(200, html, soft_block=soft_block) == "soft block marker 'nichts beschädigt'"
+    assert detect_challenge(200, "<html></html>", "Parfum & Kosmetik online shop", soft_block) is not None
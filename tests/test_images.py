@@ -0,0 +1,84 @@
+import json
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from core.client import HttpClient
+from core.images import BlobStore, ImagePipeline, image_dimensions
+from core.models import Product
+from core.resilience import CircuitBreakers
+
+
+def jpeg_with_exif(exif_bytes: int, width: int, height: int) -> bytes:
+    data = b"\xff\xd8"
+    while exif_bytes > 0:
+        chunk = min(exif_bytes, 65533)
+        data += b"\xff\xe1" + struct.pack(">H", chunk + 2) + b"\0" * chunk
+        exif_bytes -= chunk
+    return data + b"\xff\xc0" + struct.pack(">HBHH", 17, 8, height, width) + b"\0" * 16
+
+
+def test_jpeg_dimensions_behind_large_exif_block():
+    assert image_dimensions(jpeg_with_exif(200_000, 1200, 800)) == (1200, 800)
+
+
+def test_process_keeps_scraped_url_and_writes_manifest(tmp_path):
+    requested = []
+
+    def fetch(url, method="GET"):
+        assert method == "HEAD"
+        requested.append(url)
+        return SimpleNamespace(status_code=200, headers={"Content-Type": "image/jpeg", "Content-Length": "42"})
+
+    client = SimpleNamespace(fetch=fetch)
+    manifest = tmp_path / "index.jsonl"
+    pipeline = ImagePipeline(client, mode="head", workers=1, manifest=manifest)
+    products = [
+        Product(barcode="1", image="//cdn.example.com/a.jpg?v=1"),
+        Product(barcode="2", image="//cdn.example.com/a.jpg?v=2"),
+    ]
+    processed = list(pipeline.process(products))
+    pipeline.close()
+    assert [product.image for product in processed] == ["//cdn.example.com/a.jpg?v=1", "//cdn.example.com/a.jpg?v=2"]
+    assert requested == ["https://cdn.example.com/a.jpg"]
+    entries = [json.loads(line) for line in manifest.read_text().splitlines()]
+    assert [(entry["barcode"], entry["ok"], entry["size"]) for entry in entries] == [("1", True, 42), ("2", True, 42)]
+
+
+def test_download_goes_through_client_backoff(tmp_path, monkeypatch):
+    image = jpeg_with_exif(10, 640, 480)
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            if len(hits) == 1:
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(image)))
+            self.end_headers()
+            self.wfile.write(image)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr("core.client.time.sleep", lambda seconds: None)
+    try:
+        client = HttpClient(breakers=CircuitBreakers())
+        pipeline = ImagePipeline(client, mode="download", store=BlobStore(tmp_path / "images"), workers=1)
+        url = f"http://127.0.0.1:{server.server_address[1]}/a.jpg"
+        [product] = pipeline.process([Product(barcode="1", image=url)])
+        pipeline.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(hits) == 2
+    assert (product.image_ok, product.image_width, product.image_height) == (True, 640, 480)
@@ -0,0 +1,62 @@
+import pytest
+
+from core.inci import IngredientDictionary, split_inci
+
+
+def test_top_level_commas():
+    assert split_inci("Aqua, Glycerin; Parfum • Linalool.") == ["Aqua", "Glycerin", "Parfum", "Linalool"]
+
+
+def test_comma_between_digits_is_part_of_the_name():
+    assert split_inci("Aqua, 1,2-Hexanediol, Glycerin") == ["Aqua", "1,2-Hexanediol", "Glycerin"]
+    assert split_inci("Aqua,Glycerin,1,2-Hexanediol") == ["Aqua", "Glycerin", "1,2-Hexanediol"]
+
+
+def test_commas_inside_parentheses_are_kept():
+    text = "Aqua, CI 77891 (Titanium Dioxide, Mica), 1,2-Hexanediol, [+/- CI 77491, CI 77492]"
+    assert split_inci(text) == [
+        "Aqua",
+        "CI 77891 (Titanium Dioxide, Mica)",
+        "1,2-Hexanediol",
+        "[+/- CI 77491, CI 77492]",
+    ]
+
+
+def test_unbalanced_parentheses_fall_back_to_a_plain_split():
+    assert split_inci("Aqua, Extract (Rosa, Glycerin") == ["Aqua", "Extract (Rosa", "Glycerin"]
+
+
+def test_label_and_blank_items_are_dropped():
+    assert split_inci("Ingredients: Aqua, , Glycerin,") == ["Aqua", "Glycerin"]
+    assert split_inci("") == []
+
+
+def test_numeric_commas_at_item_edges():
+    assert split_inci("CI 77491, CI 77492, 1,3-Propanediol") == ["CI 77491", "CI 77492", "1,3-Propanediol"]
+    assert split_inci("Aqua,1,2-Hexanediol,Caprylyl Glycol") == ["Aqua", "1,2-Hexanediol", "Caprylyl Glycol"]
+    assert split_inci("Glycerin 2,5%, Aqua") == ["Glycerin 2,5%", "Aqua"]
+
+
+@pytest.mark.parametrize(
+    "item, parent",
+    [
+        ("Retinyl Palmitate (Vitamin A)", "Retinol"),
+        ("Ascorbyl Glucoside (Vitamin C)", "Ascorbic Acid"),
+        ("Sodium Ascorbyl Phosphate (Vitamin C)", "Ascorbic Acid"),
+        ("Aloe Barbadensis Leaf Extract (Aloe Vera)", "Aloe Barbadensis Leaf Juice"),
+    ],
+)
+def test_derivatives_do_not_fold_onto_parenthetical_parent(item, parent):
+    dictionary = IngredientDictionary()
+    ident = dictionary.resolve(item)
+    assert dictionary.name(ident) == item.partition(" (")[0]
+    assert ident != dictionary.lookup(parent)
+    assert dictionary.resolve(item) == ident  # learned under the base name, not the parent
+
+
+def test_base_name_and_slash_alternatives_still_fold():
+    dictionary = IngredientDictionary()
+    aqua = dictionary.lookup("Aqua")
+    assert dictionary.resolve("Aqua (Water/Eau)") == aqua
+    assert dictionary.resolve("Aqua/Water (Eau)") == aqua
+    assert dictionary.resolve("Tocopherol (Vitamin E)") == dictionary.lookup("Tocopherol")
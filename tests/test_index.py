@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from core.index import BLOCK_SIZE, SKIP_MIN_BLOCKS, decode_postings, encode_postings, filter_postings
+
+
+def _doc_ids(count, seed=0):
+    rng = random.Random(seed)
+    doc, ids = rng.randrange(3), []
+    for _ in range(count):
+        ids.append(doc)
+        # Mix gaps so blocks use 1-, 2- and 4-byte deltas
+        doc += rng.choice((1, 2, 200, 300, 70_000))
+    return ids
+
+
+SKIP = (SKIP_MIN_BLOCKS - 1) * BLOCK_SIZE + 1  # shortest list with a skip table
+COUNTS = [1, BLOCK_SIZE - 1, BLOCK_SIZE, BLOCK_SIZE + 1, SKIP - 1, SKIP, SKIP + 1, 40 * BLOCK_SIZE + 7]
+
+
+@pytest.mark.parametrize("count", COUNTS)
+def test_round_trip(count):
+    ids = _doc_ids(count, seed=count)
+    assert list(decode_postings(encode_postings(ids), count)) == ids
+
+
+def test_skip_table_from_min_blocks():
+    # One posting past SKIP_MIN_BLOCKS - 1 full blocks opens another block and adds the table
+    short = _doc_ids((SKIP_MIN_BLOCKS - 1) * BLOCK_SIZE)
+    long = _doc_ids(len(short) + 1)
+    assert chr(encode_postings(short)[0]) in "BHI"  # no table: data starts with a block's width code
+    assert len(encode_postings(long)) >= len(encode_postings(short)) + 8 * SKIP_MIN_BLOCKS + 2
+
+
+@pytest.mark.parametrize("count", COUNTS)
+def test_filter_matches_intersection(count):
+    ids = _doc_ids(count, seed=count)
+    data = encode_postings(ids)
+    members = set(ids)
+    boundaries = [ids[index] for index in range(0, count, BLOCK_SIZE)]
+    boundaries += [ids[index - 1] for index in range(BLOCK_SIZE, count, BLOCK_SIZE)]
+    probes = {ids[0] - 1, ids[-1], ids[-1] + 1, *boundaries[:3], *(doc + 1 for doc in boundaries[:3])}
+    candidates = sorted(doc for doc in probes if doc >= 0)
+    expected = [doc for doc in candidates if doc in members]
+    assert list(filter_postings(data, count, candidates)) == expected
+    # Dense candidates take the full-decode path and must agree
+    dense = sorted({doc + offset for doc in ids[:300] for offset in (-1, 0, 1)} - {-1})
+    assert list(filter_postings(data, count, dense)) == [doc for doc in dense if doc in members]
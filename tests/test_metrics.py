@@ -0,0 +1,53 @@
+import json
+
+from core.metrics import Histogram, Metrics
+
+
+def test_histogram_quantiles_use_bucket_upper_bounds():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == 3.0  # overflow bucket reports the max seen
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_prometheus_export():
+    metrics = Metrics()
+    metrics.inc("responses_total", host="a.example", status="200")
+    metrics.inc("responses_total", 2, host="a.example", status="200")
+    metrics.inc("fetch_errors_total")
+    metrics.observe("fetch_seconds", 0.02, host="a.example")
+    metrics.observe("fetch_seconds", 40.0, host="a.example")
+    lines = metrics.to_prometheus().splitlines()
+    assert "# TYPE scraper_fetch_errors_total counter" in lines
+    assert "scraper_fetch_errors_total 1" in lines
+    assert 'scraper_responses_total{host="a.example",status="200"} 3' in lines
+    assert "# TYPE scraper_fetch_seconds histogram" in lines
+    assert 'scraper_fetch_seconds_bucket{host="a.example",le="0.01"} 0' in lines
+    assert 'scraper_fetch_seconds_bucket{host="a.example",le="0.025"} 1' in lines
+    assert 'scraper_fetch_seconds_bucket{host="a.example",le="60"} 2' in lines  # buckets are cumulative
+    assert 'scraper_fetch_seconds_bucket{host="a.example",le="+Inf"} 2' in lines
+    assert 'scraper_fetch_seconds_sum{host="a.example"} 40.02' in lines
+    assert 'scraper_fetch_seconds_count{host="a.example"} 2' in lines
+
+
+def test_summary_and_file_exports(tmp_path):
+    metrics = Metrics()
+    metrics.inc("products_written_total", 3)
+    with metrics.timer("write_seconds"):
+        pass
+    summary = metrics.summary()
+    assert summary["counters"]["products_written_total"] == {"total": 3.0}
+    assert summary["histograms"]["write_seconds"]["total"]["count"] == 1
+
+    metrics.write_prometheus(tmp_path / "out" / "metrics.prom")
+    metrics.write_summary(tmp_path / "out" / "summary.json")
+    assert (tmp_path / "out" / "metrics.prom").read_text(encoding="utf-8") == metrics.to_prometheus()
+    written = json.loads((tmp_path / "out" / "summary.json").read_text(encoding="utf-8"))
+    assert written["counters"] == summary["counters"]
+    assert not list((tmp_path / "out").glob("*.tmp"))
+
+    metrics.reset()
+    assert metrics.to_prometheus() == "\n"
@@ -0,0 +1,56 @@
+import time
+
+from core.profiling import Profiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_hooks_are_free_when_disabled():
+    profiler = Profiler()
+    with profiler.url("https://a.example/1", site="a"), profiler.stage("fetch"):
+        pass
+    assert profiler.slowest_urls() == [] and profiler.collapsed_stacks() == ""
+
+
+def test_nested_stages_are_a_breakdown_of_the_top_level_total():
+    profiler = Profiler()
+    profiler.enabled = True  # attribution only, no sampling thread
+    with profiler.url("https://a.example/1", site="a"):
+        with profiler.stage("fetch"):
+            busy(0.01)
+        with profiler.stage("parse"):
+            with profiler.stage("ingredients"):
+                busy(0.01)
+            with profiler.stage("parse"):  # recursive re-entry is not counted twice
+                busy(0.01)
+    with profiler.url("https://a.example/2", site="a"), profiler.stage("fetch"):
+        pass
+    (site, url, total, stages), fast = profiler.slowest_urls()
+    assert (site, url) == ("a", "https://a.example/1") and fast[1] == "https://a.example/2"
+    assert set(stages) == {"fetch", "parse", "ingredients"}
+    assert total == stages["fetch"] + stages["parse"]
+    assert stages["parse"] >= stages["ingredients"] + 0.01
+    assert profiler.slowest_urls(limit=1)[0][1] == "https://a.example/1"
+
+
+def test_samples_are_written_as_collapsed_stacks(tmp_path):
+    profiler = Profiler(interval=0.001)
+    profiler.start()
+    try:
+        with profiler.url("https://a.example/p 1;x", site="a"), profiler.stage("parse"):
+            busy(0.1)
+    finally:
+        profiler.stop()
+    stacks = profiler.collapsed_stacks().splitlines()
+    assert stacks
+    assert all(line.startswith("a;https://a.example/p_1,x;parse;") for line in stacks)
+    assert any("busy@test_profiling.py" in line for line in stacks)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+
+    folded, report = profiler.write(tmp_path / "profile")
+    assert folded.read_text(encoding="utf-8") == profiler.collapsed_stacks()
+    assert "[a] https://a.example/p 1;x  (parse=" in report.read_text(encoding="utf-8")
@@ -0,0 +1,94 @@
+import pytest
+
+from core import queue as queue_module
+from core.queue import SQLiteWorkQueue
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(queue_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def work_queue(tmp_path, clock):
+    work_queue = SQLiteWorkQueue(tmp_path / "queue.db", max_attempts=3, host_delay=10.0, retry_delay=30.0)
+    yield work_queue
+    work_queue.close()
+
+
+def test_enqueue_is_idempotent(work_queue):
+    assert work_queue.enqueue(["https://a.example/1", "https://a.example/2"], "inkeylist") == 2
+    assert work_queue.enqueue(["https://a.example/1"], "inkeylist") == 0
+    assert work_queue.stats()["pending"] == 2
+
+
+def test_lease_hands_out_one_url_per_host_per_delay(work_queue, clock):
+    work_queue.enqueue(["https://a.example/1", "https://a.example/2", "https://b.example/1"], "inkeylist")
+    tasks = work_queue.lease("w1", limit=10)
+    assert sorted(task.url for task in tasks) == ["https://a.example/1", "https://b.example/1"]
+    assert all(task.attempts == 1 for task in tasks)
+    assert work_queue.lease("w2", limit=10) == []
+    clock.now += 10.0
+    assert [task.url for task in work_queue.lease("w2", limit=10)] == ["https://a.example/2"]
+
+
+def test_expired_lease_is_handed_out_again(work_queue, clock):
+    work_queue.enqueue(["https://a.example/1"], "inkeylist")
+    (task,) = work_queue.lease("w1", visibility_timeout=60.0)
+    clock.now += 30.0
+    assert work_queue.lease("w2") == []
+    clock.now += 30.0
+    (again,) = work_queue.lease("w2")
+    assert again.id == task.id and again.attempts == 2
+
+
+def test_fail_backs_off_then_dead_letters(work_queue, clock):
+    work_queue.enqueue(["https://a.example/1"], "inkeylist")
+    (task,) = work_queue.lease("w1")
+    work_queue.fail(task, "Timeout")
+    clock.now += 29.0
+    assert work_queue.lease("w1") == []
+    clock.now += 1.0
+    (task,) = work_queue.lease("w1")
+    work_queue.fail(task, "Timeout")
+    clock.now += 60.0
+    (task,) = work_queue.lease("w1")
+    assert task.attempts == 3
+    work_queue.fail(task, "Timeout")
+    assert work_queue.stats()["dead"] == 1
+    assert work_queue.dead_letters()[0]["error"] == "Timeout"
+
+
+def test_permanent_failure_is_dead_at_once(work_queue):
+    work_queue.enqueue(["https://a.example/1"], "inkeylist")
+    (task,) = work_queue.lease("w1")
+    work_queue.fail(task, "empty product: no name extracted", permanent=True)
+    assert work_queue.stats() == {"pending": 0, "leased": 0, "done": 0, "dead": 1}
+    assert not work_queue.has_unfinished()
+
+
+def test_defer_keeps_the_attempt_and_parks_the_host(work_queue, clock):
+    work_queue.enqueue(["https://a.example/1", "https://a.example/2"], "inkeylist")
+    (task,) = work_queue.lease("w1")
+    work_queue.defer(task, 120.0, "circuit open")
+    clock.now += 60.0
+    assert work_queue.lease("w1", limit=10) == []  # the whole host is parked, not just the task
+    clock.now += 60.0
+    (other,) = work_queue.lease("w1")
+    assert other.url == "https://a.example/2"  # the deferred task queues behind it
+    work_queue.ack(other)
+    clock.now += 10.0
+    (again,) = work_queue.lease("w1")
+    assert again.id == task.id and again.attempts == 1
+    work_queue.ack(again)
+    assert work_queue.stats()["done"] == 2
@@ -0,0 +1,62 @@
+from core import reader
+from core.metrics import METRICS
+from core.reader import ProductFile, map_chunks
+from core.writer import HEADER
+
+
+def _row(barcode, name):
+    return f"{barcode}|{name}|desc|[]|img|Brand|cat|"
+
+
+def _names(reader, start, stop):
+    return [line.decode("utf-8").split("|")[1] for line in reader.lines(start, stop)]
+
+
+def test_last_row_without_newline(tmp_path):
+    path = tmp_path / "products.txt"
+    path.write_text(f"{HEADER}\n{_row('1', 'first')}\n{_row('2', 'last')}", encoding="utf-8")
+
+    with ProductFile(path) as products:
+        assert len(products) == 1  # may still be being written
+    with ProductFile(path, final=True) as products:
+        assert len(products) == 2
+        assert products.line(-1).decode("utf-8") == _row("2", "last")
+        assert products.get("2").product_name == "last"
+        assert _names(products, 0, 2) == ["first", "last"]
+
+    # The open row is never persisted: once the writer finishes it, a reopen extends the sidecar
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write(f"acne\n{_row('3', 'third')}\n")
+    with ProductFile(path) as products:
+        lines = [line.decode("utf-8") for line in products.lines()]
+        assert lines == [_row("1", "first"), _row("2", "last") + "acne", _row("3", "third")]
+        assert products.get("3").product_name == "third"
+
+
+def test_map_chunks_final(tmp_path):
+    path = tmp_path / "products.txt"
+    rows = [_row(str(number), f"p{number}") for number in range(50)]
+    path.write_text(HEADER + "\n" + "\n".join(rows), encoding="utf-8")
+    names = [name for chunk in map_chunks(path, _names, workers=1, final=True) for name in chunk]
+    assert names == [f"p{number}" for number in range(50)]
+
+
+def test_map_chunks_closes_its_reader_and_rereads_a_grown_file(tmp_path):
+    path = tmp_path / "products.txt"
+    path.write_text(f"{HEADER}\n{_row('1', 'first')}\n", encoding="utf-8")
+    assert [name for chunk in map_chunks(path, _names, workers=1) for name in chunk] == ["first"]
+    assert reader._reader is None
+
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write(f"{_row('2', 'second')}\n")
+    assert [name for chunk in map_chunks(path, _names, workers=1) for name in chunk] == ["first", "second"]
+    assert reader._reader is None
+
+
+def test_unwritable_sidecar_is_counted(tmp_path):
+    path = tmp_path / "products.txt"
+    path.write_text(f"{HEADER}\n{_row('1', 'first')}\n", encoding="utf-8")
+    METRICS.reset()
+    with ProductFile(path, index_path=tmp_path / "missing" / "products.rows") as products:
+        assert products.get("1").product_name == "first"
+    assert sum(METRICS.counters["row_index_save_errors_total"].values()) == 1
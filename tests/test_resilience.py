@@ -0,0 +1,112 @@
+import pytest
+import requests
+from core import resilience
+from core.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakers,
+    HostUnavailable,
+    RunBudget,
+    UrlFeed,
+    scrape_resilient,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker("a.example", failure_threshold=3, cooldown=10.0)
+    breaker.record_failure("Timeout")
+    breaker.record_success()  # a success resets the count
+    breaker.record_failure("Timeout")
+    breaker.record_failure("Timeout")
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure("Timeout")
+    assert breaker.state == OPEN and breaker.is_open
+    assert not breaker.allow() and not breaker.available()
+    assert breaker.retry_in() == 10.0
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("a.example", failure_threshold=1, cooldown=10.0)
+    breaker.record_failure("HTTP 503")
+    clock.now += 10.0
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow() and not breaker.available()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.cooldown == 10.0
+
+
+def test_failed_probe_doubles_the_cooldown_up_to_the_cap(clock):
+    breaker = CircuitBreaker("a.example", failure_threshold=1, cooldown=10.0, max_cooldown=25.0)
+    breaker.record_failure("HTTP 429")
+    for expected in (20.0, 25.0, 25.0):
+        clock.now += breaker.retry_in()
+        assert breaker.allow()
+        breaker.record_failure("HTTP 429")
+        assert breaker.state == OPEN and breaker.retry_in() == expected
+    clock.now += 25.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.cooldown == 10.0  # back to the base cooldown once closed
+
+
+def test_breakers_are_per_host_and_use_the_configured_thresholds(clock):
+    breakers = CircuitBreakers()
+    breakers.configure(failure_threshold=2, cooldown=5.0)
+    assert breakers.get("a.example") is breakers.get("a.example")
+    breakers.get("a.example").record_failure()
+    breakers.get("a.example").record_failure()
+    assert breakers.open_hosts() == ["a.example"]
+    assert breakers.get("b.example").allow()
+
+
+def make_feed(urls):
+    return UrlFeed(urls, breakers=CircuitBreakers(), budget=RunBudget())
+
+
+def test_fetch_errors_fail_the_url_and_the_run_continues():
+    feed = make_feed(["https://a.example/1", "https://a.example/2", "https://a.example/3"])
+
+    def scrape(urls):
+        for url in urls:
+            if url.endswith("/2"):
+                raise requests.HTTPError("404 Client Error")
+            yield url
+
+    assert list(scrape_resilient(scrape, feed)) == ["https://a.example/1", "https://a.example/3"]
+    assert feed.failed == {"https://a.example/2": "HTTPError: 404 Client Error"}
+    assert feed.leftover() == []
+
+
+def test_unavailable_hosts_are_deferred_not_failed():
+    feed = make_feed(["https://a.example/1", "https://b.example/1"])
+    calls = []
+
+    def scrape(urls):
+        for url in urls:
+            calls.append(url)
+            if url.startswith("https://a.") and calls.count(url) == 1:
+                raise HostUnavailable("a.example", 0.0)
+            yield url
+
+    assert list(scrape_resilient(scrape, feed)) == ["https://b.example/1", "https://a.example/1"]
+    assert feed.failed == {}
+    assert feed.deferrals == {"https://a.example/1": 1}
@@ -0,0 +1,68 @@
+from core.scheduler import RecrawlScheduler, interleave_hosts
+
+
+HOUR = 3600.0
+
+
+def interval(scheduler, url):
+    return scheduler.conn.execute("SELECT interval FROM urls WHERE url = ?", (url,)).fetchone()[0]
+
+
+def next_due(scheduler, url):
+    return scheduler.conn.execute("SELECT next_due FROM urls WHERE url = ?", (url,)).fetchone()[0]
+
+
+def test_interval_halves_on_change_and_grows_when_unchanged(tmp_path):
+    scheduler = RecrawlScheduler(tmp_path / "crawl.db", min_interval=HOUR, max_interval=100 * HOUR)
+    url = "https://a.example/p/1"
+    assert scheduler.record_success(url, "aa", now=0) is None
+    assert interval(scheduler, url) == HOUR
+    assert scheduler.record_success(url, "aa", now=10) is False
+    assert interval(scheduler, url) == 1.5 * HOUR
+    assert scheduler.record_success(url, "aa", now=20) is False
+    assert interval(scheduler, url) == 2.25 * HOUR
+    assert scheduler.record_success(url, "bb", now=30) is True
+    assert interval(scheduler, url) == 1.125 * HOUR
+    assert next_due(scheduler, url) == 30 + 1.125 * HOUR
+    scheduler.close()
+
+
+def test_interval_is_clamped(tmp_path):
+    scheduler = RecrawlScheduler(tmp_path / "crawl.db", min_interval=HOUR, max_interval=2 * HOUR)
+    url = "https://a.example/p/1"
+    for now in range(5):
+        scheduler.record_success(url, "aa", now=now)
+    assert interval(scheduler, url) == 2 * HOUR
+    scheduler.record_success(url, "bb", now=5)
+    scheduler.record_success(url, "cc", now=6)
+    assert interval(scheduler, url) == HOUR
+    scheduler.close()
+
+
+def test_failures_back_off_exponentially_up_to_max_interval(tmp_path):
+    scheduler = RecrawlScheduler(tmp_path / "crawl.db", error_backoff=HOUR, max_interval=5 * HOUR)
+    url = "https://a.example/p/1"
+    delays = []
+    for _ in range(5):
+        scheduler.record_failure(url, "HTTPError: 500", now=0)
+        delays.append(next_due(scheduler, url))
+    assert delays == [HOUR, 2 * HOUR, 4 * HOUR, 5 * HOUR, 5 * HOUR]
+    scheduler.record_success(url, "aa", now=0)
+    scheduler.record_failure(url, "HTTPError: 500", now=0)
+    assert next_due(scheduler, url) == HOUR
+    scheduler.close()
+
+
+def test_select_puts_new_urls_first_and_skips_urls_not_due(tmp_path):
+    scheduler = RecrawlScheduler(tmp_path / "crawl.db", min_interval=HOUR)
+    scheduler.add(["https://a.example/old", "https://a.example/new", "https://b.example/later"])
+    scheduler.record_success("https://a.example/old", "aa", now=0)
+    scheduler.record_success("https://b.example/later", "aa", now=2 * HOUR)
+    assert scheduler.select(now=2 * HOUR) == ["https://a.example/new", "https://a.example/old"]
+    assert scheduler.select(budget=1, now=2 * HOUR) == ["https://a.example/new"]
+    scheduler.close()
+
+
+def test_interleave_hosts_round_robin():
+    rows = [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b"), ("c1", "c"), ("b2", "b")]
+    assert interleave_hosts(rows) == ["a1", "b1", "c1", "a2", "b2", "a3"]
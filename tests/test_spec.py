@@ -0,0 +1,33 @@
+import pytest
+
+from sites.spec import CompiledSpec, Document, SpecError, compile_extractor, load_spec
+
+SECTION = "section:ingredients|inhaltsstoffe|inci"
+
+
+@pytest.mark.parametrize("heading", ["Key principles", "Provincial origin", "With zinc", "Zinc PCA"])
+def test_section_ignores_word_fragments(heading):
+    html = f"<h3>{heading}</h3><p>not ingredients</p>"
+    assert compile_extractor(SECTION).extract(Document(html)) == ""
+
+
+@pytest.mark.parametrize("heading", ["Ingredients:", "INCI", "Full INCI list", "Inhaltsstoffe"])
+def test_section_matches_whole_word(heading):
+    html = f"<h3>Key principles</h3><p>wrong</p><h3>{heading}</h3><p>Aqua, Glycerin</p>"
+    assert compile_extractor(SECTION).extract(Document(html)) == "Aqua, Glycerin"
+
+
+def test_head_only_spec_stops_on_first_choices():
+    spec = load_spec("versed")
+    assert spec.head_only
+    assert spec.head_fields == ("og:title", "og:description", "og:image")
+
+
+def test_ld_first_field_reads_whole_head():
+    spec = CompiledSpec("t", {"head_only": True, "fields": {"product_name": ["ld:Product.name", "meta:og:title"]}})
+    assert spec.head_fields == ()
+
+
+def test_head_only_rejects_body_extractors():
+    with pytest.raises(SpecError):
+        CompiledSpec("t", {"head_only": True, "fields": {"product_name": ["meta:og:title", "css:h1"]}})
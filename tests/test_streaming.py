@@ -0,0 +1,63 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.client import HttpClient
+from core.resilience import CircuitBreakers
+from core.streaming import fetch_head_metadata, sniff_encoding
+
+PAGE = '<html><head><meta property="og:title" content="Crème Hydratante"><title>Crème</title></head><body>x</body></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        if self.path == "/throttled" and type(self).hits == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = PAGE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")  # no charset: requests would assume ISO-8859-1
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.hits = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_sniff_encoding():
+    assert sniff_encoding("text/html; charset=ISO-8859-1", b'<meta charset="utf-8">') == "iso8859-1"
+    assert sniff_encoding("text/html", b'<head><meta charset="windows-1252">') == "cp1252"
+    assert sniff_encoding("text/html", b"<head><title>x</title>") == "utf-8"
+    assert sniff_encoding("text/html", b'<meta charset="bogus">') == "utf-8"
+
+
+def test_head_metadata_defaults_to_utf8(server):
+    metadata = fetch_head_metadata(HttpClient(breakers=CircuitBreakers()), server + "/page")
+    assert metadata.get("og:title") == "Crème Hydratante"
+    assert metadata.title == "Crème"
+
+
+def test_stream_retries_429(server, monkeypatch):
+    monkeypatch.setattr("core.client.time.sleep", lambda seconds: None)
+    metadata = fetch_head_metadata(HttpClient(breakers=CircuitBreakers()), server + "/throttled")
+    assert Handler.hits == 2
+    assert metadata.complete
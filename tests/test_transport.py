@@ -0,0 +1,72 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from core import transport
+from core.client import HttpClient
+from core.resilience import CircuitBreakers
+from core.transport import TransportConfig, retry_backoff
+
+
+class Handler(BaseHTTPRequestHandler):
+    failures = 0
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        status = 503 if type(self).hits <= type(self).failures else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.hits = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _client(**config):
+    return HttpClient(config=TransportConfig(retries=3, **config), breakers=CircuitBreakers(failure_threshold=100))
+
+
+def test_retry_backoff_matches_urllib3():
+    config = TransportConfig(backoff_factor=1.0, max_backoff=5.0)
+    assert [retry_backoff(config, retry) for retry in range(1, 5)] == [0.0, 2.0, 4.0, 5.0]
+
+
+@pytest.mark.parametrize("http2", [False, True])
+def test_5xx_retried_on_both_transports(server, monkeypatch, http2):
+    if http2 and not transport.http2_available():
+        pytest.skip("httpx[http2] not installed")
+    monkeypatch.setattr("core.client.time.sleep", lambda seconds: None)
+    Handler.failures = 2
+    assert _client(http2=http2, backoff_factor=0.0).fetch(server).status_code == 200
+    assert Handler.hits == 3
+
+
+@pytest.mark.parametrize("http2", [False, True])
+def test_5xx_retries_exhausted(server, monkeypatch, http2):
+    if http2 and not transport.http2_available():
+        pytest.skip("httpx[http2] not installed")
+    monkeypatch.setattr("core.client.time.sleep", lambda seconds: None)
+    Handler.failures = 100
+    with pytest.raises(requests.exceptions.RetryError):
+        _client(http2=http2, backoff_factor=0.0).fetch(server)
+    assert Handler.hits == 4
+
+
+def test_http2_needs_h2(monkeypatch):
+    monkeypatch.setattr(transport, "h2", None)
+    assert not transport.http2_available()
+    assert _client(http2=True, pool_maxsize=3).http2 is None
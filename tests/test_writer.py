@@ -0,0 +1,35 @@
+from core.models import Product
+from core.writer import HEADER, ProductAppender, write_products
+
+
+def product(barcode: str, name: str = "Serum") -> Product:
+    return Product(barcode=barcode, product_name=name, brand_name="Brand", image="https://x/a.jpg")
+
+
+def test_appender_counts_only_written_rows(tmp_path):
+    path = tmp_path / "products.txt"
+    appender = ProductAppender(path)
+    assert appender.append([product("1"), product("1"), Product(barcode="2")]) == 1
+    assert appender.append([product("1"), product("3")]) == 1
+    lines = path.read_text().splitlines()
+    assert lines[0] == HEADER and len(lines) == 3
+
+
+def test_appender_sees_rows_from_other_writers(tmp_path):
+    path = tmp_path / "products.txt"
+    appender = ProductAppender(path)
+    appender.append([product("1")])
+    assert write_products(path, [product("2")]) == 1
+    assert appender.append([product("2"), product("4")]) == 1
+    assert len(path.read_text().splitlines()) == 4
+
+
+def test_appender_rereads_a_replaced_file(tmp_path):
+    path = tmp_path / "products.txt"
+    appender = ProductAppender(path)
+    appender.append([product("1"), product("2")])
+    replacement = tmp_path / "compacted.txt"
+    replacement.write_text(path.read_text().splitlines()[0] + "\n" + product("2").to_pipe_row() + "\n")
+    replacement.replace(path)
+    assert appender.append([product("1"), product("2")]) == 1
+    assert len(path.read_text().splitlines()) == 3